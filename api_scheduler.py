@@ -0,0 +1,134 @@
+import asyncio
+import heapq
+import itertools
+import time as systime
+
+########################
+##  Global variables  ##
+########################
+
+# call budgets per CryptoCompare API tier
+API_TIERS = {
+    'free': {'second': 20, 'minute': 300, 'hour': 3000},
+    'unlimited': {},
+}
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+# request priorities, lower values are served first
+PRIORITY_VISIBLE = 0    # data of the currently displayed coin list and timeframe
+PRIORITY_PREFETCH = 1   # data that might be displayed next
+PRIORITY_METADATA = 2   # coin infos, top lists, ...
+
+# share of every budget that is kept for higher priority requests
+RESERVE = {PRIORITY_VISIBLE: 0.0, PRIORITY_PREFETCH: 0.2, PRIORITY_METADATA: 0.4}
+
+# exponential backoff after a rate limit response (seconds)
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+# refills continuously with capacity tokens per period
+class TokenBucket:
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = systime.monotonic()
+
+    def level(self, now):
+        return min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+
+    def refill(self, now):
+        self.tokens = self.level(now)
+        self.updated = now
+
+    # seconds until `needed` tokens are available
+    def wait_time(self, needed, now):
+        missing = needed - self.level(now)
+        return max(0.0, missing / self.rate)
+
+
+###############################
+##### REQUEST SCHEDULER #######
+###############################
+
+# Client side API budget: requests wait for a token of every bucket (per second, minute and hour budget)
+# Waiting requests are served in priority order and lower priorities have to leave a reserve for the higher
+# ones, rate limit responses pause all requests with exponential backoff
+# Runs on the http client loop, remaining() may be called from any thread
+class RequestScheduler:
+
+    def __init__(self, limits=API_TIERS['free']):
+        self.buckets = {name: TokenBucket(limit, PERIODS[name]) for name, limit in limits.items()}
+        self.queue = []                 # heap of (priority, sequence, future)
+        self.sequence = itertools.count()
+        self.timer = None               # pending wake up of the dispatcher
+        self.pause_until = 0.0
+        self.backoff_count = 0
+
+    # waits until the request may be sent
+    async def acquire(self, priority=PRIORITY_VISIBLE):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.queue, (priority, next(self.sequence), future))
+        self._dispatch()
+        await future
+
+    # takes a token only if it is available right now and no other request is waiting (e.g. for hedged requests)
+    # POST: returns True if the request may be sent
+    def try_acquire(self, priority=PRIORITY_PREFETCH):
+        now = systime.monotonic()
+        if self.waiting() or now < self.pause_until:
+            return False
+        for bucket in self.buckets.values():
+            if bucket.wait_time(1 + RESERVE.get(priority, 0.0) * bucket.capacity, now) > 0:
+                return False
+        for bucket in self.buckets.values():
+            bucket.refill(now)
+            bucket.tokens -= 1
+        return True
+
+    # PRE: retry_after in seconds as sent by the server (or None)
+    def report_throttled(self, retry_after=None):
+        self.backoff_count += 1
+        delay = min(BACKOFF_BASE * 2 ** (self.backoff_count - 1), BACKOFF_MAX)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        print(f"API rate limit hit, pausing requests for {delay:.1f}s")
+        self.pause_until = max(self.pause_until, systime.monotonic() + delay)
+
+    def report_success(self):
+        self.backoff_count = 0
+
+    # POST: returns the remaining calls per budget, e.g. {'second': 20, 'minute': 295, 'hour': 2990}
+    def remaining(self):
+        now = systime.monotonic()
+        return {name: int(bucket.level(now)) for name, bucket in self.buckets.items()}
+
+    def waiting(self):
+        return sum(1 for _, _, future in self.queue if not future.done())
+
+    # hands out tokens to waiting requests in priority order, reschedules itself if the budget is exhausted
+    def _dispatch(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        now = systime.monotonic()
+        while self.queue:
+            priority, _, future = self.queue[0]
+            if future.done():
+                # cancelled while waiting
+                heapq.heappop(self.queue)
+                continue
+            wait = max(0.0, self.pause_until - now)
+            for bucket in self.buckets.values():
+                needed = 1 + RESERVE.get(priority, 0.0) * bucket.capacity
+                wait = max(wait, bucket.wait_time(needed, now))
+            if wait > 0:
+                self.timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            for bucket in self.buckets.values():
+                bucket.refill(now)
+                bucket.tokens -= 1
+            heapq.heappop(self.queue)
+            future.set_result(None)
@@ -0,0 +1,489 @@
+import os
+import json
+import time as systime
+import zlib
+import struct
+import random
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+import httpx
+
+from candle_store import INTERVALS
+
+########################
+##  Global variables  ##
+########################
+
+# Local stand-in for the CryptoCompare endpoints used by the app (load tests, benchmarks, offline work)
+# usage: python api_standin.py [--port 8765] [--cassettes DIR [--record]] [--latency lognormal:80,0.5]
+#                              [--error-rate 0.01] [--rate-limit 20] [--throttle-rate 0.05] [--slow-coins BTC,ETH]
+# and point the app at it:
+#   CRYPTOCOMPARE_API_URL=http://127.0.0.1:8765 CRYPTOCOMPARE_IMAGE_URL=http://127.0.0.1:8765 python crypto_gui.py
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+UPSTREAM_API_URL = 'https://min-api.cryptocompare.com'
+UPSTREAM_IMAGE_URL = 'https://www.cryptocompare.com'
+
+HISTO_PATHS = {'/data/histominute': 'minute', '/data/histohour': 'hour', '/data/histoday': 'day'}
+TOP_COINS_PATH = '/data/top/totalvol'
+ALL_COINS_PATH = '/data/all/coinlist'
+PRICE_MULTI_PATH = '/data/pricemultifull'
+FSYMS_MAX_CHARS = 300   # longer fsyms are rejected like by the real endpoint
+IMAGE_PREFIX = '/media/'
+
+# coins of the synthetic top list, further coins are named C0000, C0001, ...
+TOP_COINS = ['BTC', 'ETH', 'USDT', 'BNB', 'SOL', 'XRP', 'USDC', 'ADA', 'DOGE', 'TRX',
+             'DOT', 'MATIC', 'LTC', 'LINK', 'BCH', 'XLM', 'ATOM', 'XMR', 'ETC', 'FIL']
+ALL_COINS_COUNT = 5000  # coins of the synthetic coin list
+PAYLOAD_CACHE_BYTES = 64 * 1024 * 1024  # encoded histo answers kept (LRU), soak runs move `end` every interval
+
+# body of CryptoCompare's rate limit answer (sent with HTTP 200)
+RATE_LIMIT_MESSAGE = {'Response': 'Error', 'Message': 'You are over your rate limit please upgrade your account!',
+                      'HasWarning': False, 'Type': 99, 'RateLimit': {}, 'Data': {}}
+
+
+########################
+##  Helper functions  ##
+########################
+
+# PRE: spec like 'fixed:50', 'uniform:20,200' or 'lognormal:80,0.5' (median ms, sigma), '' for no latency
+# POST: function returning a random latency in seconds
+def parse_latency(spec):
+    if not spec:
+        return lambda: 0.0
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',') if v]
+    if kind == 'fixed':
+        return lambda: values[0] / 1000
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == 'lognormal':
+        median, sigma = values[0], values[1] if len(values) > 1 else 0.5
+        return lambda: random.lognormvariate(np.log(median), sigma) / 1000
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+# POST: single color PNG image (stands in for coin logos)
+def make_png(color, size=64):
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    row = b'\x00' + bytes(color) * size
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(row * size))
+            + chunk(b'IEND', b''))
+
+
+def json_response(data, status=200):
+    return status, 'application/json', json.dumps(data).encode()
+
+
+##################################
+##### SYNTHETIC DATA SOURCE ######
+##################################
+
+# Deterministic price series per coin and currency, candles end at toTs (default: now) like the real API
+# Prices are a function of time (sum of random phase waves from minutes to years plus per candle noise), so
+# overlapping requests and all granularities agree with each other
+class SyntheticSource:
+
+    PERIODS = 600 * 2.5 ** np.arange(12)   # seconds, 10 minutes to about 3 years
+
+    def __init__(self, volatility=0.01):
+        self.volatility = volatility
+        self.payloads = OrderedDict()   # encoded histo answers, least recently used first (up to PAYLOAD_CACHE_BYTES)
+        self.payload_bytes = 0
+        self.all_coins_body = None      # encoded coin list (static, generated once)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def seed(*keys):
+        return int.from_bytes(hashlib.md5('/'.join(keys).encode()).digest()[:8], 'little')
+
+    # POST: uniform [0, 1) values, a fixed function of seed and index (splitmix64)
+    @staticmethod
+    def noise(seed, index):
+        z = index.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(seed)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+        return (z >> np.uint64(11)).astype(np.float64) / 2.0 ** 53
+
+    # POST: price of a coin at the unix timestamps t
+    def price(self, ticker, currency, t):
+        rng = np.random.default_rng(self.seed(ticker, currency))
+        phases = rng.uniform(0, 2 * np.pi, len(self.PERIODS))
+        amplitudes = self.volatility * (self.PERIODS / 3600) ** 0.35
+        level = 10 ** rng.uniform(-1, 4)
+        waves = np.sin(2 * np.pi * np.asarray(t, dtype=np.float64)[:, None] / self.PERIODS + phases)
+        return level * np.exp(waves @ amplitudes)
+
+    # candles in the format of the histo endpoints, the last candle is the current (open) one
+    def candles(self, ticker, currency, time, lim, to_ts=None):
+        interval = INTERVALS[time]
+        end = int(to_ts if to_ts is not None else systime.time()) // interval * interval
+        times = end - np.arange(lim, -1, -1, dtype=np.int64) * interval
+        prices = self.price(ticker, currency, np.append(times, end + interval))
+        opens, closes = prices[:-1], prices[1:]
+        seed = self.seed(ticker, currency, time)
+        wick = self.volatility * self.noise(seed, times // interval)
+        highs = np.maximum(opens, closes) * (1 + wick)
+        lows = np.minimum(opens, closes) * (1 - wick)
+        volumes = 10 + 990 * self.noise(seed ^ 1, times // interval)
+        return [{'time': int(t), 'open': float(o), 'high': float(h), 'low': float(l), 'close': float(c),
+                 'volumefrom': float(v), 'volumeto': float(v * c)}
+                for t, o, h, l, c, v in zip(times, opens, highs, lows, closes, volumes)]
+
+    def histo(self, time, params):
+        ticker, currency = params.get('fsym', 'BTC'), params.get('tsym', 'USD')
+        lim = int(params.get('limit', 30))
+        to_ts = int(params['toTs']) if params.get('toTs') else None
+        interval = INTERVALS[time]
+        end = int(to_ts if to_ts is not None else systime.time()) // interval * interval
+        key = (ticker, currency, time, lim, end)
+        with self.lock:
+            body = self.payloads.get(key)
+            if body is not None:
+                self.payloads.move_to_end(key)
+        if body is None:
+            data = {'Response': 'Success', 'Type': 100, 'Aggregated': False, 'TimeTo': end,
+                    'TimeFrom': end - lim * interval, 'Data': self.candles(ticker, currency, time, lim, end)}
+            body = json.dumps(data).encode()
+            with self.lock:
+                if key not in self.payloads:
+                    self.payloads[key] = body
+                    self.payload_bytes += len(body)
+                while self.payload_bytes > PAYLOAD_CACHE_BYTES and len(self.payloads) > 1:
+                    _, dropped = self.payloads.popitem(last=False)
+                    self.payload_bytes -= len(dropped)
+        return 200, 'application/json', body
+
+    # current price and 24h stats of every fsym in every tsym (RAW part of the real answer)
+    def price_multi(self, params):
+        fsyms, tsyms = params.get('fsyms', ''), params.get('tsyms', 'USD')
+        if len(fsyms) > FSYMS_MAX_CHARS:
+            return json_response({'Response': 'Error', 'Type': 2, 'Data': {},
+                                  'Message': f"fsyms param is invalid. (fsyms length is higher than maxlength: {FSYMS_MAX_CHARS})"})
+        now = int(systime.time())
+        raw = {}
+        for ticker in filter(None, fsyms.split(',')):
+            raw[ticker] = {}
+            for currency in filter(None, tsyms.split(',')):
+                day = self.candles(ticker, currency, 'hour', 23)
+                prices = self.price(ticker, currency, [now - 86400, now])
+                volume = sum(candle['volumefrom'] for candle in day)
+                raw[ticker][currency] = {'FROMSYMBOL': ticker, 'TOSYMBOL': currency, 'PRICE': float(prices[1]),
+                                         'LASTUPDATE': now, 'OPEN24HOUR': float(prices[0]),
+                                         'HIGH24HOUR': max(candle['high'] for candle in day),
+                                         'LOW24HOUR': min(candle['low'] for candle in day),
+                                         'VOLUME24HOUR': volume,
+                                         'VOLUME24HOURTO': sum(candle['volumeto'] for candle in day),
+                                         'CHANGE24HOUR': float(prices[1] - prices[0]),
+                                         'CHANGEPCT24HOUR': float((prices[1] / prices[0] - 1) * 100)}
+        return json_response({'RAW': raw})
+
+    @staticmethod
+    def coin_name(i):
+        return TOP_COINS[i] if i < len(TOP_COINS) else 'C%04d' % (i - len(TOP_COINS))
+
+    def coin_info(self, i):
+        name = self.coin_name(i)
+        return {'Name': name, 'FullName': name.title() + ' Coin', 'Algorithm': 'N/A', 'ProofType': 'N/A',
+                'BlockTime': 0, 'BlockReward': 0, 'ImageUrl': f"{IMAGE_PREFIX}{i}/{name.lower()}.png"}
+
+    # coins ranked by volume, page by page like the real endpoint
+    def top_coins(self, params):
+        top = int(params.get('limit', 10))
+        page = int(params.get('page', 0))
+        currency = params.get('tsym', 'USD')
+        ranks = range(page * top, min((page + 1) * top, ALL_COINS_COUNT))
+        data = [{'CoinInfo': self.coin_info(i),
+                 'ConversionInfo': {'Supply': 1e6 * (i + 1), 'TotalVolume24H': 1e9 / (i + 1)},
+                 'RAW': {currency: {'MKTCAP': 1e11 / (i + 1) ** 1.2}}}
+                for i in ranks]
+        return json_response({'Message': 'Success', 'Type': 100, 'Data': data})
+
+    def all_coins(self):
+        with self.lock:
+            body = self.all_coins_body
+        if body is None:
+            data = {self.coin_name(i): self.coin_info(i) for i in range(ALL_COINS_COUNT)}
+            body = json.dumps({'Response': 'Success', 'Type': 100, 'Data': data}).encode()
+            with self.lock:
+                self.all_coins_body = body
+        return 200, 'application/json', body
+
+    def image(self, path):
+        digest = hashlib.md5(path.encode()).digest()
+        return 200, 'image/png', make_png(digest[:3])
+
+    def respond(self, path, params):
+        if path in HISTO_PATHS:
+            return self.histo(HISTO_PATHS[path], params)
+        if path == TOP_COINS_PATH:
+            return self.top_coins(params)
+        if path == ALL_COINS_PATH:
+            return self.all_coins()
+        if path == PRICE_MULTI_PATH:
+            return self.price_multi(params)
+        if path.startswith(IMAGE_PREFIX):
+            return self.image(path)
+        return json_response({'Response': 'Error', 'Message': f"unknown endpoint {path}"}, 404)
+
+
+################################
+##### CASSETTE DATA SOURCE #####
+################################
+
+# Replays recorded responses, one JSON file per request
+# With record=True, missing responses are fetched from the real API and saved
+# Requests without an exact recording get the recording of the same endpoint and coin pair (e.g. another
+# toTs or limit), then the fallback source if any
+class CassetteSource:
+
+    def __init__(self, directory, record=False, fallback=None):
+        self.directory = directory
+        self.record = record
+        self.fallback = fallback
+        self.client = httpx.Client(timeout=30) if record else None
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(path, params, loose=False):
+        if loose:
+            params = {k: v for k, v in params.items() if k in ('fsym', 'tsym')}
+        query = '&'.join(f"{k}={v}" for k, v in sorted(params.items()))
+        name = path.strip('/').replace('/', '_')
+        return f"{name}{'_loose' if loose else ''}_{hashlib.sha1(query.encode()).hexdigest()[:12]}.json"
+
+    def load(self, name):
+        try:
+            with open(os.path.join(self.directory, name)) as json_file:
+                cassette = json.load(json_file)
+        except (OSError, ValueError):
+            return None
+        if 'data' in cassette:
+            body = json.dumps(cassette['data']).encode()
+        else:
+            body = bytes.fromhex(cassette['hex'])
+        return cassette['status'], cassette['content_type'], body
+
+    def save(self, name, path, params, status, content_type, body):
+        cassette = {'path': path, 'params': params, 'status': status, 'content_type': content_type}
+        if content_type.startswith('application/json'):
+            cassette['data'] = json.loads(body)
+        else:
+            cassette['hex'] = body.hex()
+        with self.lock:
+            with open(os.path.join(self.directory, name), 'w') as outfile:
+                json.dump(cassette, outfile)
+
+    def fetch_upstream(self, path, params):
+        base = UPSTREAM_IMAGE_URL if path.startswith(IMAGE_PREFIX) else UPSTREAM_API_URL
+        response = self.client.get(base + path, params=params)
+        content_type = response.headers.get('Content-Type', 'application/octet-stream').split(';')[0]
+        return response.status_code, content_type, response.content
+
+    def respond(self, path, params):
+        name = self.key(path, params)
+        response = self.load(name)
+        if response is not None:
+            return response
+        if self.record:
+            response = self.fetch_upstream(path, params)
+            if response[0] == 200:
+                for cassette in (name, self.key(path, params, loose=True)):
+                    self.save(cassette, path, params, *response)
+            print(f"recorded {path} {params}")
+            return response
+        response = self.load(self.key(path, params, loose=True))
+        if response is not None:
+            return response
+        if self.fallback is not None:
+            return self.fallback.respond(path, params)
+        return json_response({'Response': 'Error', 'Message': f"no recording for {path} {params}"}, 404)
+
+
+##############################
+##### FAULT INJECTOR CLASS ###
+##############################
+
+# Latency, errors and rate limiting in front of a data source
+class FaultInjector:
+
+    # latency: function returning seconds (see parse_latency)
+    # error_rate: share of requests answered with HTTP 500
+    # rate_limit: calls per second before requests are throttled (None: unlimited)
+    # throttle_rate: share of requests throttled at random
+    # throttle_style: '429' (HTTP 429 with Retry-After) or 'message' (HTTP 200 with CryptoCompare's error body)
+    # slow_coins: requests for these coins (fsym) take slow_factor times longer
+    def __init__(self, latency=None, error_rate=0.0, rate_limit=None, throttle_rate=0.0, throttle_style='429',
+                 slow_coins=(), slow_factor=10.0):
+        self.latency = latency or (lambda: 0.0)
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.throttle_rate = throttle_rate
+        self.throttle_style = throttle_style
+        self.slow_coins = set(slow_coins)
+        self.slow_factor = slow_factor
+        self.tokens = float(rate_limit or 0)
+        self.updated = systime.monotonic()
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0}
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    # token bucket with rate_limit tokens per second
+    def take_token(self):
+        if self.rate_limit is None:
+            return True
+        with self.lock:
+            now = systime.monotonic()
+            self.tokens = min(self.rate_limit, self.tokens + (now - self.updated) * self.rate_limit)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def throttled(self):
+        self.count('throttled')
+        if self.throttle_style == 'message':
+            return json_response(RATE_LIMIT_MESSAGE)
+        status, content_type, body = json_response(RATE_LIMIT_MESSAGE, 429)
+        return status, content_type, body, {'Retry-After': '1'}
+
+    # POST: (status, content type, body[, extra headers]), blocks for the injected latency
+    def respond(self, source, path, params):
+        self.count('requests')
+        if not self.take_token() or random.random() < self.throttle_rate:
+            return self.throttled()
+        delay = self.latency()
+        if params.get('fsym') in self.slow_coins:
+            delay *= self.slow_factor
+        if delay > 0:
+            systime.sleep(delay)
+        if random.random() < self.error_rate:
+            self.count('errors')
+            return json_response({'Response': 'Error', 'Message': 'injected server error'}, 500)
+        return source.respond(path, params)
+
+
+##############################
+##### STAND-IN SERVER CLASS ##
+##############################
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'   # keep-alive, like the real API
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        response = self.server.faults.respond(self.server.source, url.path, params)
+        status, content_type, body = response[:3]
+        headers = response[3] if len(response) > 3 else {}
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+# Threaded HTTP server, one thread per connection so injected latencies overlap like real network delays
+# start() runs it in a background thread (scripts, benchmarks), serve_forever() in the foreground
+class StandinServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, source=None, faults=None, host=HOST, port=PORT, verbose=False):
+        super().__init__((host, port), StandinRequestHandler)
+        self.source = source or SyntheticSource()
+        self.faults = faults or FaultInjector()
+        self.verbose = verbose
+        self.thread = None
+
+    # base url for CRYPTOCOMPARE_API_URL / CRYPTOCOMPARE_IMAGE_URL
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='api-standin', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# stand-in without a server: httpx transport that answers from a data source (no latency or faults)
+def mock_transport(source=None):
+    source = source or SyntheticSource()
+
+    def handler(request):
+        status, content_type, body = source.respond(request.url.path, dict(request.url.params))
+        return httpx.Response(status, content=body, headers={'Content-Type': content_type})
+    return httpx.MockTransport(handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the CryptoCompare API')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--cassettes', help='directory of recorded responses (default: synthetic data)')
+    parser.add_argument('--record', action='store_true', help='record missing responses from the real API')
+    parser.add_argument('--fallback', action='store_true', help='answer requests without recording with synthetic data')
+    parser.add_argument('--latency', default='', help="fixed:MS, uniform:MIN,MAX or lognormal:MEDIAN,SIGMA")
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests failing with HTTP 500')
+    parser.add_argument('--rate-limit', type=int, help='calls per second before requests are throttled')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of requests throttled at random')
+    parser.add_argument('--throttle-style', choices=['429', 'message'], default='429')
+    parser.add_argument('--slow-coins', default='', help='comma separated coins with slow responses')
+    parser.add_argument('--slow-factor', type=float, default=10.0, help='latency multiplier of the slow coins')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    if args.cassettes:
+        source = CassetteSource(args.cassettes, args.record, SyntheticSource() if args.fallback else None)
+    else:
+        source = SyntheticSource()
+    try:
+        latency = parse_latency(args.latency)
+    except (ValueError, IndexError) as e:
+        parser.error(str(e))
+    faults = FaultInjector(latency, args.error_rate, args.rate_limit, args.throttle_rate, args.throttle_style,
+                           [c for c in args.slow_coins.split(',') if c], args.slow_factor)
+
+    server = StandinServer(source, faults, args.host, args.port, args.verbose)
+    print(f"serving the CryptoCompare stand-in on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"stats: {faults.stats}")
+
+
+if __name__ == '__main__':
+    main()
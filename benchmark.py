@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime as dt
+import statistics
+
+# render without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+# config files (coin lists) are read from the working directory
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import matplotlib
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QEventLoop, QTimer
+
+import http_client
+import crypto_gui
+import candle_store
+from api_scheduler import API_TIERS
+from api_standin import SyntheticSource, mock_transport
+from candle_store import CandleStore, FIELDS
+from price_frame import PriceFrame
+from mpl_price_charts import MplPriceChartsCanvas, MplGrowthCanvas, MplCorrelationCanvas
+
+########################
+##  Global variables  ##
+########################
+
+# Offline benchmarks of the fetch, parse, compute and render paths
+# usage: python benchmark.py [--coins 12,50] [--windows 1-hour,1-day] [--repeat 3] [--output bench.json]
+#                            [--baseline baseline.json] [--tolerance 0.25]
+# every benchmark runs once to warm up and then `repeat` times, the median is compared against the baseline
+
+COIN_COUNTS = [12, 50, 200, 500]
+REPEAT = 3
+TOLERANCE = 0.25        # a benchmark regressed if it is this much slower than the baseline ...
+NOISE_MS = 1.0          # ... and at least this many ms slower
+REFRESH_TIMEOUT = 120   # seconds to wait for an end-to-end refresh
+
+COLORS = ['orange', 'darkred', 'grey', 'navy', 'dimgrey', 'm', 'green', 'teal', 'gold', 'brown', 'olive', 'purple']
+
+
+########################
+##  Helper functions  ##
+########################
+
+# synthetic coin list: C0000, C0001, ... with repeating colors
+def make_coin_list(count):
+    return {'C%04d' % i: COLORS[i % len(COLORS)] for i in range(count)}
+
+
+# PRE: fn runs the benchmarked code once
+# POST: timings in ms of `repeat` runs after one warm up run
+def measure(fn, repeat, setup=None):
+    times = []
+    for run in range(repeat + 1):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        if run:
+            times.append(elapsed)
+    return {'median_ms': statistics.median(times), 'min_ms': min(times), 'max_ms': max(times), 'runs': len(times)}
+
+
+# series of every coin as the candle store returns them
+def make_series(source, coin_list, currency, time, lim):
+    series_list = []
+    for coin in coin_list:
+        candles = source.candles(coin, currency, time, lim)
+        series = {f: np.array([c[f] for c in candles], dtype=np.float64) for f in FIELDS}
+        series['time'] = series['time'].astype(np.int64)
+        series_list.append(series)
+    return series_list
+
+
+#############################
+##### BENCHMARK RUNNER ######
+#############################
+
+class BenchmarkRunner:
+
+    def __init__(self, app, source, repeat=REPEAT):
+        self.app = app
+        self.source = source
+        self.repeat = repeat
+        self.results = {}
+        self.window = None      # main window for the end-to-end refresh, created on first use
+
+    def record(self, coins, window, name, result):
+        key = f"{coins}/{window}/{name}"
+        self.results[key] = result
+        print(f"{key:<45} {result['median_ms']:10.2f} ms")
+
+    def run(self, coin_counts, windows):
+        for coins in coin_counts:
+            coin_list = make_coin_list(coins)
+            # canvases are kept per coin count, as in the app they are reused between refreshes
+            price_canvas = MplPriceChartsCanvas(coin_list, width=12, height=4, dpi=100)
+            indexed_canvas = MplPriceChartsCanvas(coin_list, width=12, height=4, dpi=100)
+            growth_canvas = MplGrowthCanvas(coin_list, width=5, height=2, dpi=100)
+            correlation_canvas = MplCorrelationCanvas(coin_list, width=5, height=2, dpi=100)
+            for window in windows:
+                time_scale = crypto_gui.timeWords.index(window)
+                time = crypto_gui.timeLimScale[time_scale]
+                lim = crypto_gui.timeLim[time_scale]
+                self.run_window(coins, window, coin_list, time_scale, time, lim,
+                                price_canvas, indexed_canvas, growth_canvas, correlation_canvas)
+            for canvas in (price_canvas, indexed_canvas, growth_canvas, correlation_canvas):
+                canvas.deleteLater()
+
+    def run_window(self, coins, window, coin_list, time_scale, time, lim,
+                   price_canvas, indexed_canvas, growth_canvas, correlation_canvas):
+        currency = 'EUR'
+        payloads = [self.source.histo(time, {'fsym': coin, 'tsym': currency, 'limit': lim})[2] for coin in coin_list]
+        self.record(coins, window, 'json_decode', measure(lambda: [json.loads(p) for p in payloads], self.repeat))
+
+        series_list = make_series(self.source, coin_list, currency, time, lim)
+        self.record(coins, window, 'price_frame', measure(
+            lambda: PriceFrame.from_series(coin_list, series_list, currency, time, lim), self.repeat))
+        frame = PriceFrame.from_series(coin_list, series_list, currency, time, lim)
+
+        self.record(coins, window, 'calc_growth_rates', measure(
+            lambda: crypto_gui.calc_growth_rates(coin_list, frame), self.repeat))
+        growth_rates = crypto_gui.calc_growth_rates(coin_list, frame)
+
+        self.record(coins, window, 'draw_plots', measure(
+            lambda: price_canvas.draw_plots(coin_list, currency, time_scale, time, lim, frame), self.repeat))
+        self.record(coins, window, 'draw_indexed_plots', measure(
+            lambda: indexed_canvas.draw_indexed_plots(coin_list, currency, time_scale, time, lim, frame), self.repeat))
+
+        def draw_growth():
+            growth_canvas.fig.clf()
+            growth_canvas.draw_graph(growth_rates, coin_list)
+        self.record(coins, window, 'growth_draw_graph', measure(draw_growth, self.repeat))
+
+        def draw_correlations():
+            correlation_canvas.fig.clf()
+            correlation_canvas.draw_graph(coin_list, frame)
+            correlation_canvas.fig.canvas.draw()
+        self.record(coins, window, 'correlation_draw_graph', measure(draw_correlations, self.repeat))
+
+        self.run_refresh(coins, window, coin_list, time_scale, time, lim)
+
+    # end to end: API requests (stand-in transport), candle store, price frame and redraw of the main window
+    # cold: empty candle store, warm: the candle store only needs the newest candles
+    def run_refresh(self, coins, window, coin_list, time_scale, time, lim):
+        w = self.get_window()
+        w.coinList = coin_list
+        w.timeScale, w.time, w.lim = time_scale, time, lim
+
+        def reset_store():
+            candle_store._candle_store = CandleStore(':memory:')
+            crypto_gui.price_cache.clear()
+
+        self.record(coins, window, 'refresh_cold', measure(self.refresh, self.repeat, setup=reset_store))
+        self.record(coins, window, 'refresh_warm', measure(self.refresh, self.repeat, setup=crypto_gui.price_cache.clear))
+
+    # refresh_data_and_graphs and wait until the new data is drawn
+    def refresh(self):
+        loop = QEventLoop()
+        # connected after the window, so the loop quits once on_price_data has redrawn the graphs
+        self.window.price_fetcher.data_ready.connect(loop.quit)
+        self.window.price_fetcher.fetch_failed.connect(loop.quit)
+        QTimer.singleShot(REFRESH_TIMEOUT * 1000, loop.quit)
+        self.window.refresh_data_and_graphs()
+        loop.exec_()
+        self.window.price_fetcher.data_ready.disconnect(loop.quit)
+        self.window.price_fetcher.fetch_failed.disconnect(loop.quit)
+
+    def get_window(self):
+        if self.window is None:
+            self.window = crypto_gui.CryptoGui()
+            self.window.resize(1400, 900)
+            # no auto updates between the measured refreshes
+            self.window.autoupdateAct.setChecked(False)
+            self.window.timer0.stop()
+        return self.window
+
+
+# POST: returns the list of regressions (key, baseline ms, current ms)
+def compare(results, baseline, tolerance=TOLERANCE):
+    regressions = []
+    print(f"\n{'benchmark':<45} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        old = baseline[key]['median_ms']
+        new = result['median_ms']
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ''
+        if new > old * (1 + tolerance) and new - old > NOISE_MS:
+            regressions.append((key, old, new))
+            flag = '  REGRESSION'
+        print(f"{key:<45} {old:10.2f} {new:10.2f} {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks of the Crypto Price Navigator hot paths')
+    parser.add_argument('--coins', default=','.join(str(c) for c in COIN_COUNTS), help='comma separated coin counts')
+    parser.add_argument('--windows', default=','.join(crypto_gui.timeWords), help='comma separated time windows')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='measured runs per benchmark')
+    parser.add_argument('--output', default='bench_results.json', help='JSON file for the results')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed slowdown (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    coin_counts = [int(c) for c in args.coins.split(',')]
+    windows = args.windows.split(',')
+    for window in windows:
+        if window not in crypto_gui.timeWords:
+            parser.error(f"unknown window {window}, choose from {', '.join(crypto_gui.timeWords)}")
+
+    # all requests go to the synthetic stand-in (see api_standin.py), without API budget
+    source = SyntheticSource()
+    http_client._http_client = http_client.HttpClient(transport=mock_transport(source),
+                                                      rate_limits=API_TIERS['unlimited'])
+    candle_store._candle_store = CandleStore(':memory:')
+
+    app = QtWidgets.QApplication(sys.argv)
+    runner = BenchmarkRunner(app, source, args.repeat)
+    runner.run(coin_counts, windows)
+
+    output = {'meta': {'date': dt.datetime.now().isoformat(timespec='seconds'),
+                       'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'numpy': np.__version__,
+                       'matplotlib': matplotlib.__version__,
+                       'repeat': args.repeat},
+              'results': runner.results}
+    with open(args.output, 'w') as outfile:
+        json.dump(output, outfile, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as json_file:
+            baseline = json.load(json_file)['results']
+        regressions = compare(runner.results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.tolerance * 100:.0f}%")
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == '__main__':
+    main()
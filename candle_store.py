@@ -0,0 +1,124 @@
+import sqlite3
+import threading
+import time as systime
+
+import numpy as np
+
+########################
+##  Global variables  ##
+########################
+
+DB_FILE = 'candles.db'
+
+# seconds covered by one candle of each histo endpoint
+INTERVALS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+# how long candles are kept before being pruned (None: keep forever)
+# a year of minute candles is about 525k rows per coin, the zoomable charts draw them through lod_pyramid
+RETENTION = {'minute': 365 * 86400, 'hour': 365 * 86400, 'day': None}
+
+# candle fields as delivered by the histo endpoints
+FIELDS = ['time', 'open', 'high', 'low', 'close', 'volumefrom', 'volumeto']
+
+_candle_store = None
+
+
+# returns the shared candle store, the database file is opened on first use (not on import)
+def get_candle_store():
+    global _candle_store
+    if _candle_store is None:
+        _candle_store = CandleStore()
+    return _candle_store
+
+
+############################
+##### CANDLE STORE CLASS ###
+############################
+
+# Local time series store keyed by (ticker, currency, granularity)
+# Remembers the first and last stored candle of every series so a refresh only has to ask the API for the
+# candles after the last one instead of downloading the whole window again
+class CandleStore:
+
+    def __init__(self, db_file=DB_FILE):
+        # connection is shared between the fetch threads, all access goes through the lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS candles (
+                                    ticker TEXT, currency TEXT, granularity TEXT, time INTEGER,
+                                    open REAL, high REAL, low REAL, close REAL, volumefrom REAL, volumeto REAL,
+                                    PRIMARY KEY (ticker, currency, granularity, time)) WITHOUT ROWID""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS series (
+                                    ticker TEXT, currency TEXT, granularity TEXT, first_time INTEGER, last_time INTEGER,
+                                    PRIMARY KEY (ticker, currency, granularity))""")
+
+    # POST: returns (limit, window_start): the histo limit needed to bring the last lim+1 periods up to date
+    # and the time of the first candle in that window
+    def get_missing(self, ticker, currency, time, lim):
+        interval = INTERVALS[time]
+        now = int(systime.time()) // interval * interval
+        window_start = now - lim * interval
+
+        first, last = self.get_bounds(ticker, currency, time)
+        if last is None or first > window_start:
+            # nothing stored or stored series starts too late -> full window
+            limit = lim
+        else:
+            # the last stored candle is still open (or was when it was stored) so it is always fetched again
+            limit = min(max((now - last) // interval, 1), lim)
+        return limit, window_start
+
+    # returns (first_time, last_time) of a stored series or (None, None)
+    def get_bounds(self, ticker, currency, time):
+        with self.lock:
+            row = self.conn.execute("SELECT first_time, last_time FROM series WHERE ticker=? AND currency=? AND granularity=?",
+                                    (ticker, currency, time)).fetchone()
+        if row is None:
+            return None, None
+        return row
+
+    # insert or replace candles and update the series bounds
+    def merge(self, ticker, currency, time, candles):
+        try:
+            rows = [(ticker, currency, time) + tuple(c[f] for f in FIELDS) for c in candles]
+        except (KeyError, TypeError) as e:
+            print(f"Malformed candle data for {ticker}/{currency} ({e})")
+            return
+        first = min(r[3] for r in rows)
+        last = max(r[3] for r in rows)
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO candles VALUES (?,?,?,?,?,?,?,?,?,?)", rows)
+            old = self.conn.execute("SELECT first_time, last_time FROM series WHERE ticker=? AND currency=? AND granularity=?",
+                                    (ticker, currency, time)).fetchone()
+            if old is not None:
+                first = min(first, old[0])
+                last = max(last, old[1])
+            retention = RETENTION[time]
+            if retention is not None and first < last - retention:
+                first = last - retention
+                self.conn.execute("DELETE FROM candles WHERE ticker=? AND currency=? AND granularity=? AND time<?",
+                                  (ticker, currency, time, first))
+            self.conn.execute("INSERT OR REPLACE INTO series VALUES (?,?,?,?,?)", (ticker, currency, time, first, last))
+
+    # PRE: candles maps tickers to a candle of the series (ticker, currency, time)
+    # replaces the last stored candle of every series by the given one if it has the same time, in one transaction
+    # (patched by the batched refresh, the last stored candle is always fetched again by the next histo request)
+    def patch_last(self, currency, time, candles):
+        rows = [tuple(candle[f] for f in FIELDS[1:]) + (ticker, currency, time, candle['time'], ticker, currency, time)
+                for ticker, candle in candles.items()]
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE candles SET open=?, high=?, low=?, close=?, volumefrom=?, volumeto=? "
+                                  "WHERE ticker=? AND currency=? AND granularity=? AND time=? AND time=("
+                                  "SELECT last_time FROM series WHERE ticker=? AND currency=? AND granularity=?)", rows)
+
+    # returns all stored candles of a series starting at start (oldest first) as columns (field -> numpy array)
+    def read(self, ticker, currency, time, start):
+        with self.lock:
+            rows = self.conn.execute("SELECT " + ", ".join(FIELDS) + " FROM candles "
+                                     "WHERE ticker=? AND currency=? AND granularity=? AND time>=? ORDER BY time",
+                                     (ticker, currency, time, start)).fetchall()
+        data = np.array(rows, dtype=np.float64).reshape(-1, len(FIELDS))
+        series = {f: data[:, i] for i, f in enumerate(FIELDS)}
+        series['time'] = series['time'].astype(np.int64)
+        return series
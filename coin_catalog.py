@@ -0,0 +1,186 @@
+import os
+import json
+import asyncio
+import time as systime
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from http_client import get_http_client, API_URL
+from api_scheduler import PRIORITY_METADATA
+from price_fetcher import PriceFetcher
+
+########################
+##  Global variables  ##
+########################
+
+# API urls
+ALL_COINS_URL = API_URL + '/data/all/coinlist'      # every listed coin (names, algorithm, logo, ...), one request
+TOP_COINS_URL = API_URL + '/data/top/totalvol'      # coins ranked by volume incl. supply, volume and market cap
+
+CATALOG_FILE = 'coin_catalog.json'
+CATALOG_VERSION = 1
+CATALOG_TTL = 24 * 3600     # s, older catalogs are refreshed in the background (and used until then)
+TOP_PAGES = 10              # pages of the volume ranking (API limit: 100 coins per page)
+TOP_PAGE_SIZE = 100
+RANK_CURRENCY = 'USD'
+
+_catalog = None
+
+
+# returns the shared coin catalog, loaded from disk on first use (refreshed in the background if outdated)
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = CoinCatalog()
+        if _catalog.is_stale():
+            _catalog.refresh()
+    return _catalog
+
+
+# POST: catalog entry (flat dict) of a coin, info from the coin list and/or stats from the volume ranking
+def make_entry(name, info=None, top=None):
+    info = info or {}
+    entry = {'Name': name,
+             'FullName': info.get('FullName', name),
+             'Algorithm': info.get('Algorithm', 'N/A'),
+             'ProofType': info.get('ProofType', 'N/A'),
+             'BlockTime': info.get('BlockTime', 0),
+             'BlockReward': info.get('BlockReward', 0),
+             'ImageUrl': info.get('ImageUrl', ''),
+             'Rank': None,
+             'Supply': None,
+             'Volume24H': None,
+             'MarketCap': None}
+    if top is not None:
+        conversion = top.get('ConversionInfo') or {}
+        raw = (top.get('RAW') or {}).get(RANK_CURRENCY) or {}
+        entry['Supply'] = conversion.get('Supply')
+        entry['Volume24H'] = conversion.get('TotalVolume24H')
+        entry['MarketCap'] = raw.get('MKTCAP')
+    return entry
+
+
+# runs on the http client loop (see PriceFetcher)
+# POST: catalog entries, ranked coins first (by volume), then all other coins in the order of the coin list
+async def fetch_catalog(pages=TOP_PAGES):
+    client = get_http_client()
+
+    async def get_page(page):
+        params = {'limit': TOP_PAGE_SIZE, 'page': page, 'tsym': RANK_CURRENCY}
+        try:
+            return (await client.fetch_json(TOP_COINS_URL, params=params, priority=PRIORITY_METADATA))['Data'] or []
+        except Exception as e:
+            print(f"Error loading coin ranking page {page} ({e})")
+            return []
+
+    async def get_all():
+        try:
+            return (await client.fetch_json(ALL_COINS_URL, priority=PRIORITY_METADATA))['Data'] or {}
+        except Exception as e:
+            print(f"Error loading coin list ({e})")
+            return {}
+
+    results = await asyncio.gather(get_all(), *[get_page(page) for page in range(pages)])
+    all_coins, ranked = results[0], [item for page in results[1:] for item in page]
+    if not all_coins and not ranked:
+        raise RuntimeError("coin catalog not available")
+    entries = {}
+    for item in ranked:
+        name = item['CoinInfo']['Name']
+        if name not in entries:
+            entry = make_entry(name, all_coins.get(name) or item['CoinInfo'], item)
+            entry['Rank'] = len(entries) + 1
+            entries[name] = entry
+    for name, info in all_coins.items():
+        if name not in entries:
+            entries[name] = make_entry(name, info)
+    return list(entries.values())
+
+
+def save_catalog(entries, fetched, path=CATALOG_FILE):
+    with open(path + '.tmp', 'w') as outfile:
+        json.dump({'version': CATALOG_VERSION, 'time': fetched, 'coins': entries}, outfile)
+    os.replace(path + '.tmp', path)
+
+
+###############################
+##### COIN CATALOG CLASS ######
+###############################
+
+# Metadata of all coins (names, algorithm, logo url, supply, volume, market cap) indexed by ticker
+# Kept on disk and loaded without network access, a catalog older than the TTL is still used while a fresh one is
+# fetched in the background (volume ranking + full coin list), updated is emitted when the new catalog is in place
+class CoinCatalog(QObject):
+
+    updated = pyqtSignal()
+
+    def __init__(self, path=CATALOG_FILE, ttl=CATALOG_TTL, parent=None):
+        super(CoinCatalog, self).__init__(parent)
+        self.path = path
+        self.ttl = ttl
+        self.fetched = 0        # unix time of the catalog data, 0 if there is none
+        self.entries = []       # ranked coins first
+        self.index = {}         # ticker -> entry
+        self.fetcher = PriceFetcher(self)
+        self.fetcher.data_ready.connect(self.on_catalog)
+        self.fetcher.fetch_failed.connect(self.on_failed)
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as json_file:
+                data = json.load(json_file)
+            if data.get('version') == CATALOG_VERSION:
+                self.set_entries(data['coins'], data['time'])
+                print(f"coin catalog loaded ({len(self.entries)} coins)")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading coin catalog ({e})")
+
+    def set_entries(self, entries, fetched):
+        self.entries = entries
+        self.index = {entry['Name']: entry for entry in entries}
+        self.fetched = fetched
+
+    def is_stale(self):
+        return systime.time() - self.fetched > self.ttl
+
+    def is_refreshing(self):
+        return self.fetcher.is_busy()
+
+    # starts a background refresh unless one is running already
+    def refresh(self):
+        if self.is_refreshing():
+            return
+
+        async def fetch_and_save():
+            entries = await fetch_catalog()
+            fetched = systime.time()
+            # written by a worker thread, the client loop keeps serving requests
+            await asyncio.to_thread(save_catalog, entries, fetched, self.path)
+            return entries, fetched
+
+        self.fetcher.fetch(fetch_and_save())
+
+    def on_catalog(self, generation, result):
+        self.set_entries(*result)
+        print(f"coin catalog updated ({len(self.entries)} coins)")
+        self.updated.emit()
+
+    def on_failed(self, generation, message):
+        print(f"Error refreshing coin catalog ({message})")
+
+    # POST: catalog entry of the coin or None
+    def get(self, ticker):
+        return self.index.get(ticker)
+
+    def __contains__(self, ticker):
+        return ticker in self.index
+
+    def __len__(self):
+        return len(self.entries)
+
+    # POST: tickers of the top coins by volume
+    def top(self, n):
+        return [entry['Name'] for entry in self.entries[:n] if entry['Rank'] is not None]
@@ -0,0 +1,169 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QStandardItemModel
+
+from coin_catalog import get_catalog
+
+########################
+##  Global variables  ##
+########################
+
+SORT_MODES = ['Volume', 'Market Cap', 'Name', 'List Order']
+FETCH_BATCH = 500       # rows handed to the view at a time (more are added while scrolling down)
+
+
+# POST: tickers of a drag (mime data of a list view or widget), decoded by Qt's own item model
+def decode_tickers(mime_data):
+    model = QStandardItemModel()
+    model.dropMimeData(mime_data, Qt.CopyAction, 0, 0, QModelIndex())
+    return [model.item(row).text() for row in range(model.rowCount())]
+
+
+##############################
+##### COIN LIST MODEL ########
+##############################
+
+# Coins of the editor's "available coins" pane (thousands of tickers) for a QListView
+# Rows are positions in the coin list, filtered by a search text (ticker or full name, tickers starting with the text
+# come first) and sorted by volume, market cap, name or list order; the view gets FETCH_BATCH rows at a time
+# Search narrows the last result while the text is extended, so typing stays fast for any number of coins
+# Dragging copies the coins (e.g. into the current list), coins dropped here are added to the pane
+class CoinListModel(QAbstractListModel):
+
+    def __init__(self, tickers=(), parent=None):
+        super(CoinListModel, self).__init__(parent)
+        self.catalog = get_catalog()
+        self.tickers = []       # all coins of the pane
+        self.positions = {}     # ticker -> position in tickers
+        self.keys = []          # search keys per coin: 'ticker full name' in lower case
+        self.sort_mode = SORT_MODES[0]
+        self.order = []         # coin positions in sort order
+        self.query = ''
+        self.matches = []       # positions matching the query (sort order)
+        self.rows = []          # positions shown, ticker prefix matches first
+        self.loaded = 0         # rows handed to the view
+        self.set_tickers(tickers)
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        ticker = self.tickers[self.rows[index.row()]]
+        if role == Qt.DisplayRole:
+            return ticker
+        if role == Qt.ToolTipRole:
+            entry = self.catalog.get(ticker)
+            return entry['FullName'] if entry is not None else None
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        count = min(FETCH_BATCH, len(self.rows) - self.loaded)
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def supportedDragActions(self):
+        return Qt.CopyAction
+
+    def supportedDropActions(self):
+        return Qt.CopyAction | Qt.MoveAction
+
+    def canDropMimeData(self, data, action, row, column, parent):
+        return data.hasFormat('application/x-qabstractitemmodeldatalist')
+
+    def dropMimeData(self, data, action, row, column, parent):
+        tickers = decode_tickers(data)
+        self.add_tickers(tickers)
+        return bool(tickers)
+
+    # coins
+
+    def ticker(self, row):
+        return self.tickers[self.rows[row]]
+
+    def total(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self.positions
+
+    def set_tickers(self, tickers):
+        self.tickers = list(dict.fromkeys(tickers))
+        self.positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.keys = [self.search_key(ticker) for ticker in self.tickers]
+        self.update_order()
+
+    # coins already in the pane are not added again
+    def add_tickers(self, tickers):
+        new = [ticker for ticker in dict.fromkeys(tickers) if ticker not in self.positions]
+        if new:
+            self.set_tickers(self.tickers + new)
+
+    def remove_tickers(self, tickers):
+        tickers = set(tickers)
+        self.set_tickers([ticker for ticker in self.tickers if ticker not in tickers])
+
+    def search_key(self, ticker):
+        entry = self.catalog.get(ticker)
+        return (ticker + ' ' + entry['FullName']).lower() if entry is not None else ticker.lower()
+
+    # sorting and search
+
+    def set_sort(self, mode):
+        self.sort_mode = mode
+        self.update_order()
+
+    # catalog data (ranking, names) changed
+    def refresh(self):
+        self.keys = [self.search_key(ticker) for ticker in self.tickers]
+        self.update_order()
+
+    def update_order(self):
+        positions = range(len(self.tickers))
+        if self.sort_mode == 'Volume':
+            ranks = [self.entry_value(ticker, 'Rank') for ticker in self.tickers]
+            self.order = sorted(positions, key=lambda i: (ranks[i] is None, ranks[i] or 0))
+        elif self.sort_mode == 'Market Cap':
+            caps = [self.entry_value(ticker, 'MarketCap') for ticker in self.tickers]
+            self.order = sorted(positions, key=lambda i: (caps[i] is None, -(caps[i] or 0)))
+        elif self.sort_mode == 'Name':
+            self.order = sorted(positions, key=lambda i: self.tickers[i])
+        else:
+            self.order = list(positions)
+        self.matches = []
+        self.set_filter(self.query, narrow=False)
+
+    def entry_value(self, ticker, field):
+        entry = self.catalog.get(ticker)
+        return entry[field] if entry is not None else None
+
+    # shows the coins whose ticker or full name contains text
+    def set_filter(self, text, narrow=True):
+        query = text.strip().lower()
+        if narrow and self.query and query.startswith(self.query):
+            candidates = self.matches
+        else:
+            candidates = self.order
+        keys = self.keys
+        self.matches = [i for i in candidates if query in keys[i]] if query else list(self.order)
+        self.query = query
+        tickers = self.tickers
+        first = [i for i in self.matches if tickers[i].lower().startswith(query)]
+        if len(first) < len(self.matches):
+            starts = set(first)
+            first += [i for i in self.matches if i not in starts]
+        self.beginResetModel()
+        self.rows = first
+        self.loaded = min(FETCH_BATCH, len(self.rows))
+        self.endResetModel()
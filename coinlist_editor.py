@@ -2,13 +2,13 @@ from PyQt5.QtWidgets import QComboBox, QLabel, QHBoxLayout, QVBoxLayout, QWidget
 from PyQt5 import QtCore
 from PyQt5.QtGui import QIcon, QPixmap, QImage, QColor
 
-import json
-import os
-import requests
-
 import matplotlib._color_data as mcd
 
-from list_widget import ThumbListWidget
+from list_widget import ThumbListWidget, CoinListView
+from coin_model import CoinListModel, SORT_MODES
+from config_service import get_config
+from coin_catalog import get_catalog
+from logo_pipeline import get_logo_pipeline
 
 
 ########################
@@ -22,47 +22,6 @@ def check_color(color_name):
         return False
 
 
-def get_top_coins(top=10):
-    # build URL and call api
-    URL = 'https://min-api.cryptocompare.com/data/top/totalvol?limit=' + str(top) + '&tsym=BTC'
-    #print(f'Fetching URL: {URL}')
-    try:
-        r = requests.get(URL)
-        tickerData = r.json()
-        volumeData = tickerData["Data"]
-        return volumeData
-
-    except Exception as e:
-        print(e)
-        volumeData = {}
-        return volumeData
-
-
-# load all coin list from config files
-def load_coin_lists_from_file():
-    # load all coins lists
-    with open('all_coins_colors.txt') as json_file:
-        allCoins = json.load(json_file)
-
-    # load coinList names and data
-    all_coin_lists_names = []
-    all_coin_lists = []
-    all_coin_lists_dict = {}
-
-    try:
-        with open('coin_lists.txt') as json_file:
-            clist_data = json.load(json_file)
-            all_coin_lists_dict = clist_data  # needed for customization in settings mode
-        for listname in clist_data:
-            all_coin_lists_names.append(listname)
-            all_coin_lists.append(clist_data[listname])
-
-    except Exception:
-        print("could not load config files!")
-
-    return allCoins, all_coin_lists_names, all_coin_lists, all_coin_lists_dict
-
-
 ##################
 #  EDITOR CLASS  #
 ##################
@@ -76,12 +35,19 @@ class CoinListEditor(QWidget):
 
         self.coinListIndex = coinListIndex
 
-        # read all coin lists from file
-        self.allCoins, self.all_coin_lists_names, self.all_coin_lists, self.all_coin_lists_dict = load_coin_lists_from_file()
-        self.coinList = self.all_coin_lists[self.coinListIndex]
+        # coin colors and lists are shared with the main window (config service), every change is saved by it
+        self.config = get_config()
+        self.config.lists_changed.connect(self.on_lists_changed)
+        self.coinList = self.config.coin_lists()[self.coinListIndex]
 
-        # get con infos top 150 by volume
-        self.all_coin_infos = get_top_coins(100)
+        # coin infos come from the catalog on disk, an outdated catalog is refreshed in the background
+        self.catalog = get_catalog()
+        self.catalog.updated.connect(self.on_coin_infos)
+        self.load_all_coins = False     # fill the list of available coins with the catalog when it arrives
+        # logos are loaded in the background, the one of the selected coin is shown when it arrives
+        self.logos = get_logo_pipeline()
+        self.logos.logo_ready.connect(self.on_logo_ready)
+        self.logo_ticker = None
 
         self.dark_mode = dark_mode
 
@@ -110,7 +76,7 @@ class CoinListEditor(QWidget):
 
         # drop down menu
         self.seleComboBox = QComboBox(self)
-        for list in self.all_coin_lists_names:
+        for list in self.config.list_names():
             self.seleComboBox.addItem(list)
         self.seleComboBox.setMaximumWidth(200)
         # connect drop down menu
@@ -133,30 +99,43 @@ class CoinListEditor(QWidget):
         TextRight.setText("Coins in the current List:")
         listsTextBox.addWidget(TextRight)
 
+        # search and sort the available coins
+        searchBox = QHBoxLayout()
+        self.searchEdit = QLineEdit()
+        self.searchEdit.setPlaceholderText("Search coins...")
+        self.searchEdit.setClearButtonEnabled(True)
+        self.searchEdit.setMaximumWidth(200)
+        self.sortComboBox = QComboBox(self)
+        self.sortComboBox.addItems(SORT_MODES)
+        self.sortComboBox.setMaximumWidth(120)
+        searchBox.addWidget(self.searchEdit)
+        searchBox.addWidget(self.sortComboBox)
+        searchBox.addWidget(QSplitter())
+
         listsBox = QHBoxLayout()
-        self.listWidgetA = ThumbListWidget(self)
-        self.listWidgetA.setAcceptDrops(True)
-        for coin in self.allCoins:
-            item = QListWidgetItem(coin, self.listWidgetA)
+        # available coins: the master list or all coins of the catalog (thousands), only visible rows are drawn
+        self.coinModelA = CoinListModel(self.config.coins, self)
+        self.listViewA = CoinListView(self)
+        self.listViewA.setModel(self.coinModelA)
         self.listWidgetB = ThumbListWidget(self)
         self.listWidgetB.setAcceptDrops(True)
         self.listWidgetB.setContextMenuPolicy(QtCore.Qt.ActionsContextMenu)
         #self.listWidgetB.setAlternatingRowColors (True)
         if self.dark_mode:
-            self.listWidgetA.setStyleSheet("""QListWidget{background: #595959;}""")
+            self.listViewA.setStyleSheet("""QListView{background: #595959;}""")
             self.listWidgetB.setStyleSheet("""QListWidget{background: #595959;}""")
         else:
-            self.listWidgetA.setStyleSheet("""QListWidget{background: gainsboro;}""")
+            self.listViewA.setStyleSheet("""QListView{background: gainsboro;}""")
             self.listWidgetB.setStyleSheet("""QListWidget{background: gainsboro;}""")
 
-        listsBox.addWidget(self.listWidgetA)
+        listsBox.addWidget(self.listViewA)
         listsBox.addWidget(self.listWidgetB)
 
         # create some text below
         infoTextBelow = QHBoxLayout()
 
         self.infoTextLeft = QLabel()
-        self.infoTextLeft.setText("Number of coins: " + str(len(self.allCoins)))
+        self.infoTextLeft.setText("Number of coins: " + str(self.coinModelA.total()))
         infoTextBelow.addWidget(self.infoTextLeft)
 
         self.infoTextRight = QLabel()
@@ -166,7 +145,7 @@ class CoinListEditor(QWidget):
         # buttons to edit the master list
         masterButtonsBox = QHBoxLayout()
         addCoinMasterButt = QPushButton("Add One Coin")
-        loadCoinsMasterButt = QPushButton("Load Top Coins")
+        loadCoinsMasterButt = QPushButton("Load All Coins")
         delCoinMasterButt = QPushButton("Remove Coin(s)")
 
         # buttons for the editing list
@@ -207,6 +186,7 @@ class CoinListEditor(QWidget):
         # add all elements to the layout
         mainVerticalLayout.addLayout(listSeleBox)
         mainVerticalLayout.addLayout(listsTextBox)
+        mainVerticalLayout.addLayout(searchBox)
         mainVerticalLayout.addLayout(listsBox)
         mainVerticalLayout.addLayout(infoTextBelow)
         mainVerticalLayout.addLayout(masterButtonsBox)
@@ -227,9 +207,11 @@ class CoinListEditor(QWidget):
         delCoinMasterButt.clicked.connect(self.del_coins_master)
 
         # connect list widgets
-        self.listWidgetA.itemDoubleClicked.connect(self.add_coin_color_to_list)
-        self.listWidgetA.itemClicked.connect(self.update_coin_infos)
-        self.listWidgetA.itemChanged.connect(self.update_coin_infos)
+        self.listViewA.doubleClicked.connect(self.add_coin_color_to_list)
+        self.listViewA.selectionModel().currentChanged.connect(self.update_coin_infos)
+        self.listViewA.verticalScrollBar().valueChanged.connect(self.prefetch_logos)
+        self.searchEdit.textChanged.connect(self.search_coins)
+        self.sortComboBox.activated[str].connect(self.sort_coins)
         self.listWidgetB.itemChanged.connect(self.update_coin_infos)
 
         # select current list to be edited
@@ -237,178 +219,154 @@ class CoinListEditor(QWidget):
 
         self.setLayout(mainVerticalLayout)
 
-        #self.listWidgetA.setCurrentItem("BTC")
         self.update_coin_infos()
 
         self.show()
 
     def update_coin_infos(self):
         # update coin infos
-        try:
-            coin_ticker = self.listWidgetA.currentItem().text()
-        except AttributeError:
-            coin_ticker = 'BTC'
-        coin_infos_str = ""
-        for item in self.all_coin_infos:
-            if item["CoinInfo"]["Name"] == coin_ticker:
-                try:
-                    coin_infos = item["CoinInfo"]
-                    # print(coin_infos)
-                    coin_infos_str += "Coin: " + item["CoinInfo"]["Name"] + "\n"
-                    coin_infos_str += "Full Name: " + item["CoinInfo"]["FullName"] + "\n"
-                    coin_infos_str += "Algorithm: " + item["CoinInfo"]["Algorithm"] + "\n"
-                    coin_infos_str += "Prooftype: " + item["CoinInfo"]["ProofType"] + "\n"
-                    coin_infos_str += "Blocktime: " + str(item["CoinInfo"]["BlockTime"]) + "\n"
-                    coin_infos_str += "Blockreward: " + str(item["CoinInfo"]["BlockReward"]) + "\n"
-                    coin_infos_str += "Supply: " + str(item["ConversionInfo"]["Supply"]) + "\n"
-                    coin_infos_str += "Volume 24H: " + str(item["ConversionInfo"]["TotalVolume24H"]) + "\n"
-                except Exception as e:
-                    print(f"Error retrieving coin infos ({e})")
-
-                self.coinInfoText.setText(str(coin_infos_str))
-
-                # get coin logo for selected ticker
-                # get image and save to logos folder
-                url_file_name = coin_infos["ImageUrl"]
-                extension = os.path.splitext(url_file_name)[1]
-                if os.path.exists('logos/' + coin_ticker + extension):
-                    pass
-                    # print (coin_ticker+extension, " exists!")
-                else:
-                    # print ("Fetching: ", url_file_name)
-                    url = 'https://www.cryptocompare.com'
-                    full_url = url + url_file_name
-                    # print(full_url)
-                    response = requests.get(full_url)
-                    with open('logos/' + coin_ticker + extension, 'wb') as out_file:
-                        out_file.write(response.content)
-                    del response
-
-                # load the image
-                pixmap = QPixmap('logos/' + coin_ticker + extension)
-                pixmap_resized = pixmap.scaledToWidth(128)
-
-                # pixmap = QPixmap()
-                # image = QImage()
-                # image.load('logos/' + coin_ticker + extension)
-                # qimg = image.convertToFormat(QImage.Format_RGB888)
-                # pixmap.convertFromImage(qimg)
-                self.coin_logo.setPixmap(pixmap_resized)
-                # self.coin_logo.setPixmap (pixmap)
-                # self.coin_logo.show ()
+        coin_ticker = self.current_coin() or 'BTC'
+        coin_infos = self.catalog.get(coin_ticker)
+        if coin_infos is not None:
+            coin_infos_str = ""
+            coin_infos_str += "Coin: " + coin_infos["Name"] + "\n"
+            coin_infos_str += "Full Name: " + coin_infos["FullName"] + "\n"
+            coin_infos_str += "Algorithm: " + coin_infos["Algorithm"] + "\n"
+            coin_infos_str += "Prooftype: " + coin_infos["ProofType"] + "\n"
+            coin_infos_str += "Blocktime: " + str(coin_infos["BlockTime"]) + "\n"
+            coin_infos_str += "Blockreward: " + str(coin_infos["BlockReward"]) + "\n"
+            coin_infos_str += "Supply: " + str(coin_infos["Supply"] if coin_infos["Supply"] is not None else "N/A") + "\n"
+            coin_infos_str += "Volume 24H: " + str(coin_infos["Volume24H"] if coin_infos["Volume24H"] is not None else "N/A") + "\n"
+            self.coinInfoText.setText(coin_infos_str)
+
+            # logo of the selected coin, shown by on_logo_ready if it is not loaded yet
+            self.logo_ticker = coin_ticker
+            pixmap = self.logos.pixmap(coin_ticker)
+            if pixmap is not None:
+                self.coin_logo.setPixmap(pixmap)
+            else:
+                self.coin_logo.clear()
+
+    # slot for LogoPipeline.logo_ready
+    def on_logo_ready(self, ticker):
+        if ticker == self.logo_ticker:
+            self.coin_logo.setPixmap(self.logos.pixmap(ticker))
+
+    # POST: ticker of the current coin in the available coins or None
+    def current_coin(self):
+        index = self.listViewA.currentIndex()
+        return self.coinModelA.ticker(index.row()) if index.isValid() else None
+
+    # loads the logos of the current list and of the visible available coins in the background
+    def prefetch_logos(self):
+        tickers = [self.listWidgetB.item(i).text() for i in range(self.listWidgetB.count())]
+        viewport = self.listViewA.viewport().rect()
+        first = self.listViewA.indexAt(viewport.topLeft())
+        if first.isValid():
+            last = self.listViewA.indexAt(viewport.bottomLeft())
+            last_row = last.row() if last.isValid() else self.coinModelA.rowCount() - 1
+            tickers += [self.coinModelA.ticker(row) for row in range(first.row(), last_row + 1)]
+        self.logos.prefetch(tickers)
+
+    def search_coins(self, text):
+        self.coinModelA.set_filter(text)
+        self.update_infos()
+        self.prefetch_logos()
+
+    def sort_coins(self, mode):
+        self.coinModelA.set_sort(mode)
+        self.prefetch_logos()
 
     def del_coins_master(self):
         reply = QMessageBox.question(self, 'Coin List Management', "Delete coin(s) from master file?", QMessageBox.Ok)
         if reply:
-            listItems = self.listWidgetA.selectedItems()
-            for item in listItems:
-                self.listWidgetA.takeItem(self.listWidgetA.row(item))
-                if item.text() in self.allCoins:
-                    del self.allCoins[item.text()]
+            tickers = [self.coinModelA.ticker(index.row()) for index in self.listViewA.selectedIndexes()]
+            self.coinModelA.remove_tickers(tickers)
+            self.config.remove_coins(tickers)
         self.update_infos()
-        # overwrite current master file
-        with open('all_coins_colors.txt', 'w') as outfile:
-            json.dump(self.allCoins, outfile)
-        self.allCoins, self.all_coin_lists_names, self.all_coin_lists, self.all_coin_lists_dict = load_coin_lists_from_file()
 
     def add_coin_color_to_list(self):  # add/modify coin color and save it to master list
-        current_coin = self.listWidgetA.currentItem().text()
+        current_coin = self.current_coin()
+        if current_coin is None:
+            return
         # open dialog
         possible_colors = mcd.CSS4_COLORS
         text, okPressed = QInputDialog.getItem(self, "Get item", "Color:", possible_colors, 3, False)
 
         if okPressed and text != '':
             current_coin_color = text
-            # check if color is accepted by matplotlib
-            # retrieve current coins from editing list, covert to dict and add coresponding colors found in allCoins
-            new_entry = {current_coin: current_coin_color}
-            self.allCoins.update(new_entry)
-            # overwrite current master file
-            with open('all_coins_colors.txt', 'w') as outfile:
-                json.dump(self.allCoins, outfile)
+            # the color is set in the master list and in all coin lists containing the coin
+            self.config.set_coin_color(current_coin, current_coin_color)
             QMessageBox.question(self, 'GUI Message', "Coin and color updated in master list ", QMessageBox.Ok)
-            with open('coin_lists.txt') as json_file:
-                clist_data = json.load(json_file)
-                for clist in clist_data:
-                    print(clist_data[clist])
-                    if current_coin in clist_data[clist]:
-                        clist_data[clist][current_coin] = current_coin_color
-                        print(f"Coin color set in coinlist {clist} custom coinlists file")
-
-            self.allCoins, self.all_coin_lists_names, self.all_coin_lists, self.all_coin_lists_dict = load_coin_lists_from_file()
 
     def add_one_coin(self):
         text, okPressed = QInputDialog.getText(self, "Coin List Management",
                                                "Add one coin (Cryptocompare.com Ticker): ", QLineEdit.Normal, "")
         if okPressed and text != '':
-            self.listWidgetA.addItem(text.upper())
+            self.coinModelA.add_tickers([text.upper()])
         self.update_infos()
 
+    # slot for CoinCatalog.updated
+    def on_coin_infos(self):
+        self.coinModelA.refresh()
+        self.update_coin_infos()
+        self.prefetch_logos()
+        if self.load_all_coins:
+            self.load_all_coins = False
+            self.load_coins_web()
+
     def load_coins_web(self):
-        self.listWidgetA.clear()
-        data = get_top_coins(100)
-        new_ticker_list = []
-        for i in range(len(data)):
-            new_ticker_list.append(data[i]["CoinInfo"]["Name"])
-        for ticker in new_ticker_list:
-            all_items_in_list = []
-            for index in range(self.listWidgetA.count()):
-                all_items_in_list.append(self.listWidgetA.item(index).text())
-            #if not ticker in all_items_in_list:
-            self.listWidgetA.addItem(ticker)
+        if not len(self.catalog):
+            # catalog not loaded (yet), the list is filled when it arrives
+            self.load_all_coins = True
+            self.catalog.refresh()
+            return
+        self.coinModelA.set_tickers(entry['Name'] for entry in self.catalog.entries)
         self.update_infos()
+        self.prefetch_logos()
 
     def add_list(self):
         text, okPressed = QInputDialog.getText(self, "Coin List Management", "New List: ", QLineEdit.Normal, "")
         if okPressed and text != '':
             print("New list " + text + " was created.")
-            new_lists_dict = self.all_coin_lists_dict
-            # append the new list
-            new_entry = {text: {}}
-            new_lists_dict.update(new_entry)
-            # update combobox and class variables concerning coin lists
-            with open('coin_lists.txt', 'w') as outfile:
-                json.dump(new_lists_dict, outfile)
-                # QMessageBox.information (self, 'Coin List Management', "New list created!")
-            self.seleComboBox.addItem(text)
-            self.allCoins, self.all_coin_lists_names, self.all_coin_lists, self.all_coin_lists_dict = load_coin_lists_from_file()
-            self.seleComboBox.setCurrentIndex(self.seleComboBox.count() - 1)
+            # append the new list (the drop down menu is updated by on_lists_changed)
+            self.config.add_list(text)
+            self.seleComboBox.setCurrentIndex(self.config.list_names().index(text))
             self.listWidgetB.clear()
-            self.listChoice(self.seleComboBox.count() - 1)
+            self.listChoice(self.seleComboBox.currentIndex())
 
     def remove_list(self):
-        if len(self.all_coin_lists) < 2:
+        if len(self.config.lists) < 2:
             QMessageBox.information(self, 'Coin List Management', 'You need at least one list')
         else:
             reply = QMessageBox.question(self, 'Coin List Management',
-                                         "Remove list: " + str(self.all_coin_lists_names[self.coinListIndex]),
+                                         "Remove list: " + str(self.config.list_names()[self.coinListIndex]),
                                          QMessageBox.Yes |
                                          QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.Yes:
-                new_lists_dict = self.all_coin_lists_dict
-                # remove current list
-                current_list_name = self.all_coin_lists_names[self.seleComboBox.currentIndex()]
-                del new_lists_dict[current_list_name]
+                # remove current list (the drop down menu is updated by on_lists_changed)
+                index = self.seleComboBox.currentIndex()
+                current_list_name = self.config.list_names()[index]
+                self.config.remove_list(current_list_name)
                 print(current_list_name, "deleted!")
-                print("New list dict: ", new_lists_dict)
-                # update combobox and class variables concerning coin lists
-                with open('coin_lists.txt', 'w') as outfile:
-                    json.dump(new_lists_dict, outfile)
-                print('List removed for ever!')
-                self.seleComboBox.removeItem(self.coinListIndex)
-                self.allCoins, self.all_coin_lists_names, self.all_coin_lists, self.all_coin_lists_dict = load_coin_lists_from_file()
+                self.seleComboBox.setCurrentIndex(max(index - 1, 0))
+                self.listChoice(self.seleComboBox.currentIndex())
 
-                self.listChoice(self.coinListIndex - 1)
+    # selects the list to edit if another coin list was chosen in the main window
+    def set_coin_list_index(self, index):
+        if index != self.coinListIndex and index < len(self.config.lists):
+            self.seleComboBox.setCurrentIndex(index)
+            self.listChoice(index)
 
     def listChoice(self, item):
         # print('List', item, 'selected for edition.')
         self.clearList()
-        self.currentListToEdit = self.all_coin_lists[item]
+        self.currentListToEdit = self.config.coin_lists()[item]
         for coin in self.currentListToEdit:
             item = QListWidgetItem(coin, self.listWidgetB)
         self.coinListIndex = self.seleComboBox.currentIndex()
-        self.coinListIndex = self.coinListIndex
         self.update_infos()
+        self.prefetch_logos()
 
     def update_infos(self):
         # print('List changed!')
@@ -416,7 +374,9 @@ class CoinListEditor(QWidget):
             self.infoTextRight.setStyleSheet('color: red')
         else:
             self.infoTextRight.setStyleSheet('color: black')
-        self.infoTextLeft.setText("Number of coins: " + str(self.listWidgetA.count()))
+        shown = len(self.coinModelA.rows)
+        total = self.coinModelA.total()
+        self.infoTextLeft.setText("Number of coins: " + (str(total) if shown == total else f"{shown} of {total}"))
         self.infoTextRight.setText("Number of coins: " + str(self.listWidgetB.count()))
 
     def deleteItem(self):
@@ -435,45 +395,41 @@ class CoinListEditor(QWidget):
         self.update_infos()
 
     def saveList(self):
-        # retrieve current coins from editing list, covert to dict and add coresponding colors found in allCoins
+        # retrieve current coins from editing list
         num_items = self.listWidgetB.count()
         list2save = []
         for i in range(num_items):
             list2save.append(self.listWidgetB.item(i).text())
-        name_current_list = self.all_coin_lists_names[self.coinListIndex]
-        new_lists_dict = self.all_coin_lists_dict
+        name_current_list = self.config.list_names()[self.coinListIndex]
 
         if len(list2save) > 12:
             QMessageBox.question(self, 'Coin List Management',
                                  "Sorry, max. 12 coins per list! \nRemove items from list to save it.",
                                  QMessageBox.Ok, QMessageBox.Ok)
         else:
-            # create dictionary (coin:color pairs) of currently modified list
-            dict_list2save = dict.fromkeys(list2save)
-            for key in dict_list2save:
-                try:
-                    dict_list2save[key] = self.allCoins[key]
-                except KeyError:
-                    dict_list2save[
-                        key] = "gray"  # set default color for new coins (i.e. not present in master coinlist)
-
-            # overwrite current list
-            new_lists_dict[name_current_list] = dict_list2save
-
-            with open('coin_lists.txt', 'w') as outfile:
-                json.dump(new_lists_dict, outfile)
+            # overwrite current list, colors are taken from the master list (gray for new coins)
+            # the main window is notified by the config service and refreshes if it shows this list
+            self.config.save_list(name_current_list, list2save)
             QMessageBox.question(self, 'GUI Message', "Current list saved! ", QMessageBox.Ok)
-            self.allCoins, self.all_coin_lists_names, self.all_coin_lists, self.all_coin_lists_dict = load_coin_lists_from_file()
 
-            self.parent.reload_coinlist_files()
-            self.parent.refresh_data_and_graphs()
+    # slot for ConfigService.lists_changed: list names in the drop down menu (the list being edited is kept)
+    def on_lists_changed(self):
+        names = self.config.list_names()
+        if names == [self.seleComboBox.itemText(i) for i in range(self.seleComboBox.count())]:
+            return
+        current = self.seleComboBox.currentText()
+        self.seleComboBox.clear()
+        self.seleComboBox.addItems(names)
+        if current in names:
+            self.seleComboBox.setCurrentIndex(names.index(current))
+        self.coinListIndex = self.seleComboBox.currentIndex()
 
     def set_color_mode(self, dark_mode):
         if dark_mode:
-            self.listWidgetA.setStyleSheet("""QListWidget{background: #595959;} QListWidget::item:selected { background: #444444}""")
+            self.listViewA.setStyleSheet("""QListView{background: #595959;} QListView::item:selected { background: #444444}""")
             self.listWidgetB.setStyleSheet("""QListWidget{background: #595959;} QListWidget::item:selected { background: #444444}""")
             self.dark_mode = True
         else:
-            self.listWidgetA.setStyleSheet("""QListWidget{background: gainsboro;} QListWidget::item:selected { background: lightgrey}""")
+            self.listViewA.setStyleSheet("""QListView{background: gainsboro;} QListView::item:selected { background: lightgrey}""")
             self.listWidgetB.setStyleSheet("""QListWidget{background: gainsboro;} QListWidget::item:selected { background: lightgrey}""")
             self.dark_mode = False
@@ -0,0 +1,167 @@
+import os
+import json
+
+from PyQt5.QtCore import QObject, QTimer, QFileSystemWatcher, QCoreApplication, pyqtSignal
+
+########################
+##  Global variables  ##
+########################
+
+COINS_FILE = 'all_coins_colors.txt'     # master list: coin -> color
+LISTS_FILE = 'coin_lists.txt'           # coin lists: name -> {coin: color}
+WRITE_DELAY = 500                       # ms, changes within this time are written to disk together
+DEFAULT_COLOR = 'gray'                  # color of coins that are not in the master list
+
+_config = None
+
+
+# returns the shared config service, created (and loaded) on first use
+def get_config():
+    global _config
+    if _config is None:
+        _config = ConfigService()
+    return _config
+
+
+# PRE: text is the new content of path
+# writes to a temporary file first, readers never see a half written file
+def write_atomic(path, text):
+    with open(path + '.tmp', 'w') as outfile:
+        outfile.write(text)
+    os.replace(path + '.tmp', path)
+
+
+################################
+##### CONFIG SERVICE CLASS #####
+################################
+
+# Coin colors and coin lists of all windows, loaded once and shared in memory
+# Every change is applied in memory and announced right away, the files are written after WRITE_DELAY so a burst
+# of edits costs one write per file; edits of the files by other programs are loaded and announced as well
+# Lists are replaced and never modified in place, a list handed out stays unchanged (compare to detect changes)
+class ConfigService(QObject):
+
+    coins_changed = pyqtSignal()    # master list (coins or colors)
+    lists_changed = pyqtSignal()    # coin lists (names or content)
+
+    def __init__(self, coins_file=COINS_FILE, lists_file=LISTS_FILE, parent=None):
+        super(ConfigService, self).__init__(parent)
+        self.coins_file = coins_file
+        self.lists_file = lists_file
+        self.coins = {}
+        self.lists = {}
+        self.pending = set()        # files with unsaved changes
+        self.written = {}           # file -> text of our last write (the watcher reports our own writes too)
+
+        self.write_timer = QTimer(self)
+        self.write_timer.setSingleShot(True)
+        self.write_timer.timeout.connect(self.flush)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.flush)
+
+        self.coins = self.read(self.coins_file, {})
+        self.lists = self.read(self.lists_file, {})
+        print("config files loaded")
+        self.watch()
+
+    def read(self, path, default):
+        try:
+            with open(path) as json_file:
+                return json.load(json_file)
+        except (OSError, ValueError) as e:
+            print(f"ERROR loading config file {path} ({e})")
+            return default
+
+    # files replaced by a rename drop out of the watcher, they are added again after every change
+    def watch(self):
+        paths = [p for p in (self.coins_file, self.lists_file) if os.path.exists(p)]
+        missing = [p for p in paths if p not in self.watcher.files()]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    # list access by index (order of the lists file), as used by the drop down menus
+    def list_names(self):
+        return list(self.lists)
+
+    def coin_lists(self):
+        return list(self.lists.values())
+
+    def color(self, coin):
+        return self.coins.get(coin, DEFAULT_COLOR)
+
+    # changes, applied in memory, announced and written after WRITE_DELAY
+
+    # sets the color of a coin in the master list and in every list containing it
+    def set_coin_color(self, coin, color):
+        self.coins = dict(self.coins, **{coin: color})
+        self.changed(self.coins_file)
+        if any(coin in coins for coins in self.lists.values()):
+            self.lists = {name: dict(coins, **{coin: color}) if coin in coins else coins
+                          for name, coins in self.lists.items()}
+            self.changed(self.lists_file)
+
+    def remove_coins(self, coins):
+        self.coins = {coin: color for coin, color in self.coins.items() if coin not in coins}
+        self.changed(self.coins_file)
+
+    def add_list(self, name):
+        self.lists = dict(self.lists, **{name: {}})
+        self.changed(self.lists_file)
+
+    def remove_list(self, name):
+        self.lists = {n: coins for n, coins in self.lists.items() if n != name}
+        self.changed(self.lists_file)
+
+    # PRE: coins is a list of tickers, their colors are taken from the master list
+    def save_list(self, name, coins):
+        self.lists = dict(self.lists, **{name: {coin: self.color(coin) for coin in coins}})
+        self.changed(self.lists_file)
+
+    def changed(self, path):
+        self.pending.add(path)
+        self.write_timer.start(WRITE_DELAY)
+        if path == self.coins_file:
+            self.coins_changed.emit()
+        else:
+            self.lists_changed.emit()
+
+    # writes all pending changes (also called when the app quits)
+    def flush(self):
+        self.write_timer.stop()
+        for path in sorted(self.pending):
+            data = self.coins if path == self.coins_file else self.lists
+            text = json.dumps(data)
+            try:
+                write_atomic(path, text)
+                self.written[path] = text
+            except OSError as e:
+                print(f"ERROR writing config file {path} ({e})")
+        self.pending.clear()
+        self.watch()
+
+    # slot for QFileSystemWatcher.fileChanged: reloads files changed by other programs
+    def on_file_changed(self, path):
+        self.watch()
+        try:
+            with open(path) as json_file:
+                text = json_file.read()
+        except OSError:
+            return
+        if text == self.written.get(path) or path in self.pending:
+            return
+        try:
+            data = json.loads(text)
+        except ValueError:
+            # probably still being written, the next change event brings the complete file
+            return
+        self.written[path] = text
+        print(f"config file {path} changed on disk, reloaded")
+        if path == self.coins_file:
+            self.coins = data
+            self.coins_changed.emit()
+        else:
+            self.lists = data
+            self.lists_changed.emit()
@@ -0,0 +1,248 @@
+from collections import deque
+
+import numpy as np
+
+########################
+##  Global variables  ##
+########################
+
+CORRELATION_METHODS = ['pearson', 'spearman']
+
+
+########################
+##  Helper functions  ##
+########################
+
+# PRE: coins x time matrix of close prices (NaN for missing candles)
+# POST: coins x (time-1) matrix of log returns, non positive prices count as missing
+def log_returns(prices):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logs = np.log(np.where(prices > 0, prices, np.nan))
+    return np.diff(logs, axis=1)
+
+
+# PRE: rows of values (time on the last axis)
+# POST: (order, first, last): stable argsort of every row (NaN last) and for every sorted position the first and last
+# sorted position of its run of equal values
+def sorted_runs(values):
+    order = np.argsort(values, axis=-1, kind='stable')
+    ordered = np.take_along_axis(values, order, axis=-1)
+    positions = np.broadcast_to(np.arange(values.shape[-1]), values.shape)
+    starts = np.ones(values.shape, dtype=bool)
+    starts[..., 1:] = ordered[..., 1:] != ordered[..., :-1]
+    ends = np.ones(values.shape, dtype=bool)
+    ends[..., :-1] = starts[..., 1:]
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=-1)
+    last = np.minimum.accumulate(np.where(ends, positions, values.shape[-1])[..., ::-1], axis=-1)[..., ::-1]
+    return order, first, last
+
+
+# PRE: sorted runs of rows (see sorted_runs), member marks the ranked values (broadcast against the rows, e.g. one
+# subset of the columns for all rows), NaN values are never members
+# POST: average ranks among the members (ties get the mean of their ranks), NaN for the other values
+# the ranks over any subset come from the one sort of the rows (counts of the members before every sorted position)
+def subset_ranks(order, first, last, member):
+    member_sorted = np.take_along_axis(member, order, axis=-1)
+    counts = np.cumsum(member_sorted, axis=-1)
+    before = np.take_along_axis(counts - member_sorted, first, axis=-1)
+    ties = np.take_along_axis(counts, last, axis=-1) - before
+    ranks = np.empty(member_sorted.shape)
+    np.put_along_axis(ranks, np.broadcast_to(order, ranks.shape),
+                      np.where(member_sorted, before + (ties + 1) / 2.0, np.nan), axis=-1)
+    return ranks
+
+
+# average ranks of every row (ties get the mean of their ranks), NaN stays NaN and is ranked after the valid values
+def rank_rows(values):
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return values.copy()
+    return subset_ranks(*sorted_runs(values), np.isfinite(values))
+
+
+# PRE: coins x time matrix, NaN marks missing values
+# POST: coins x coins correlation matrix, every pair over the columns where both coins are valid (pairwise complete),
+# so a coin with a short history only shortens its own pairs; pairs with less than 2 common values are 0.0,
+# the diagonal is 1.0
+# spearman ranks both coins of a pair over their common columns, then correlates the ranks like pearson
+def correlation_matrix(values, method='pearson'):
+    values = np.asarray(values, dtype=np.float64)
+    if method == 'spearman':
+        return spearman_matrix(values)
+    finite = np.isfinite(values)
+    mask = finite.astype(np.float64)
+    # centered per coin (correlation is shift invariant), keeps the sums below small for big price levels
+    x = np.where(finite, values, 0.0)
+    centers = x.sum(axis=1) / np.maximum(mask.sum(axis=1), 1)
+    x = np.where(finite, x - centers[:, None], 0.0)
+
+    # sums over the common columns of every pair (i, j): count, sum of x_i, sum of x_i^2, sum of x_i * x_j
+    counts = mask @ mask.T
+    sums = x @ mask.T
+    squares = (x * x) @ mask.T
+    products = x @ x.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = products - sums * sums.T / counts
+        var = squares - sums * sums / counts
+        corr = cov / np.sqrt(var * var.T)
+    corr[~np.isfinite(corr) | (counts < 2)] = 0.0
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+# PRE: coins x time matrix, NaN marks missing values
+# POST: spearman correlation of every pair over its common columns, pairs with less than 2 common values are 0.0
+# coins with the same valid columns (usually all coins with a full window) form a group, the coins of a group are
+# ranked over their common columns with the coins of every other group at once (about one coins x time matrix
+# at a time), the rows are sorted only once
+def spearman_matrix(values):
+    n = len(values)
+    finite = np.isfinite(values)
+    patterns, groups = np.unique(finite, axis=0, return_inverse=True)
+    groups = groups.reshape(-1)
+    members = [np.flatnonzero(groups == group) for group in range(len(patterns))]
+    order, first, last = sorted_runs(values)
+    corr = np.zeros((n, n))
+    for a, rows in enumerate(members):
+        step = max(1, n // len(rows))
+        for chunk in range(a, len(patterns), step):
+            others = members[chunk:chunk + step]
+            commons = patterns[a] & patterns[chunk:chunk + step]
+            # ranks of group a over the columns it has in common with every other group: groups x rows x time
+            ranks = standardized(subset_ranks(order[rows][None], first[rows][None], last[rows][None], commons[:, None]),
+                                 commons[:, None])
+            other_rows = np.concatenate(others)
+            sizes = [len(m) for m in others]
+            other_commons = np.repeat(commons, sizes, axis=0)
+            other_ranks = standardized(subset_ranks(order[other_rows], first[other_rows], last[other_rows], other_commons),
+                                       other_commons)
+            offsets = np.cumsum([0] + sizes)
+            block = np.concatenate([ranks[i] @ other_ranks[offsets[i]:offsets[i + 1]].T for i in range(len(others))],
+                                   axis=1)
+            corr[np.ix_(rows, other_rows)] = block
+            corr[np.ix_(other_rows, rows)] = block.T
+    corr[~np.isfinite(corr)] = 0.0
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+# PRE: ranks of the members (see subset_ranks)
+# POST: ranks centered and scaled to unit length per row, 0.0 for the other values (dot products are pearson
+# correlations), rows without spread are NaN
+def standardized(ranks, member):
+    # the average of the ranks 1..m is (m + 1) / 2, also with ties
+    centers = (member.sum(axis=-1, keepdims=True) + 1) / 2.0
+    ranks = np.where(member, ranks - centers, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return ranks / np.sqrt((ranks * ranks).sum(axis=-1, keepdims=True))
+
+
+# POST: order of the coins that puts similar ones next to each other
+# (average linkage hierarchical clustering on 1 - correlation, leaves in merge order)
+def cluster_order(corr):
+    n = len(corr)
+    if n < 3:
+        return np.arange(n)
+    dist = 1.0 - corr.astype(np.float64)
+    np.fill_diagonal(dist, np.inf)
+    members = [[i] for i in range(n)]
+    sizes = np.ones(n)
+    for _ in range(n - 1):
+        i, j = np.unravel_index(np.argmin(dist), dist.shape)
+        if i > j:
+            i, j = j, i
+        # merge cluster j into cluster i, distances are the size weighted average
+        merged = (sizes[i] * dist[i] + sizes[j] * dist[j]) / (sizes[i] + sizes[j])
+        dist[i, :] = merged
+        dist[:, i] = merged
+        dist[i, i] = np.inf
+        dist[j, :] = np.inf
+        dist[:, j] = np.inf
+        members[i] = members[i] + members[j]
+        sizes[i] += sizes[j]
+    return np.array(members[0])
+
+
+#####################################
+##### ROLLING CORRELATION CLASS #####
+#####################################
+
+# Streaming correlation of log returns over a sliding window of candles
+# Keeps running sums and cross products per pair, so a new candle costs O(n^2) instead of a full recompute
+# Missing returns (NaN) count as 0, the last (still open) candle of a frame is only used once it is closed
+class RollingCorrelation:
+
+    RESYNC = 1000   # recompute the running sums from the window every RESYNC candles (float drift)
+
+    def __init__(self, coins, granularity, window=60, history=120):
+        self.coins = list(coins)
+        self.granularity = granularity
+        self.window = window
+        n = len(self.coins)
+        self.buffer = deque()
+        self.sums = np.zeros(n)
+        self.products = np.zeros((n, n))
+        self.last_time = None
+        self.last_close = None
+        self.pushed = 0
+        # (time, correlation matrix) after every candle, used to play the matrix over time
+        self.history = deque(maxlen=history)
+
+    # True if the engine was built for this coin list and candle size
+    def matches(self, coins, granularity):
+        return self.coins == list(coins) and self.granularity == granularity
+
+    def push(self, returns, time=None):
+        returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+        if len(self.buffer) == self.window:
+            old = self.buffer.popleft()
+            self.sums -= old
+            self.products -= np.outer(old, old)
+        self.buffer.append(returns)
+        self.sums += returns
+        self.products += np.outer(returns, returns)
+        self.pushed += 1
+        if self.pushed % self.RESYNC == 0:
+            data = np.array(self.buffer)
+            self.sums = data.sum(axis=0)
+            self.products = data.T @ data
+        if time is not None:
+            self.history.append((time, self.matrix().astype(np.float32)))
+
+    def matrix(self):
+        n = len(self.coins)
+        k = len(self.buffer)
+        if k < 2:
+            return np.eye(n)
+        mean = self.sums / k
+        cov = self.products / k - np.outer(mean, mean)
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        corr[~np.isfinite(corr)] = 0.0
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+    # PRE: a PriceFrame of the same coins and granularity
+    # POST: pushes the closed candles newer than the last pushed one, returns the number of new candles
+    def update(self, price_frame):
+        if price_frame.width() < 2:
+            return 0
+        rows = [price_frame.rows[c] for c in self.coins]
+        closes = price_frame.close[rows]
+        times = price_frame.time[rows].max(axis=0)
+        closed = np.arange(price_frame.width() - 1)
+        if self.last_time is not None:
+            closed = closed[times[closed] > self.last_time]
+        for column in closed:
+            close = closes[:, column]
+            if self.last_close is not None:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    self.push(np.log(close / self.last_close), times[column])
+            # keep the last known price of coins with a missing candle
+            self.last_close = close if self.last_close is None else np.where(np.isfinite(close), close, self.last_close)
+            self.last_time = times[column]
+        return len(closed)
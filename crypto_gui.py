@@ -1,25 +1,41 @@
 import sys
-import requests
+import time as systime
 import datetime as dt
-import json
 import asyncio
-import concurrent.futures
 
-from PyQt5.QtWidgets import QAction, qApp, QMessageBox, QDesktopWidget, QVBoxLayout, QWidget
+import numpy as np
+
+from PyQt5.QtWidgets import QAction, qApp, QMessageBox, QDesktopWidget, QVBoxLayout, QWidget, QLabel
 from PyQt5.QtGui import QIcon, QColor
 from PyQt5.QtCore import QTimer
 from PyQt5 import QtWidgets
 
 from options_menu import ParameterSelector
 from mpl_price_charts import MplPriceChartsCanvas, MplGrowthCanvas, MplCorrelationCanvas
-from coinlist_editor import CoinListEditor
+from sparkline_table import SparklineTable
+from candle_store import get_candle_store, INTERVALS, FIELDS
+from response_cache import ResponseCache
+from resampler import FETCH_LIM, derive, window_start
+from price_frame import PriceFrame, series_nbytes, series_length, slice_series, empty_series
+from correlation import RollingCorrelation
+from http_client import get_http_client, API_URL
+from api_scheduler import PRIORITY_VISIBLE, PRIORITY_PREFETCH
+from price_fetcher import PriceFetcher
+from metrics import get_metrics
+from session_snapshot import load_snapshot, save_snapshot
+from config_service import get_config
 
 ########################
 ##  Global variables  ##
 ########################
 
-# API url
-PRICE_URL = "https://min-api.cryptocompare.com/data/histo"
+# API urls
+PRICE_URL = API_URL + "/data/histo"
+PRICE_MULTI_URL = API_URL + "/data/pricemultifull"     # current price and 24h stats of many coins at once
+# max. length of the comma separated fsyms parameter of pricemultifull (API limit)
+FSYMS_MAX_CHARS = 300
+# fields of a pricemultifull answer kept per coin: current price and 24h stats
+QUOTE_FIELDS = ['PRICE', 'HIGH24HOUR', 'LOW24HOUR', 'VOLUME24HOURTO', 'CHANGEPCT24HOUR']
 
 baseCurrencies = ['EUR', 'USD', 'BTC', 'ETH']
 timeWords = ['1-hour', '1-day', '1-week', '1-month', '3-months', '6-months', '1-year']
@@ -38,8 +54,20 @@ GRID_COL = "grey"
 
 custom_colors = {"BG_COL_D":"#595959", "FACE_COL_D":"#333333", "BG_COL_L":"gainsboro", "FACE_COL_L":"lightgrey", "TITLE_COL":"k", "GRID_COL":"grey"}
 
-# auto refresh timeout
+# auto refresh timeout (shorter for minute candles, see CryptoGui.refresh_interval)
 UPDATE_TIMEOUT = 300000 # 5 min
+# finished candles of the batched refresh are repaired from histo data at most this often (see CryptoGui.repair_candles)
+REPAIR_TIMEOUT = 900000 # 15 min
+# number of candles in the rolling correlations window
+ROLLING_WINDOW = 60
+# refresh interval of the API budget display in the status bar
+BUDGET_TIMEOUT = 2000 # 2 s
+# max. candles per histo request, older history is loaded page by page while zooming out / panning
+HISTORY_PAGE = 2000
+# refresh stages shown in the performance overlay: (span, label)
+METRIC_STAGES = [('network', 'net'), ('parse', 'parse'), ('frame', 'frame'), ('growth', 'growth'),
+                 ('correlation', 'corr'), ('draw_prices', 'charts'), ('draw_growth', 'bars'),
+                 ('draw_correlations', 'matrix'), ('draw_table', 'table')]
 
 ########################
 ##  Helper functions  ##
@@ -47,50 +75,182 @@ UPDATE_TIMEOUT = 300000 # 5 min
 
 
 def getScreenRes():
-    screen_resolution = app.desktop().screenGeometry()
+    screen_resolution = QtWidgets.QApplication.desktop().screenGeometry()
     width, height = screen_resolution.width(), screen_resolution.height()
     return width, height
 
-def load_coin_lists_from_file():
-    # load all coins lists
-    with open('all_coins_colors.txt') as json_file:
-        allCoins = json.load(json_file)
-    # load coinList names and data
-    all_coin_lists = []
-    try:
-        with open('coin_lists.txt') as json_file:
-            clist_data = json.load(json_file)
-        for listname in clist_data:
-            all_coin_lists.append(clist_data[listname])
-        print(f"{get_time_now()}: config files loaded")
-    except Exception:
-        print(f"{get_time_now()}: ERROR loading config files!")
-    return allCoins, all_coin_lists
-
-
 ### ASYNCIO MAGIC for concurrent http requests, use with caution, may trigger API limits ###
-loop = asyncio.get_event_loop()
+# runs on the http client loop, started by the PriceFetcher of the main window
+# progress(coin, series) is called for every coin as soon as its data arrived (progressive drawing)
+# POST: returns a PriceFrame of the coin list, the candles are parsed into columns only once
+async def main(currency, time, lim, coinList, priority=PRIORITY_VISIBLE, progress=None):
+    async def get_coin_prices(coin):
+        series = await get_ticker_prices(coin, currency, time, lim, priority)
+        if progress is not None:
+            progress(coin, series)
+        return series
+
+    price_data = await asyncio.gather(*[get_coin_prices(coin) for coin in coinList])
+    with get_metrics().span('frame'):
+        return PriceFrame.from_series(coinList, price_data, currency, time, lim)
+
+
+# auto refresh tier: one pricemultifull request per FSYMS_MAX_CHARS of tickers moves the frame to the current candle
+# (see PriceFrame.advanced), the patched candles are written through to the candle store and the cached series
+# when a candle was finished, the candle appended by advanced is kept (no histo requests), the finished candles get
+# their real OHLCV from the next repair batch (see repair_candles)
+# coins missing in the answer get their histo window (gap repair), a frame more than one candle behind is fetched
+# in full
+async def refresh_latest(currency, time, lim, coinList, price_frame, priority=PRIORITY_VISIBLE):
+    quotes = await fetch_latest_prices([coin for coin in coinList if coin != currency], currency, priority)
+    with get_metrics().span('frame'):
+        frame, missing = price_frame.advanced({coin: quote['PRICE'] for coin, quote in quotes.items()})
+    if frame is None:
+        print(f"{get_time_now()}: price data more than one candle behind, fetching full window")
+        frame = await main(currency, time, lim, coinList, priority)
+        frame.quotes = quotes
+        return frame
+    frame.quotes = quotes
+
+    if frame.last_time() == price_frame.last_time():
+        write_latest_candles(frame, [coin for coin in coinList if coin not in frame.synthetic and coin not in missing],
+                             currency, time)
+    series_list = await asyncio.gather(*[get_ticker_prices(coin, currency, time, lim, priority) for coin in missing])
+    for coin, series in zip(missing, series_list):
+        frame.set_series(coin, series)
+    return frame
+
+
+# repair batch of the batched refresh: incremental histo update of every coin (only the candles from the last stored
+# one on, see sync_ticker_prices) at prefetch priority, so finished candles get their real OHLCV
+# POST: (currency, time, lim, dict coin -> last lim+1 candles), coins without data are left out
+async def repair_candles(currency, time, lim, coins, priority=PRIORITY_PREFETCH):
+    series_list = await asyncio.gather(*[sync_ticker_prices(coin, currency, time, lim, priority) for coin in coins])
+    return currency, time, lim, {coin: series for coin, series in zip(coins, series_list) if series_length(series)}
+
+
+# PRE: the last candle of the coins in frame was patched with the current price
+# writes it to the candle store (if it is the last stored candle, one transaction) and into the cached series
+# ending with it, the last stored candle is always fetched again by the next histo request, so approximate
+# highs / lows don't stick
+def write_latest_candles(frame, coins, currency, time):
+    candles = {}
+    for coin in coins:
+        row = frame.rows[coin]
+        candles[coin] = {field: float(getattr(frame, field)[row, -1]) for field in FIELDS[1:]}
+        candles[coin]['time'] = int(frame.time[row, -1])
+    get_candle_store().patch_last(currency, time, candles)
+    for key, series in price_cache.find(lambda key: key[0] in candles and key[1:3] == (currency, time)):
+        candle = candles[key[0]]
+        if series_length(series) and series['time'][-1] == candle['time']:
+            patched = {field: values.copy() for field, values in series.items()}
+            for field in FIELDS[1:]:
+                patched[field][-1] = candle[field]
+            price_cache.put(key, patched, time)
+
+
+# returns the last lim+1 candles, brought up to date from the candle store (only the candles after the last stored
+# one are fetched) and written through to the cached series
+async def sync_ticker_prices(ticker, currency, time, lim, priority=PRIORITY_VISIBLE):
+    fetch_lim = max(lim, FETCH_LIM[time])
+    series = await update_ticker_prices(ticker, currency, time, fetch_lim, priority)
+    if series_length(series):
+        price_cache.put((ticker, currency, time, fetch_lim), series, time)
+    return slice_series(series, window_start(time, lim))
+
+
+# PRE: tickers is a list of coin tickers
+# POST: chunks of tickers whose comma separated list fits into max_chars
+def chunk_symbols(tickers, max_chars=FSYMS_MAX_CHARS):
+    chunks = []
+    length = 0
+    for ticker in tickers:
+        if chunks and length + 1 + len(ticker) <= max_chars:
+            chunks[-1].append(ticker)
+            length += 1 + len(ticker)
+        else:
+            chunks.append([ticker])
+            length = len(ticker)
+    return chunks
 
-async def main(currency, time, lim, coinList):
-    price_data = []
-    price_data_dict = dict.fromkeys(coinList.keys())
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        futures = [loop.run_in_executor(None, get_ticker_prices, coin, currency, time, lim) for coin in coinList]
-        for response in await asyncio.gather(*futures):
-            price_data.append(response)
 
-    for index, coin in enumerate(price_data_dict):
-        price_data_dict[coin] = price_data[index]
-    return price_data_dict
+# Cryptocompare API wrapper (pricemultifull), one request per chunk of tickers
+# POST: dict ticker -> current price and 24h stats (QUOTE_FIELDS), tickers of failed chunks or without price are
+# left out
+async def fetch_latest_prices(tickers, currency='USD', priority=PRIORITY_VISIBLE):
+    async def fetch_chunk(chunk):
+        params = {'fsyms': ','.join(chunk), 'tsyms': currency}
+        try:
+            with get_metrics().span('request', 'pricemultifull'):
+                data = await get_http_client().fetch_json(PRICE_MULTI_URL, params=params, priority=priority)
+            raw = data['RAW']
+            return {ticker: {field: raw[ticker][currency].get(field) for field in QUOTE_FIELDS} for ticker in chunk
+                    if ticker in raw and raw[ticker].get(currency, {}).get('PRICE') is not None}
+        except Exception as e:
+            print(e)
+            return {}
+
+    prices = {}
+    for chunk_prices in await asyncio.gather(*[fetch_chunk(chunk) for chunk in chunk_symbols(tickers)]):
+        prices.update(chunk_prices)
+    return prices
+
+
+# recently fetched series, identical requests in flight are coalesced
+price_cache = ResponseCache(series_nbytes)
+
+# returns the last lim+1 candles as series (field -> numpy array)
+# derived (sliced or resampled) from a cached series if one covers the window, otherwise the largest window of
+# the granularity is fetched so it can serve the smaller ones later (see resampler.FETCH_LIM)
+async def get_ticker_prices(ticker='BTC', currency='USD', time='minute', lim=60, priority=PRIORITY_VISIBLE):
+    cached = price_cache.find(lambda key: key[:2] == (ticker, currency))
+    series = derive([(key[2], value) for key, value in cached], time, lim)
+    if series is not None:
+        price_cache.hits += 1
+        return series
+
+    fetch_lim = max(lim, FETCH_LIM[time])
+    series = await price_cache.get_or_fetch((ticker, currency, time, fetch_lim), time,
+                                            lambda: update_ticker_prices(ticker, currency, time, fetch_lim, priority))
+    return slice_series(series, window_start(time, lim))
+
+
+# returns the last lim+1 candles, served from the candle store and topped up from the API
+async def update_ticker_prices(ticker='BTC', currency='USD', time='minute', lim=60, priority=PRIORITY_VISIBLE):
+    candle_store = get_candle_store()
+    limit, start = candle_store.get_missing(ticker, currency, time, lim)
+    candles = await fetch_ticker_prices(ticker, currency, time, limit, priority)
+    if candles:
+        candle_store.merge(ticker, currency, time, candles)
+    return candle_store.read(ticker, currency, time, start)
+
+
+# returns (ticker, currency, time, series) with all stored candles of a series
+# if the stored series starts after start, one page of older candles is fetched first (lazy history of the
+# zoomable price charts), candles before the coin was listed come as zeros and are dropped
+async def get_price_history(ticker, currency, time, start, priority=PRIORITY_PREFETCH):
+    candle_store = get_candle_store()
+    first, last = candle_store.get_bounds(ticker, currency, time)
+    if first is not None and first > start:
+        interval = INTERVALS[time]
+        lim = int(min(HISTORY_PAGE, (first - start) // interval + 1))
+        candles = await fetch_ticker_prices(ticker, currency, time, lim, priority, to_ts=first - interval)
+        candles = [c for c in candles if c.get('close')]
+        if candles:
+            candle_store.merge(ticker, currency, time, candles)
+    return ticker, currency, time, candle_store.read(ticker, currency, time, 0)
 
 
 # Cryptocompare API wrapper
-def get_ticker_prices(ticker='BTC', currency='USD', time='minute', lim=60):
-    # build URL and call api
-    fullURL = PRICE_URL + time + '?fsym=' + ticker + '&tsym=' + currency + '&limit=' + str(lim)
+# to_ts: time of the last candle (default: now)
+async def fetch_ticker_prices(ticker='BTC', currency='USD', time='minute', lim=60, priority=PRIORITY_VISIBLE, to_ts=None):
+    # call api through the shared http client (pooled keep-alive connections, API budget)
+    params = {'fsym': ticker, 'tsym': currency, 'limit': lim}
+    if to_ts is not None:
+        params['toTs'] = int(to_ts)
     try:
-        r = requests.get(fullURL)
-        tickerData = r.json()
+        with get_metrics().span('request', ticker):
+            tickerData = await get_http_client().fetch_json(PRICE_URL + time, params=params, priority=priority)
         priceData = tickerData["Data"]
         return priceData
     except Exception as e:
@@ -113,19 +273,23 @@ def calc_growth_percentage(prices):
     else:
         return 0
 
-# PRE: 
-# POST: returns an array of % changes
-def calc_growth_rates(coinList, all_price_data):
-    growth_rates = []
-    for coin in coinList:
-        price_data = all_price_data[coin]
-        prices = []
-        for data in price_data:
-            prices.append(data["close"])
-        # calculate growth rates
-        changePct = calc_growth_percentage(prices)
-        growth_rates.append(changePct)
-    return growth_rates
+# PRE: a PriceFrame
+# POST: returns an array of % changes (first vs last close) in the order of coinList
+def calc_growth_rates(coinList, price_frame):
+    first, last = price_frame.first_last('close')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_pct = (last / first - 1) * 100
+    change_pct[~np.isfinite(change_pct)] = 0
+    return [float(change_pct[price_frame.rows[coin]]) if coin in price_frame.rows else 0 for coin in coinList]
+
+# PRE: seconds or None
+# POST: '12 ms', '1.25 s' or '-'
+def format_duration(seconds):
+    if seconds is None:
+        return '-'
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    return f"{seconds:.2f} s"
 
 # returns current date and time DD-MM-YY HH:MM:SS
 def get_time_now():
@@ -162,13 +326,56 @@ class CryptoGui(QtWidgets.QMainWindow):
         self.show_growth_rates_view = False
         self.show_coinlist_editor_view = False  # flag that enables list customizer
         self.show_correlations_view = False
+        self.show_table_view = False
         self.show_indexed_view = False
 
+        # views are created when first shown and only hidden afterwards, views whose data changed while they were
+        # hidden are redrawn when shown again
+        self.GrowthRatesWidget = None
+        self.CorrelationsWidget = None
+        self.CoinListEditorWidget = None
+        self.TableWidget = None
+        self.dirty_views = set()    # 'growth', 'correlations', 'table', 'prices'
+
+        # correlation matrix options
+        self.corr_method = 'pearson'
+        self.corr_returns = False
+        self.corr_cluster = False
+        self.corr_rolling = False
+        self.candle_mode = False
+        self.rolling_correlation = None     # streaming engine, only kept up to date in rolling mode
+
         self.timeout = UPDATE_TIMEOUT
+        self.start_view = 'growth'      # view opened at startup ('growth', 'correlations', 'table' or None)
+
+        # view state and data of the last session, shown (stale) until the first fetch finished
+        self.snapshot = load_snapshot()
+        self.data_time = None           # unix time the displayed prices were fetched at
+        self.stale = False
+        if self.snapshot is not None:
+            self.restore_state(self.snapshot[0]['state'])
 
-        self.all_price_data = []
+        self.price_frame = PriceFrame([])
+        self.price_selection = None     # (currency, time, lim, coins) of price_frame
         self.growth_rates = []
 
+        # fetches price data in the background and delivers it via signals
+        self.price_fetcher = PriceFetcher(self)
+        self.price_fetcher.data_ready.connect(self.on_price_data)
+        self.price_fetcher.partial_ready.connect(self.on_coin_price_data)
+        self.price_fetcher.fetch_failed.connect(self.on_fetch_failed)
+        # loads older candles for zoomed price charts
+        self.history_fetcher = PriceFetcher(self)
+        self.history_fetcher.data_ready.connect(self.on_price_history)
+        self.history_fetcher.fetch_failed.connect(self.on_history_failed)
+        self.history_request = None
+        # repairs the candles finished since the last full fetch (batched refresh, see refresh_latest)
+        self.repair_fetcher = PriceFetcher(self)
+        self.repair_fetcher.data_ready.connect(self.on_repaired_candles)
+        self.repaired_time = 0          # candles before this unix time have their histo data
+        self.repair_started = 0.0       # unix time of the last full fetch or repair
+        self.pending_repair = None      # repair result waiting for a running refresh
+
         self.initUI()
 
 
@@ -203,6 +410,10 @@ class CryptoGui(QtWidgets.QMainWindow):
         toggleViewIndexed.setStatusTip('toggle view')
         toggleViewIndexed.triggered.connect(self.toggle_indexed_view)
 
+        self.candlesAct = QAction('&Candlestick Charts', self, checkable=True)
+        self.candlesAct.setStatusTip('Draw OHLC candles instead of close prices (right click a chart to expand it)')
+        self.candlesAct.triggered.connect(self.toggle_candle_mode)
+
         toggledarklight = QAction(QIcon('images/bulb.png'), '&Toggle Dark Mode', self)
         toggledarklight.setShortcut('Ctrl+D')
         toggledarklight.setStatusTip('toggle light/dark mode')
@@ -223,6 +434,27 @@ class CryptoGui(QtWidgets.QMainWindow):
         toggleViewCorr.setStatusTip('Correlations')
         toggleViewCorr.triggered.connect(self.toggle_correlations_view)
 
+        toggleViewTable = QAction(QIcon('images/graph.png'), '&Show / Hide Coin Table', self)
+        toggleViewTable.setShortcut('Ctrl+B')
+        toggleViewTable.setStatusTip('Table of all coins with price, change, volume and sparkline')
+        toggleViewTable.triggered.connect(self.toggle_table_view)
+
+        self.corrReturnsAct = QAction('Correlations of &Log Returns', self, checkable=True)
+        self.corrReturnsAct.setStatusTip('Correlate log returns instead of price levels')
+        self.corrReturnsAct.triggered.connect(self.set_correlation_options)
+
+        self.corrSpearmanAct = QAction('&Spearman Rank Correlations', self, checkable=True)
+        self.corrSpearmanAct.setStatusTip('Use Spearman instead of Pearson correlation')
+        self.corrSpearmanAct.triggered.connect(self.set_correlation_options)
+
+        self.corrClusterAct = QAction('&Cluster Correlations Matrix', self, checkable=True)
+        self.corrClusterAct.setStatusTip('Order coins by hierarchical clustering')
+        self.corrClusterAct.triggered.connect(self.set_correlation_options)
+
+        self.corrRollingAct = QAction('&Rolling Correlations', self, checkable=True)
+        self.corrRollingAct.setStatusTip('Play the rolling correlation matrix over time')
+        self.corrRollingAct.triggered.connect(self.set_correlation_options)
+
         toggle_landscape = QAction(QIcon('images/size.png'), '&Toggle Portrait / Landscape mode', self)
         toggle_landscape.setShortcut('Ctrl+Z')
         toggle_landscape.setStatusTip('Resize')
@@ -237,6 +469,25 @@ class CryptoGui(QtWidgets.QMainWindow):
         self.autoupdateAct.setChecked(True)
         self.autoupdateAct.triggered.connect(self.toggle_timeout)
 
+        # options restored from the last session
+        self.candlesAct.setChecked(self.candle_mode)
+        self.corrReturnsAct.setChecked(self.corr_returns)
+        self.corrSpearmanAct.setChecked(self.corr_method == 'spearman')
+        self.corrClusterAct.setChecked(self.corr_cluster)
+        self.corrRollingAct.setChecked(self.corr_rolling)
+
+        self.metricsOverlayAct = QAction('&Performance Overlay', self, checkable=True)
+        self.metricsOverlayAct.setStatusTip('Show the timing of the last refresh in the status bar')
+        self.metricsOverlayAct.triggered.connect(self.toggle_metrics_overlay)
+
+        self.metricsExportAct = QAction('&Export Metrics', self, checkable=True)
+        self.metricsExportAct.setStatusTip('Write metrics.prom and refreshes.jsonl to the metrics folder after every refresh')
+        self.metricsExportAct.triggered.connect(self.toggle_metrics_export)
+
+        profileAct = QAction('P&rofile Next Refresh', self)
+        profileAct.setStatusTip('Capture a cProfile of the next refresh (metrics folder)')
+        profileAct.triggered.connect(self.profile_next_refresh)
+
         # MENUBAR
         self.menubar = self.menuBar()
         self.menubar.setNativeMenuBar(False)
@@ -249,13 +500,24 @@ class CryptoGui(QtWidgets.QMainWindow):
 
         viewMenu = self.menubar.addMenu('View')
         viewMenu.addAction(toggleViewIndexed)
+        viewMenu.addAction(self.candlesAct)
         viewMenu.addAction(toggleViewBars)
         viewMenu.addAction(toggleViewCorr)
+        viewMenu.addAction(toggleViewTable)
+        viewMenu.addSeparator()
+        viewMenu.addAction(self.corrReturnsAct)
+        viewMenu.addAction(self.corrSpearmanAct)
+        viewMenu.addAction(self.corrClusterAct)
+        viewMenu.addAction(self.corrRollingAct)
 
         settingsMenu = self.menubar.addMenu('&Settings')
         settingsMenu.addAction(customizeAct)
         settingsMenu.addAction(self.autoupdateAct)
         settingsMenu.addAction(toggledarklight)
+        settingsMenu.addSeparator()
+        settingsMenu.addAction(self.metricsOverlayAct)
+        settingsMenu.addAction(self.metricsExportAct)
+        settingsMenu.addAction(profileAct)
 
         aboutMenu = self.menubar.addMenu('&About')
         aboutMenu.addAction(aboutAct)
@@ -268,6 +530,7 @@ class CryptoGui(QtWidgets.QMainWindow):
         self.toolbar.addAction(toggleViewIndexed)
         self.toolbar.addAction(toggleViewBars)
         self.toolbar.addAction(toggleViewCorr)
+        self.toolbar.addAction(toggleViewTable)
         self.toolbar.addAction(customizeAct)
         self.toolbar.addAction(refreshDataAct)
         self.toolbar.addAction(toggledarklight)
@@ -275,16 +538,34 @@ class CryptoGui(QtWidgets.QMainWindow):
 
         # create a timer for auto-update of data
         self.timer0 = QTimer(self)
-        self.timer0.timeout.connect(self.refresh_data_and_graphs)
+        self.timer0.timeout.connect(self.refresh_latest_prices)
 
         if self.autoupdateAct.isChecked():
-            self.timer0.start(self.timeout)
+            self.timer0.start(self.refresh_interval())
+
+        # STATUSBAR: remaining API budget
+        self.budgetLabel = QLabel()
+        self.budgetLabel.setStyleSheet("color: lightgrey")
+        self.statusBar().addPermanentWidget(self.budgetLabel)
+        # STATUSBAR: timing of the last refresh (performance overlay)
+        self.metricsLabel = QLabel()
+        self.metricsLabel.setStyleSheet("color: lightgrey")
+        self.metricsLabel.hide()
+        self.statusBar().addPermanentWidget(self.metricsLabel)
+        self.timer1 = QTimer(self)
+        self.timer1.timeout.connect(self.update_budget_label)
+        self.timer1.start(BUDGET_TIMEOUT)
 
         # Load coin data
-        # read all coin lists from file
-        self.allCoins, self.all_coin_lists = load_coin_lists_from_file()
+        # coin lists are shared with the editor and the drop down menus, loaded once by the config service
+        self.config = get_config()
+        self.config.lists_changed.connect(self.on_coin_lists_changed)
+        self.all_coin_lists = self.config.coin_lists()
+        if self.coinListIndex >= len(self.all_coin_lists):
+            self.coinListIndex = 0
         #current master coinlist
         self.coinList = self.all_coin_lists[self.coinListIndex]
+        self.coinListName = self.config.list_names()[self.coinListIndex]
 
 
         # MAIN LAYOUT
@@ -294,36 +575,119 @@ class CryptoGui(QtWidgets.QMainWindow):
 
         # Create drop down menus that select data parameters
         self.ParamInputWidget = ParameterSelector(self.coinListIndex, parent=self)
+        self.ParamInputWidget.set_parameters(self.coinListIndex, self.timeScale, self.currency)
         self.ParamInputWidget.setMaximumHeight(40)
 
-        # fetch new data from API
-        self.all_price_data = self.fetch_price_data(self.currency, self.time, self.lim, self.coinList)
-        self.growth_rates = calc_growth_rates(self.coinList, self.all_price_data)
-
         # Create the Crypto Prices Plot in maptlotlib FigureCanvas object
         self.PriceChartCanvas = MplPriceChartsCanvas(self.coinList, width=12, height=4, dpi=100)
-        self.PriceChartCanvas.draw_plots(self.coinList, self.currency, self.timeScale, self.time, self.lim, self.all_price_data)
-
-        # show the price Growth Bar Chart in maptlotlib FigureCanvas object
-        self.toggle_growth_rates_view()
+        self.PriceChartCanvas.history_needed.connect(self.load_price_history)
+        if self.snapshot is not None:
+            self.PriceChartCanvas.layouts.update(self.snapshot[2])
 
         # add widgets to page layout
         self.page_layout.addWidget(self.ParamInputWidget)
         # self.page_layout.addWidget(self.plot_widget)
         self.page_layout.addWidget(self.PriceChartCanvas)
-        # self.page_layout.addWidget(self.growth_rates_view_widget)
-        self.page_layout.addWidget(self.GrowthRatesWidget)
         self.setCentralWidget(page_widget)
 
+        if not self.dark_mode:
+            self.set_color_mode(self.dark_mode)
+            self.ParamInputWidget.set_color_mode(self.dark_mode)
+
+        # the session is saved when the app quits (also via the exit action, which does not close the window first)
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self.save_session)
+
+        # graphs are drawn and the first fetch starts once the window was painted (see paintEvent), the view of the
+        # last session is opened before so the price charts get their final size right away
+        self.session_started = False
+        if self.start_view == 'growth':
+            self.toggle_growth_rates_view()
+        elif self.start_view == 'correlations':
+            self.toggle_correlations_view()
+        elif self.start_view == 'table':
+            self.toggle_table_view()
         self.show()
 
+    # the first paint shows the window frame right away, the session starts after it (canvas has its final size)
+    def paintEvent(self, event):
+        super(CryptoGui, self).paintEvent(event)
+        if not self.session_started:
+            self.session_started = True
+            QTimer.singleShot(0, self.start_session)
+
+    # draws the data of the last session (marked as stale) or empty graphs and starts the first fetch
+    def start_session(self):
+        if self.snapshot is not None:
+            meta, price_frame, layouts = self.snapshot
+            if meta['coins'] == list(self.coinList) and price_frame.granularity == self.time \
+                    and price_frame.width() == self.lim + 1:
+                self.price_frame = price_frame
+                self.price_selection = (self.currency, self.time, self.lim, list(self.coinList))
+                self.data_time = meta['data_time']
+                self.stale = True
+            self.snapshot = None
+
+        # start fetching data from API, without snapshot the price charts are drawn empty and every coin is drawn
+        # as soon as its data arrives
+        self.fetch_price_data(self.currency, self.time, self.lim, self.coinList)
+        self.growth_rates = calc_growth_rates(self.coinList, self.price_frame)
+        self.dirty_views.update(['growth', 'correlations', 'table'])
+        self.update_views()
+        if self.stale:
+            self.redraw_price_charts()
+            data_time = dt.datetime.fromtimestamp(self.data_time).strftime('%d-%m-%Y %H:%M')
+            self.setWindowTitle(f"Crypto Price Browser (data from {data_time})")
+            self.statusBar().showMessage(f"Showing data from {data_time}, refreshing...")
+
+    # view options of the last session (see save_session)
+    def restore_state(self, state):
+        try:
+            self.currency = state['currency'] if state['currency'] in baseCurrencies else self.currency
+            self.coinListIndex = int(state['coinListIndex'])
+            self.timeScale = int(state['timeScale']) if 0 <= int(state['timeScale']) < len(timeWords) else self.timeScale
+            self.lim = timeLim[self.timeScale]
+            self.time = timeLimScale[self.timeScale]
+            self.dark_mode = bool(state['dark_mode'])
+            self.candle_mode = bool(state['candle_mode'])
+            self.show_indexed_view = bool(state['indexed_view'])
+            self.start_view = state['view']
+            self.corr_method = state['corr_method']
+            self.corr_returns = bool(state['corr_returns'])
+            self.corr_cluster = bool(state['corr_cluster'])
+            self.corr_rolling = bool(state['corr_rolling'])
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Error restoring the last session ({e})")
+
+    # slot for QApplication.aboutToQuit, the snapshot is only replaced if there is data to show
+    def save_session(self):
+        view = 'growth' if self.show_growth_rates_view else 'correlations' if self.show_correlations_view \
+            else 'table' if self.show_table_view else None
+        state = {'currency': self.currency,
+                 'coinListIndex': self.coinListIndex,
+                 'timeScale': self.timeScale,
+                 'dark_mode': self.dark_mode,
+                 'candle_mode': self.candle_mode,
+                 'indexed_view': self.show_indexed_view,
+                 'view': view,
+                 'corr_method': self.corr_method,
+                 'corr_returns': self.corr_returns,
+                 'corr_cluster': self.corr_cluster,
+                 'corr_rolling': self.corr_rolling}
+        if not self.price_frame.length.any():
+            return
+        try:
+            save_snapshot(state, self.price_frame, self.PriceChartCanvas.layouts, self.data_time)
+            print(f"{get_time_now()}: session saved")
+        except OSError as e:
+            print(f"{get_time_now()}: ERROR saving session ({e})")
+
 
     def toggle_timeout(self, state):
         try:
             if not state:
                 self.timer0.stop()
             else:
-                self.timer0.start(self.timeout)
+                self.timer0.start(self.refresh_interval())
         except Exception as e:
             print(e)
         print(f"AutoUpdate data set to: {state}")
@@ -344,11 +708,172 @@ class CryptoGui(QtWidgets.QMainWindow):
             event.ignore()
 
 
-    # reload data from API and reloads the currently displayed graphs
+    # reload data from API, the currently displayed graphs are redrawn when the data arrives (on_price_data)
     def refresh_data_and_graphs(self):
-        self.all_price_data = self.fetch_price_data(self.currency, self.time, self.lim, self.coinList)
-        self.growth_rates = calc_growth_rates(self.coinList, self.all_price_data)
+        self.fetch_price_data(self.currency, self.time, self.lim, self.coinList)
+
+    # auto refresh ticks at least twice per candle, so the batched refresh never skips a candle
+    def refresh_interval(self):
+        return min(self.timeout, INTERVALS[self.time] * 1000 // 2)
+
+    # slot for the auto refresh timer: current prices of the coin list in batched requests (see refresh_latest)
+    # the shown window is fetched in full if coins, currency or timeframe changed since the last fetch
+    def refresh_latest_prices(self):
+        if (self.currency, self.time, self.lim, list(self.coinList)) != self.price_selection or self.stale:
+            self.refresh_data_and_graphs()
+            return
+        if self.price_fetcher.is_busy():
+            return
+        self.repair_candles()
+        print(f"{get_time_now()}: fetching latest prices from API")
+        get_metrics().begin_refresh(f"{self.currency}/{self.time}/{self.lim}/latest")
+        self.price_fetcher.fetch(refresh_latest(self.currency, self.time, self.lim, self.coinList, self.price_frame))
+
+    # starts a repair batch if candles were finished since the last full fetch or repair, at most every REPAIR_TIMEOUT
+    # (one incremental histo request per coin at prefetch priority, see crypto_gui.repair_candles)
+    def repair_candles(self):
+        if self.price_frame.last_time() <= self.repaired_time or self.repair_fetcher.is_busy():
+            return
+        if systime.time() - self.repair_started < REPAIR_TIMEOUT / 1000:
+            return
+        self.repair_started = systime.time()
+        self.repaired_time = self.price_frame.last_time()
+        coins = [coin for coin in self.coinList if coin not in self.price_frame.synthetic]
+        self.repair_fetcher.fetch(repair_candles(self.currency, self.time, self.lim, coins))
+
+    # slot for the repair fetcher, a running refresh replaces the frame so the repair is applied to its result
+    def on_repaired_candles(self, generation, repair):
+        if self.price_fetcher.is_busy():
+            self.pending_repair = repair
+            return
+        if self.apply_repair(repair):
+            self.growth_rates = calc_growth_rates(self.coinList, self.price_frame)
+            self.redraw_graphs()
+
+    # PRE: repair is a result of repair_candles
+    # POST: series of the repaired coins replaced if the selection is unchanged and they end with the current candle,
+    # returns True if the frame changed
+    def apply_repair(self, repair):
+        currency, time, lim, series_by_coin = repair
+        if (currency, time, lim, list(self.coinList)) != self.price_selection:
+            return False
+        changed = False
+        for coin, series in series_by_coin.items():
+            if coin in self.price_frame.rows and series['time'][-1] == self.price_frame.last_time():
+                self.price_frame.set_series(coin, series)
+                changed = True
+        return changed
+
+    # slot for PriceFetcher.data_ready, only results of the latest fetch arrive here
+    def on_price_data(self, generation, price_frame):
+        if generation != self.price_fetcher.generation:
+            return
+        metrics = get_metrics()
+        if metrics.refresh is not None:
+            # time waiting for the API: the requests of the refresh (overlapping ones once), parsing not included
+            metrics.record('network', metrics.refresh.wall_time('request', exclude='parse'))
+        self.price_frame = price_frame
+        self.data_time = systime.time()
+        if self.pending_repair is not None:
+            self.apply_repair(self.pending_repair)
+            self.pending_repair = None
+        if self.stale:
+            self.stale = False
+            self.setWindowTitle('Crypto Price Browser')
+        self.PriceChartCanvas.loading.clear()
+        with metrics.span('growth'):
+            self.growth_rates = calc_growth_rates(self.coinList, self.price_frame)
+        with metrics.span('correlation'):
+            self.update_rolling_correlation()
+        self.statusBar().clearMessage()
         self.redraw_graphs()
+        self.finish_refresh('ok')
+
+    # slot for PriceFetcher.partial_ready, draws the chart of one coin before the other coins arrived
+    def on_coin_price_data(self, generation, coin, series):
+        if generation != self.price_fetcher.generation or coin not in self.price_frame.rows:
+            return
+        if coin not in self.price_frame.synthetic:
+            self.price_frame.set_series(coin, series)
+        if self.show_table_view:
+            self.TableWidget.update_data(self.coinList, self.price_frame, self.currency, coin)
+        else:
+            self.PriceChartCanvas.update_coin(coin, self.price_frame)
+
+    # slot for MplPriceChartsCanvas.history_needed, the chart of a coin was zoomed out / panned before its data
+    def load_price_history(self, coin, start):
+        request = (coin, self.currency, self.time)
+        if self.history_request == request and self.history_fetcher.is_busy():
+            return
+        self.history_request = request
+        self.history_fetcher.fetch(get_price_history(coin, self.currency, self.time, start))
+
+    def on_price_history(self, generation, history):
+        coin, currency, time, series = history
+        if (currency, time) == (self.currency, self.time):
+            self.PriceChartCanvas.set_history(coin, series)
+
+    # the page is asked for again by the next zoom / pan of the chart
+    def on_history_failed(self, generation, message):
+        print(f"{get_time_now()}: ERROR loading price history of {self.history_request[0]} ({message})")
+        self.history_request = None
+
+    def update_budget_label(self):
+        budget = get_http_client().remaining_budget()
+        if budget:
+            self.budgetLabel.setText("API budget: {second}/s {minute}/min {hour}/h".format(**budget))
+
+    def on_fetch_failed(self, generation, message):
+        print(f"{get_time_now()}: ERROR fetching data ({message})")
+        self.statusBar().showMessage("Fetching data failed: " + message)
+        self.finish_refresh('failed')
+
+    # records API, cache and client gauges, ends the trace of the running refresh and updates the overlay
+    def finish_refresh(self, status):
+        metrics = get_metrics()
+        client = get_http_client()
+        for period, remaining in client.remaining_budget().items():
+            metrics.set_gauge('api_budget_remaining', remaining, period=period)
+        lookups = price_cache.hits + price_cache.misses
+        metrics.set_gauge('cache_hits_total', price_cache.hits)
+        metrics.set_gauge('cache_misses_total', price_cache.misses)
+        metrics.set_gauge('cache_hit_ratio', round(price_cache.hits / lookups, 4) if lookups else 0)
+        metrics.set_gauge('cache_bytes', price_cache.size)
+        metrics.set_gauge('http_requests_total', client.requests)
+        metrics.set_gauge('http_throttled_total', client.throttled)
+        metrics.set_gauge('http_hedged_total', client.hedged)
+        metrics.set_gauge('coins', len(self.coinList))
+        metrics.end_refresh(status)
+        self.update_metrics_label()
+
+    # performance overlay: duration of the last refresh and its stages, slowest coin, cache hits
+    def update_metrics_label(self):
+        refresh = get_metrics().last_refresh
+        if not self.metricsOverlayAct.isChecked() or refresh is None:
+            return
+        totals = refresh.totals()
+        text = f"refresh {format_duration(refresh.duration)}"
+        text += ''.join(f" | {label} {format_duration(totals[span])}" for span, label in METRIC_STAGES if span in totals)
+        requests = refresh.tagged('request')
+        if requests:
+            slowest = max(requests, key=requests.get)
+            text += f" | slowest {slowest} {format_duration(requests[slowest])}"
+        text += f" | cache {refresh.gauges.get('cache_hit_ratio', 0):.0%}"
+        if refresh.status != 'ok':
+            text += f" ({refresh.status})"
+        self.metricsLabel.setText(text)
+
+    def toggle_metrics_overlay(self, state):
+        self.metricsLabel.setVisible(state)
+        self.update_metrics_label()
+
+    def toggle_metrics_export(self, state):
+        get_metrics().export = state
+        print(f"Metrics export set to: {state}")
+
+    def profile_next_refresh(self):
+        get_metrics().profile_next = True
+        self.refresh_data_and_graphs()
 
     # toggles between individual price charts (one for each coin) and one big indexed plot (all coins indexed to 100)
     def toggle_indexed_view(self):
@@ -363,43 +888,125 @@ class CryptoGui(QtWidgets.QMainWindow):
     def toggle_growth_rates_view(self):
         if self.show_growth_rates_view:
             self.show_growth_rates_view = False
-            self.GrowthRatesWidget.setParent(None)
-            self.redraw_graphs()
+            self.GrowthRatesWidget.hide()
         else:
             if self.show_coinlist_editor_view:
                 self.toggle_coinlist_editor_view()
             if self.show_correlations_view:
                 self.toggle_correlations_view()
+            if self.show_table_view:
+                self.toggle_table_view()
             self.show_growth_rates_view = True
-            self.GrowthRatesWidget = MplGrowthCanvas(self.coinList, dark_mode=self.dark_mode, width=5, height=2, dpi=100)
-            self.GrowthRatesWidget.setMaximumHeight(int(self.height / 3))
-            self.GrowthRatesWidget.draw_graph(self.growth_rates, self.coinList)
-            self.page_layout.addWidget(self.GrowthRatesWidget)
-            self.GrowthRatesWidget.set_color_mode(self.dark_mode)
+            if self.GrowthRatesWidget is None:
+                self.GrowthRatesWidget = MplGrowthCanvas(self.coinList, dark_mode=self.dark_mode, width=5, height=2, dpi=100)
+                self.GrowthRatesWidget.setMaximumHeight(int(self.height / 3))
+                self.page_layout.addWidget(self.GrowthRatesWidget)
+                self.dirty_views.add('growth')
+            self.GrowthRatesWidget.show()
+            self.update_views()
         self.show()
 
     def toggle_correlations_view(self):
         if self.show_correlations_view:
             self.show_correlations_view = False
-            self.CorrelationsWidget.setParent(None)
-            self.redraw_graphs()
+            self.CorrelationsWidget.hide()
         else:
             if self.show_growth_rates_view:
                 self.toggle_growth_rates_view()
             if self.show_coinlist_editor_view:
                 self.toggle_coinlist_editor_view()
+            if self.show_table_view:
+                self.toggle_table_view()
             self.show_correlations_view = True
-            self.CorrelationsWidget = MplCorrelationCanvas(self.coinList, dark_mode=self.dark_mode, width=5, height=2, dpi=100)
-            self.CorrelationsWidget.setMinimumHeight(int(self.height / 2))
-            self.CorrelationsWidget.draw_graph(self.coinList, self.all_price_data)
-            self.page_layout.addWidget(self.CorrelationsWidget)
+            if self.CorrelationsWidget is None:
+                self.CorrelationsWidget = MplCorrelationCanvas(self.coinList, dark_mode=self.dark_mode, width=5, height=2, dpi=100)
+                self.CorrelationsWidget.setMinimumHeight(int(self.height / 2))
+                self.page_layout.addWidget(self.CorrelationsWidget)
+                self.dirty_views.add('correlations')
+            self.CorrelationsWidget.show()
+            self.update_views()
+        self.show()
+
+    # table of the coin list with sparklines, fits lists too long for one price chart per coin
+    # the table replaces the price charts while it is shown, they are redrawn when it is closed
+    def toggle_table_view(self):
+        if self.show_table_view:
+            self.show_table_view = False
+            self.TableWidget.hide()
+            self.PriceChartCanvas.show()
+            if 'prices' in self.dirty_views:
+                self.dirty_views.discard('prices')
+                self.redraw_price_charts()
+        else:
+            if self.show_growth_rates_view:
+                self.toggle_growth_rates_view()
+            if self.show_correlations_view:
+                self.toggle_correlations_view()
+            if self.show_coinlist_editor_view:
+                self.toggle_coinlist_editor_view()
+            self.show_table_view = True
+            if self.TableWidget is None:
+                self.TableWidget = SparklineTable(dark_mode=self.dark_mode)
+                self.TableWidget.setMinimumHeight(int(self.height / 2))
+                self.page_layout.addWidget(self.TableWidget)
+                self.dirty_views.add('table')
+            self.PriceChartCanvas.hide()
+            self.TableWidget.show()
+            self.update_views()
         self.show()
 
+    # redraws the visible views whose data or colors changed since they were drawn
+    # nothing is drawn before the session started (first paint of the window)
+    def update_views(self):
+        if not self.session_started:
+            return
+        metrics = get_metrics()
+        if self.show_growth_rates_view and 'growth' in self.dirty_views:
+            self.dirty_views.discard('growth')
+            with metrics.span('draw_growth'):
+                self.GrowthRatesWidget.fig.clf()
+                self.GrowthRatesWidget.draw_graph(self.growth_rates, self.coinList)
+                self.GrowthRatesWidget.set_color_mode(self.dark_mode)
+        if self.show_correlations_view and 'correlations' in self.dirty_views:
+            self.dirty_views.discard('correlations')
+            with metrics.span('draw_correlations'):
+                self.CorrelationsWidget.fig.clf()
+                self.draw_correlations()
+                self.CorrelationsWidget.fig.canvas.draw()
+        if self.show_table_view and 'table' in self.dirty_views:
+            self.dirty_views.discard('table')
+            with metrics.span('draw_table'):
+                self.TableWidget.update_data(self.coinList, self.price_frame, self.currency)
+
+
+    # feeds new candles into the rolling correlation engine, rebuilt when coin list or timeframe change
+    def update_rolling_correlation(self):
+        if not self.corr_rolling:
+            self.rolling_correlation = None
+            return
+        if not all(coin in self.price_frame.rows for coin in self.coinList):
+            return
+        if self.rolling_correlation is None or not self.rolling_correlation.matches(self.coinList, self.price_frame.granularity):
+            self.rolling_correlation = RollingCorrelation(self.coinList, self.price_frame.granularity, ROLLING_WINDOW)
+        self.rolling_correlation.update(self.price_frame)
+
+    def toggle_candle_mode(self):
+        self.candle_mode = self.candlesAct.isChecked()
+        self.redraw_price_charts()
+
+    # reads the correlation options from the view menu
+    def set_correlation_options(self):
+        self.corr_returns = self.corrReturnsAct.isChecked()
+        self.corr_method = 'spearman' if self.corrSpearmanAct.isChecked() else 'pearson'
+        self.corr_cluster = self.corrClusterAct.isChecked()
+        self.corr_rolling = self.corrRollingAct.isChecked()
+        self.update_rolling_correlation()
+        if self.show_correlations_view:
+            self.redraw_graphs()
 
     def toggle_coinlist_editor_view(self):
         if self.show_coinlist_editor_view:
-            # self.page_layout.removeWidget(self.CoinListEditorWidget)
-            self.CoinListEditorWidget.setParent(None)
+            self.CoinListEditorWidget.hide()
             self.show_coinlist_editor_view = False
         else:
             # show editor mode, hide growth rates view if needed
@@ -407,48 +1014,92 @@ class CryptoGui(QtWidgets.QMainWindow):
                 self.toggle_growth_rates_view()
             if self.show_correlations_view:
                 self.toggle_correlations_view()
-            self.CoinListEditorWidget = CoinListEditor(self, self.coinListIndex, dark_mode=self.dark_mode)
-            self.CoinListEditorWidget.set_color_mode(self.dark_mode)
-            self.CoinListEditorWidget.setMinimumHeight(int(self.height / 2))
-            self.CoinListEditorWidget.setContentsMargins(100, 0, 100, 0)
-            self.page_layout.addWidget(self.CoinListEditorWidget)
+            if self.show_table_view:
+                self.toggle_table_view()
+            if self.CoinListEditorWidget is None:
+                # the editor is rarely used, its module is only imported when it is opened the first time
+                from coinlist_editor import CoinListEditor
+                self.CoinListEditorWidget = CoinListEditor(self, self.coinListIndex, dark_mode=self.dark_mode)
+                self.CoinListEditorWidget.setMinimumHeight(int(self.height / 2))
+                self.CoinListEditorWidget.setContentsMargins(100, 0, 100, 0)
+                self.page_layout.addWidget(self.CoinListEditorWidget)
+            else:
+                # the selected coin list may have changed while the editor was hidden
+                self.CoinListEditorWidget.set_coin_list_index(self.coinListIndex)
             self.show_coinlist_editor_view = True
             self.CoinListEditorWidget.set_color_mode(self.dark_mode)
+            self.CoinListEditorWidget.show()
         self.show()
 
 
+    # starts a background fetch, a fetch still running for an older selection is cancelled
+    # if the selection changed the price charts show placeholders until the data of each coin arrives
     def fetch_price_data(self, currency, time, lim, coinList):
         print(f"{get_time_now()}: fetching new data from API")
-        all_price_data = loop.run_until_complete(main(currency, time, lim, coinList))
-        return all_price_data
-
-
-    def reload_coinlist_files(self):
-        # load all coins lists from file
-        self.allCoins, self.all_coin_lists = load_coin_lists_from_file()
-        # set current coin list
-        self.coinList = self.all_coin_lists[self.coinListIndex]
-
+        get_metrics().begin_refresh(f"{currency}/{time}/{lim}")
+        self.statusBar().showMessage("Fetching price data...")
+        self.PriceChartCanvas.loading = set(coinList)
+        # the full fetch brings every candle up to date, a repair of the old selection is dropped
+        self.repair_fetcher.cancel()
+        self.pending_repair = None
+        interval = INTERVALS[time]
+        self.repaired_time = int(systime.time()) // interval * interval
+        self.repair_started = systime.time()
+        if self.timer0.isActive() and self.timer0.interval() != self.refresh_interval():
+            self.timer0.start(self.refresh_interval())
+        if (currency, time, lim, list(coinList)) != self.price_selection:
+            self.price_selection = (currency, time, lim, list(coinList))
+            self.price_frame = PriceFrame.from_series(coinList, [empty_series() for _ in coinList], currency, time, lim)
+            self.redraw_price_charts()
+        return self.price_fetcher.fetch(lambda progress: main(currency, time, lim, coinList, progress=progress))
+
+
+    # slot for ConfigService.lists_changed (editor or external edit of the lists file)
+    # the current list is followed by name, it is refreshed if its coins or colors changed
+    def on_coin_lists_changed(self):
+        names = self.config.list_names()
+        self.all_coin_lists = self.config.coin_lists()
+        if not names:
+            return
+        if self.coinListName in names:
+            self.coinListIndex = names.index(self.coinListName)
+        else:
+            self.coinListIndex = min(self.coinListIndex, len(names) - 1)
+            self.coinListName = names[self.coinListIndex]
+        self.ParamInputWidget.set_lists(names, self.coinListIndex)
+        coinList = self.all_coin_lists[self.coinListIndex]
+        if list(coinList.items()) != list(self.coinList.items()):
+            self.coinList = coinList
+            self.refresh_data_and_graphs()
+
+
+    # correlation matrix or rolling correlations, depending on the view options
+    def draw_correlations(self):
+        if self.corr_rolling and self.rolling_correlation is not None:
+            self.CorrelationsWidget.draw_rolling(self.coinList, self.rolling_correlation, dark_mode=self.dark_mode)
+        else:
+            self.CorrelationsWidget.draw_graph(self.coinList, self.price_frame, dark_mode=self.dark_mode,
+                                               method=self.corr_method, use_returns=self.corr_returns,
+                                               cluster=self.corr_cluster)
 
+    # hidden views are only marked, they are redrawn when shown
     def redraw_graphs(self):
-        # clear previous figures
-        if self. show_growth_rates_view:
-            self.GrowthRatesWidget.fig.clf()
-            self.GrowthRatesWidget.draw_graph(self.growth_rates, self.coinList)
-        if self.show_correlations_view:
-            self.CorrelationsWidget.fig.clf()
-            self.CorrelationsWidget.draw_graph(self.coinList, self.all_price_data, dark_mode=self.dark_mode)
-            self.CorrelationsWidget.fig.canvas.draw()
-
-        # is always present so we clear it directly
-        self.PriceChartCanvas.fig.clf()
-        # redraw price charts
-        if self.show_indexed_view:
-            self.PriceChartCanvas.draw_indexed_plots(self.coinList, self.currency, self.timeScale, self.time, self.lim, self.all_price_data)
-        else:
-            self.PriceChartCanvas.draw_plots(self.coinList, self.currency, self.timeScale, self.time, self.lim,
-                                             self.all_price_data, vertical_mode=self.vertical)
-        self.PriceChartCanvas.set_color_mode(self.dark_mode)
+        self.dirty_views.update(['growth', 'correlations', 'table'])
+        self.update_views()
+        self.redraw_price_charts()
+
+    # redraw price charts (the canvas reuses its axes as long as coins, grid and mode are unchanged)
+    def redraw_price_charts(self):
+        if self.show_table_view:
+            self.dirty_views.add('prices')
+            return
+        with get_metrics().span('draw_prices'):
+            if self.show_indexed_view:
+                self.PriceChartCanvas.draw_indexed_plots(self.coinList, self.currency, self.timeScale, self.time, self.lim, self.price_frame)
+            else:
+                self.PriceChartCanvas.draw_plots(self.coinList, self.currency, self.timeScale, self.time, self.lim,
+                                                 self.price_frame, vertical_mode=self.vertical, candles=self.candle_mode)
+            self.PriceChartCanvas.set_color_mode(self.dark_mode)
 
     def switch_color_mode(self):
         if self.dark_mode:
@@ -459,15 +1110,22 @@ class CryptoGui(QtWidgets.QMainWindow):
         # main window color
         self.set_color_mode(self.dark_mode)
 
-        # if growth rates , editor, ... modes are open switch their color modes
+        # if growth rates , editor, ... modes are open switch their color modes, hidden ones when shown again
         if self.show_growth_rates_view:
             self.GrowthRatesWidget.set_color_mode(self.dark_mode)
+        else:
+            self.dirty_views.add('growth')
 
-        if self.show_coinlist_editor_view:
+        if self.CoinListEditorWidget is not None:
             self.CoinListEditorWidget.set_color_mode(self.dark_mode)
+
+        if self.TableWidget is not None:
+            self.TableWidget.set_color_mode(self.dark_mode)
             
         if self.show_correlations_view:
             self.CorrelationsWidget.set_color_mode(self.dark_mode)
+        else:
+            self.dirty_views.add('correlations')
 
         # will always be called (as there always will be a PriceChartCanvas as well as the input widgets (for now)
         self.PriceChartCanvas.set_color_mode(self.dark_mode)
@@ -475,7 +1133,10 @@ class CryptoGui(QtWidgets.QMainWindow):
 
         # redraw canvas
         #self.PriceChartCanvas.fig.canvas.update()
-        self.PriceChartCanvas.fig.canvas.draw()
+        if self.show_table_view:
+            self.dirty_views.add('prices')
+        else:
+            self.PriceChartCanvas.fig.canvas.draw()
 
 
     def set_color_mode(self, dark_mode):
@@ -0,0 +1,202 @@
+import os
+import asyncio
+import threading
+import time as systime
+from collections import deque
+
+from api_scheduler import RequestScheduler, API_TIERS, PRIORITY_PREFETCH
+from metrics import get_metrics
+
+########################
+##  Global variables  ##
+########################
+
+# CryptoCompare base urls, can be pointed to a local stand-in (see api_standin.py)
+API_URL = os.environ.get('CRYPTOCOMPARE_API_URL', 'https://min-api.cryptocompare.com').rstrip('/')
+IMAGE_URL = os.environ.get('CRYPTOCOMPARE_IMAGE_URL', 'https://www.cryptocompare.com').rstrip('/')
+
+MAX_CONNECTIONS = 10            # pooled keep-alive connections
+MAX_CONCURRENT_REQUESTS = 10    # requests in flight at the same time
+REQUEST_TIMEOUT = 10.0          # seconds, per network operation (connect, read, ...)
+REQUEST_DEADLINE = 20.0         # seconds, a request without complete response by then fails
+MAX_RETRIES = 3                 # retries after a rate limit response
+HEDGE_REQUESTS = True           # send a duplicate of a request that takes longer than the p95 latency
+HEDGE_MIN_SAMPLES = 20          # latencies measured before requests are hedged
+LATENCY_SAMPLES = 200           # latencies kept for the percentile
+API_TIER = 'free'               # call budget, see api_scheduler.API_TIERS
+
+_http_client = None
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+# CryptoCompare answers with HTTP 429 or with a short error message (HTTP 200) when the rate limit is hit
+def is_rate_limited(response):
+    if response.status_code == 429:
+        return True
+    return len(response.content) < 1024 and b'rate limit' in response.content.lower()
+
+
+def get_retry_after(response):
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, ValueError):
+        return None
+
+
+# HTTP/2 is only available if the optional h2 package is installed (pip install httpx[http2])
+def http2_available():
+    try:
+        import h2
+        return True
+    except ImportError:
+        return False
+
+
+# returns the shared client, created on first use
+def get_http_client():
+    global _http_client
+    if _http_client is None:
+        _http_client = HttpClient()
+    return _http_client
+
+
+###########################
+##### HTTP CLIENT CLASS ###
+###########################
+
+# Shared async HTTP client with keep-alive connection pooling and bounded concurrency
+# All requests run on one event loop in a background thread, so synchronous callers (GUI code) and coroutines
+# running on other loops share the same connection pool
+# Every request has a deadline, a request slower than the p95 latency gets a hedged duplicate and the first
+# response wins (hedges only use spare API budget)
+class HttpClient:
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, max_concurrency=MAX_CONCURRENT_REQUESTS,
+                 timeout=REQUEST_TIMEOUT, rate_limits=API_TIERS[API_TIER], transport=None,
+                 deadline=REQUEST_DEADLINE, hedge=HEDGE_REQUESTS):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.hedge = hedge
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.hedged = 0     # number of hedged duplicates sent
+        self.requests = 0   # requests sent (including hedges and retries)
+        self.throttled = 0  # rate limit responses
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='http-client', daemon=True)
+        self.thread.start()
+
+        # httpx is imported with the first client, it is not needed before the first request (faster startup)
+        import httpx
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2_available(), transport=transport)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.scheduler = RequestScheduler(rate_limits)
+
+    # schedules a coroutine on the client loop, returns a concurrent.futures.Future
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    # runs on the client loop
+    # requests with a priority count against the API budget (see api_scheduler), others (e.g. images) do not
+    async def _get(self, url, params=None, timeout=None, priority=None):
+        for attempt in range(MAX_RETRIES + 1):
+            if priority is not None:
+                await self.scheduler.acquire(priority)
+            response = await self._send(url, params, timeout or self.timeout, priority)
+            if priority is not None:
+                if is_rate_limited(response):
+                    self.throttled += 1
+                    self.scheduler.report_throttled(get_retry_after(response))
+                    continue
+                self.scheduler.report_success()
+            response.raise_for_status()
+            return response
+        raise RateLimitError(f"rate limit exceeded, gave up after {MAX_RETRIES} retries: {url}")
+
+    # one request with a deadline, hedged if it is slower than usual
+    async def _send(self, url, params, timeout, priority):
+        try:
+            return await asyncio.wait_for(self._hedged(url, params, timeout, priority), self.deadline)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"no response after {self.deadline:.1f}s: {url}") from None
+
+    async def _hedged(self, url, params, timeout, priority):
+        tasks = {asyncio.ensure_future(self._request(url, params, timeout))}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                # hedges never use the budget reserved for visible requests
+                if not done and (priority is None or self.scheduler.try_acquire(max(priority, PRIORITY_PREFETCH))):
+                    self.hedged += 1
+                    tasks.add(asyncio.ensure_future(self._request(url, params, timeout)))
+            # the first successful response wins, an error only counts if no other request is left
+            while True:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not tasks:
+                    raise done.pop().exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _request(self, url, params, timeout):
+        async with self.semaphore:
+            self.requests += 1
+            start = systime.monotonic()
+            response = await self.client.get(url, params=params, timeout=timeout)
+            self.latencies.append(systime.monotonic() - start)
+            return response
+
+    # POST: p95 of the measured request latencies in seconds, None without samples
+    def latency_p95(self):
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    # seconds after which a request is hedged (p95 latency), None if hedging is off or there are too few samples
+    def hedge_delay(self):
+        if not self.hedge or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency_p95()
+
+    async def _get_json(self, url, params=None, timeout=None, priority=None):
+        response = await self._get(url, params, timeout, priority)
+        with get_metrics().span('parse'):
+            return response.json()
+
+    async def _get_bytes(self, url, params=None, timeout=None, priority=None):
+        response = await self._get(url, params, timeout, priority)
+        return response.content
+
+    # awaitable from any event loop
+    async def fetch_json(self, url, params=None, timeout=None, priority=None):
+        return await asyncio.wrap_future(self.submit(self._get_json(url, params, timeout, priority)))
+
+    async def fetch_bytes(self, url, params=None, timeout=None, priority=None):
+        return await asyncio.wrap_future(self.submit(self._get_bytes(url, params, timeout, priority)))
+
+    # blocking versions, must not be called from the client loop itself
+    def get_json(self, url, params=None, timeout=None, priority=None):
+        return self.submit(self._get_json(url, params, timeout, priority)).result()
+
+    def get_bytes(self, url, params=None, timeout=None, priority=None):
+        return self.submit(self._get_bytes(url, params, timeout, priority)).result()
+
+    # remaining API budget, e.g. {'second': 20, 'minute': 295, 'hour': 2990}
+    def remaining_budget(self):
+        return self.scheduler.remaining()
+
+    def close(self):
+        self.submit(self.client.aclose()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
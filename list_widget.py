@@ -1,4 +1,4 @@
-from PyQt5.QtWidgets import QListWidget
+from PyQt5.QtWidgets import QListWidget, QListView
 from PyQt5 import QtWidgets, QtCore
 
 # Custom Widget Class that allows drag & drop between QList Widgets
@@ -35,3 +35,24 @@ class ThumbListWidget(QListWidget):
             super(ThumbListWidget, self).dropEvent(event)
         self.setFocus()
 
+
+# List view for big item models (e.g. CoinListModel), drag & drop with ThumbListWidgets
+# Items dragged from a ThumbListWidget are moved (removed there), items dragged from here are copied
+class CoinListView(QListView):
+
+    def __init__(self, parent=None):
+        super(CoinListView, self).__init__(parent)
+        self.setDragDropMode(QtWidgets.QAbstractItemView.DragDrop)
+        self.setDefaultDropAction(QtCore.Qt.CopyAction)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        # all rows have the same height, the view does not measure every row
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QtWidgets.QListView.Batched)
+
+    def dropEvent(self, event):
+        if event.source() is not self:
+            event.setDropAction(QtCore.Qt.MoveAction)
+            super(CoinListView, self).dropEvent(event)
+        else:
+            event.ignore()
+        self.setFocus()
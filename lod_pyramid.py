@@ -0,0 +1,104 @@
+import numpy as np
+
+########################
+##  Global variables  ##
+########################
+
+LOD_FACTOR = 4          # candles per bucket of the next coarser level
+LOD_MIN_BUCKETS = 64    # no coarser level is built once a level has at most LOD_MIN_BUCKETS * LOD_FACTOR buckets
+
+
+###############################
+##### LOD PYRAMID CLASS #######
+###############################
+
+# Multi resolution view of one price series for zoomable charts
+# Level 0 holds the candles, every further level merges LOD_FACTOR buckets of the level below into one
+# (open, high, low, close, min / max close and summed volume), so any time range can be drawn with about one
+# bucket per pixel column no matter how many candles it covers
+class LodPyramid:
+
+    # PRE: series of one coin (see price_frame), x holds the x coordinate of every candle (default: series time)
+    def __init__(self, series, x=None):
+        close = series['close']
+        base = {'x': series['time'] if x is None else x,
+                'open': series['open'],
+                'high': series['high'],
+                'low': series['low'],
+                'close': close,
+                'min': close,
+                'max': close,
+                'volume': series['volumefrom'] + series['volumeto']}
+        self.build(base)
+
+    # level 0 -> all levels
+    def build(self, base):
+        self.levels = [base]
+        while len(self.levels[-1]['x']) > LOD_MIN_BUCKETS * LOD_FACTOR:
+            self.levels.append(self.reduce(self.levels[-1]))
+
+    # PRE: series and x as in __init__, newer data of the same coin (e.g. the refreshed window)
+    # POST: new pyramid of the candles of this one before the first candle of series followed by series, this one
+    # if series is empty
+    def merged(self, series, x=None):
+        pyramid = LodPyramid(series, x)
+        window = pyramid.levels[0]
+        if len(window['x']) == 0:
+            return self
+        keep = np.searchsorted(self.levels[0]['x'], window['x'][0])
+        pyramid.build({field: np.concatenate([self.levels[0][field][:keep], values]) for field, values in window.items()})
+        return pyramid
+
+    @staticmethod
+    def reduce(level):
+        n = len(level['x'])
+        starts = np.arange(0, n, LOD_FACTOR)
+        ends = np.minimum(starts + LOD_FACTOR, n) - 1
+        return {'x': level['x'][starts],
+                'open': level['open'][starts],
+                'high': np.maximum.reduceat(level['high'], starts),
+                'low': np.minimum.reduceat(level['low'], starts),
+                'close': level['close'][ends],
+                'min': np.minimum.reduceat(level['min'], starts),
+                'max': np.maximum.reduceat(level['max'], starts),
+                'volume': np.add.reduceat(level['volume'], starts)}
+
+    def __len__(self):
+        return len(self.levels[0]['x'])
+
+    # x of the first and last candle, (None, None) if the series is empty
+    def bounds(self):
+        x = self.levels[0]['x']
+        if len(x) == 0:
+            return None, None
+        return x[0], x[-1]
+
+    # POST: index of the finest level that has at most `pixels` buckets between x0 and x1
+    def level_for(self, x0, x1, pixels):
+        x = self.levels[0]['x']
+        count = np.searchsorted(x, x1, side='right') - np.searchsorted(x, x0)
+        level = 0
+        while level < len(self.levels) - 1 and count > max(pixels, 1):
+            count //= LOD_FACTOR
+            level += 1
+        return level
+
+    # POST: buckets of the chosen level between x0 and x1 (field -> array), including one bucket beyond each
+    # end so lines run up to the edges of the view
+    def view(self, x0, x1, pixels):
+        return self._slice(self.level_for(x0, x1, pixels), x0, x1)
+
+    def _slice(self, level, x0, x1):
+        buckets = self.levels[level]
+        start = max(np.searchsorted(buckets['x'], x0) - 1, 0)
+        end = np.searchsorted(buckets['x'], x1, side='right') + 1
+        return {f: a[start:end] for f, a in buckets.items()}
+
+    # POST: (x, y) of a price line between x0 and x1, coarse levels are drawn as min / max pairs per bucket so
+    # no spike disappears when zoomed out
+    def line(self, x0, x1, pixels):
+        level = self.level_for(x0, x1, pixels)
+        buckets = self._slice(level, x0, x1)
+        if level == 0:
+            return buckets['x'], buckets['close']
+        return np.repeat(buckets['x'], 2), np.column_stack([buckets['min'], buckets['max']]).ravel()
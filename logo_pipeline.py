@@ -0,0 +1,153 @@
+import os
+import asyncio
+from collections import OrderedDict, deque
+
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+from http_client import get_http_client, IMAGE_URL
+from coin_catalog import get_catalog
+
+########################
+##  Global variables  ##
+########################
+
+LOGO_DIR = 'logos'                  # downloaded logos, one file per ticker
+LOGO_WIDTH = 128                    # px, logos are kept scaled to this width
+CACHE_BYTES = 32 * 1024 * 1024      # scaled pixmaps kept in memory (about 500 logos)
+MAX_DOWNLOADS = 4                   # logos loaded at the same time
+
+_logo_pipeline = None
+
+
+# returns the shared logo pipeline, created on first use
+def get_logo_pipeline():
+    global _logo_pipeline
+    if _logo_pipeline is None:
+        _logo_pipeline = LogoPipeline()
+    return _logo_pipeline
+
+
+# runs in a worker thread: QImage (unlike QPixmap) may be used outside the GUI thread
+# POST: logo scaled to width, null image if the data is no image
+def decode_logo(path, data, width):
+    image = QImage()
+    if data is None:
+        image.load(path)
+    else:
+        image.loadFromData(data)
+        if not image.isNull():
+            with open(path + '.tmp', 'wb') as out_file:
+                out_file.write(data)
+            os.replace(path + '.tmp', path)
+    if image.isNull():
+        return image
+    return image.scaledToWidth(width, Qt.SmoothTransformation)
+
+
+# runs on the http client loop
+# POST: scaled logo, downloaded first if it is not on disk yet
+async def load_logo(path, url, width):
+    data = None
+    if not os.path.exists(path):
+        data = await get_http_client().fetch_bytes(url)
+    # decoding and scaling would block the client loop, a worker thread does it
+    return await asyncio.to_thread(decode_logo, path, data, width)
+
+
+###############################
+##### LOGO PIPELINE CLASS #####
+###############################
+
+# Coin logos for the editor, loaded in the background and kept in memory already scaled
+# Requests are queued and at most MAX_DOWNLOADS are loaded at once (download if needed, decode and scale in a
+# worker thread), a prefetch replaces the queue so logos of coins no longer shown are not loaded anymore
+# Scaled pixmaps are kept in an LRU cache bounded by their size in bytes, logo_ready is emitted for every new logo
+class LogoPipeline(QObject):
+
+    logo_ready = pyqtSignal(str)            # ticker
+    _loaded = pyqtSignal(str, object)       # ticker, QImage or None (emitted by the client thread)
+
+    def __init__(self, directory=LOGO_DIR, width=LOGO_WIDTH, cache_bytes=CACHE_BYTES, parent=None):
+        super(LogoPipeline, self).__init__(parent)
+        self.directory = directory
+        self.width = width
+        self.cache_bytes = cache_bytes
+        self.cache = OrderedDict()  # ticker -> scaled pixmap, least recently used first
+        self.nbytes = 0
+        self.queue = deque()        # tickers waiting to be loaded
+        self.loading = set()        # tickers being loaded
+        self.failed = set()         # tickers without logo (not retried until the next start)
+        self._loaded.connect(self.on_loaded)
+        os.makedirs(self.directory, exist_ok=True)
+
+    # POST: the scaled logo or None, a logo not in memory is loaded first (logo_ready is emitted when it is there)
+    def pixmap(self, ticker):
+        pixmap = self.cache.get(ticker)
+        if pixmap is not None:
+            self.cache.move_to_end(ticker)
+            return pixmap
+        self.request(ticker)
+        return None
+
+    # queues the logos of the given tickers (e.g. the coins of a list), logos queued before are dropped
+    def prefetch(self, tickers):
+        self.queue = deque(ticker for ticker in dict.fromkeys(tickers) if self.is_missing(ticker))
+        self.start_next()
+
+    # loads the logo before all prefetched ones
+    def request(self, ticker):
+        if not self.is_missing(ticker):
+            return
+        if ticker in self.queue:
+            self.queue.remove(ticker)
+        self.queue.appendleft(ticker)
+        self.start_next()
+
+    def is_missing(self, ticker):
+        return ticker not in self.cache and ticker not in self.loading and ticker not in self.failed
+
+    def start_next(self):
+        while self.queue and len(self.loading) < MAX_DOWNLOADS:
+            ticker = self.queue.popleft()
+            catalog = get_catalog()
+            entry = catalog.get(ticker)
+            if entry is None or not entry['ImageUrl']:
+                # requested again when the catalog arrived (see CoinListEditor.on_coin_infos)
+                if not catalog.is_refreshing():
+                    self.failed.add(ticker)
+                continue
+            extension = os.path.splitext(entry['ImageUrl'])[1]
+            path = os.path.join(self.directory, ticker + extension)
+            self.loading.add(ticker)
+            future = get_http_client().submit(load_logo(path, IMAGE_URL + entry['ImageUrl'], self.width))
+            future.add_done_callback(lambda future, ticker=ticker: self.done(ticker, future))
+
+    # called from the client thread, the result is handed to the GUI thread by a queued signal
+    def done(self, ticker, future):
+        if future.cancelled() or future.exception() is not None:
+            if not future.cancelled():
+                print(f"Error loading coin logo {ticker} ({future.exception()})")
+            self._loaded.emit(ticker, None)
+        else:
+            self._loaded.emit(ticker, future.result())
+
+    def on_loaded(self, ticker, image):
+        self.loading.discard(ticker)
+        if image is None or image.isNull():
+            self.failed.add(ticker)
+        else:
+            self.add(ticker, QPixmap.fromImage(image))
+            self.logo_ready.emit(ticker)
+        self.start_next()
+
+    def add(self, ticker, pixmap):
+        self.cache[ticker] = pixmap
+        self.nbytes += self.pixmap_bytes(pixmap)
+        while self.nbytes > self.cache_bytes and len(self.cache) > 1:
+            _, dropped = self.cache.popitem(last=False)
+            self.nbytes -= self.pixmap_bytes(dropped)
+
+    @staticmethod
+    def pixmap_bytes(pixmap):
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
@@ -0,0 +1,241 @@
+import os
+import json
+import time as systime
+import datetime as dt
+import threading
+from collections import deque, defaultdict
+from contextlib import contextmanager
+
+########################
+##  Global variables  ##
+########################
+
+METRICS_DIR = 'metrics'             # exports and profiles are written here
+PROM_FILE = 'metrics.prom'          # Prometheus text format (e.g. for the node exporter textfile collector)
+JSONL_FILE = 'refreshes.jsonl'      # one line per refresh
+METRICS_PREFIX = 'crypto_navi'
+
+SAMPLES = 500                       # durations kept per span for the quantiles
+QUANTILES = [0.5, 0.95, 0.99]
+PROFILE_LINES = 25                  # functions printed after a profiled refresh
+
+_metrics = None
+
+
+# returns the shared metrics registry, created on first use
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
+
+
+def quantile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+# POST: overlapping (start, end) intervals merged, sorted by start
+def merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+# POST: seconds covered by intervals and not by excluded (both merged)
+def covered_seconds(intervals, excluded=()):
+    total = sum(end - start for start, end in intervals)
+    for start, end in intervals:
+        for ex_start, ex_end in excluded:
+            total -= max(0.0, min(end, ex_end) - max(start, ex_start))
+    return total
+
+
+######################
+##### REFRESH CLASS ##
+######################
+
+# Timing trace of one refresh: spans recorded between begin_refresh and end_refresh
+class Refresh:
+
+    def __init__(self, number, label=''):
+        self.number = number
+        self.label = label
+        self.started = systime.time()
+        self.start = systime.perf_counter()
+        self.duration = None
+        self.status = 'running'
+        self.spans = []         # (name, tag, seconds, end), e.g. ('request', 'BTC', 0.21, 1234.5), end: perf_counter
+        self.gauges = {}
+
+    def elapsed(self):
+        return systime.perf_counter() - self.start
+
+    # POST: summed seconds per span name
+    def totals(self):
+        totals = defaultdict(float)
+        for name, _, seconds, _ in self.spans:
+            totals[name] += seconds
+        return dict(totals)
+
+    # POST: seconds per tag of one span name (e.g. request latency per coin)
+    def tagged(self, name):
+        return {tag: seconds for span, tag, seconds, _ in self.spans if span == name and tag is not None}
+
+    # POST: wall clock seconds covered by the spans of name (concurrent spans count once), without the time
+    # covered by the spans of exclude (e.g. parsing inside the requests)
+    def wall_time(self, name, exclude=None):
+        intervals = merge_intervals((end - seconds, end) for span, _, seconds, end in self.spans if span == name)
+        excluded = merge_intervals((end - seconds, end) for span, _, seconds, end in self.spans if span == exclude)
+        return covered_seconds(intervals, excluded)
+
+    def to_dict(self):
+        return {'refresh': self.number,
+                'label': self.label,
+                'time': dt.datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'status': self.status,
+                'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+                'spans_ms': {name: round(seconds * 1000, 3) for name, seconds in self.totals().items()},
+                'requests_ms': {tag: round(seconds * 1000, 3) for tag, seconds in self.tagged('request').items()},
+                'gauges': self.gauges}
+
+
+######################
+##### METRICS CLASS ##
+######################
+
+# Registry of timing spans and gauges
+# Spans may be recorded from any thread (GUI and http client loop), a span recorded while a refresh is running
+# is also added to its trace, so background requests that overlap a refresh are counted in it as well
+# Finished refreshes are exported (Prometheus text file + JSONL) if export is on, one refresh can be profiled
+class Metrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=SAMPLES))  # span name -> recent durations
+        self.sums = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.gauges = {}                # (name, labels) -> value, labels is a tuple of (key, value) pairs
+        self.refresh = None             # running refresh
+        self.last_refresh = None        # last finished refresh
+        self.refreshes = 0
+        self.export = False
+        self.directory = METRICS_DIR
+        self.profile_next = False       # profile the next refresh
+        self.profiler = None
+        self.last_profile = None        # file of the last profile
+
+    @contextmanager
+    def span(self, name, tag=None):
+        start = systime.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, systime.perf_counter() - start, tag)
+
+    def record(self, name, seconds, tag=None):
+        with self.lock:
+            self.samples[name].append(seconds)
+            self.sums[name] += seconds
+            self.counts[name] += 1
+            if self.refresh is not None:
+                self.refresh.spans.append((name, tag, seconds, systime.perf_counter()))
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+            if self.refresh is not None:
+                key = name + ''.join(f"_{v}" for _, v in sorted(labels.items()))
+                self.refresh.gauges[key] = value
+
+    def quantile(self, name, q):
+        with self.lock:
+            return quantile(list(self.samples.get(name, ())), q)
+
+    # starts the trace of a refresh, a refresh still running is finished as superseded
+    def begin_refresh(self, label=''):
+        if self.refresh is not None:
+            self.end_refresh('superseded')
+        with self.lock:
+            self.refreshes += 1
+            self.refresh = Refresh(self.refreshes, label)
+        if self.profile_next:
+            # cProfile only sees the calling (GUI) thread: parsing on the client loop shows up in the spans only
+            import cProfile
+            self.profile_next = False
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self.refresh
+
+    # POST: returns the finished refresh (None if none was running)
+    def end_refresh(self, status='ok'):
+        with self.lock:
+            refresh = self.refresh
+            self.refresh = None
+        if refresh is None:
+            return None
+        refresh.duration = refresh.elapsed()
+        refresh.status = status
+        self.record('refresh', refresh.duration)
+        self.last_refresh = refresh
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.save_profile(self.profiler, refresh)
+            self.profiler = None
+        if self.export:
+            try:
+                self.write_exports(refresh)
+            except OSError as e:
+                print(f"Error writing metrics ({e})")
+        return refresh
+
+    def save_profile(self, profiler, refresh):
+        import pstats
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = dt.datetime.fromtimestamp(refresh.started).strftime('%Y%m%d-%H%M%S')
+        self.last_profile = os.path.join(self.directory, f"refresh-{stamp}.prof")
+        profiler.dump_stats(self.last_profile)
+        print(f"profile of refresh {refresh.number} written to {self.last_profile} (open with snakeviz or pstats)")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(PROFILE_LINES)
+
+    # POST: all metrics in the Prometheus text format
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            names = sorted(self.samples)
+            lines.append(f"# HELP {METRICS_PREFIX}_span_seconds Duration of the refresh stages")
+            lines.append(f"# TYPE {METRICS_PREFIX}_span_seconds summary")
+            for name in names:
+                values = list(self.samples[name])
+                for q in QUANTILES:
+                    lines.append(f'{METRICS_PREFIX}_span_seconds{{span="{name}",quantile="{q}"}} {quantile(values, q):.6f}')
+                lines.append(f'{METRICS_PREFIX}_span_seconds_sum{{span="{name}"}} {self.sums[name]:.6f}')
+                lines.append(f'{METRICS_PREFIX}_span_seconds_count{{span="{name}"}} {self.counts[name]}')
+            gauge_names = sorted({name for name, _ in self.gauges})
+            for gauge in gauge_names:
+                # *_total values only grow (request and cache counts)
+                kind = 'counter' if gauge.endswith('_total') else 'gauge'
+                lines.append(f"# TYPE {METRICS_PREFIX}_{gauge} {kind}")
+                for (name, labels), value in sorted(self.gauges.items()):
+                    if name != gauge:
+                        continue
+                    label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                    label_text = '{' + label_text + '}' if label_text else ''
+                    lines.append(f"{METRICS_PREFIX}_{name}{label_text} {value}")
+        return '\n'.join(lines) + '\n'
+
+    # the Prometheus file is replaced atomically so a collector never reads half a file
+    def write_exports(self, refresh):
+        os.makedirs(self.directory, exist_ok=True)
+        prom_file = os.path.join(self.directory, PROM_FILE)
+        with open(prom_file + '.tmp', 'w') as outfile:
+            outfile.write(self.to_prometheus())
+        os.replace(prom_file + '.tmp', prom_file)
+        with open(os.path.join(self.directory, JSONL_FILE), 'a') as outfile:
+            outfile.write(json.dumps(refresh.to_dict()) + '\n')
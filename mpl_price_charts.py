@@ -1,13 +1,18 @@
+from PyQt5.QtCore import pyqtSignal, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.figure import Figure
 import math
 import numpy as np
 import datetime as dt
-from scipy.stats import linregress
 
 import matplotlib.dates as mdates
 import matplotlib.artist as marts
-from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.colors import LinearSegmentedColormap, to_rgba_array
+from matplotlib.collections import PolyCollection, LineCollection
+
+from correlation import correlation_matrix, log_returns, cluster_order
+from lod_pyramid import LodPyramid
+from price_frame import PRICE_FIELDS, to_mpl_dates, from_mpl_dates
 
 # custom colors
 # dark mode
@@ -22,6 +27,25 @@ FACE_COL_L = "lightgrey"
 TITLE_COL = "k"
 GRID_COL = "grey"
 
+# correlation matrix: max. number of coins with tick labels / with a value printed in every cell
+TICKS_MAX = 60
+ANNOTATIONS_MAX = 20
+# rolling correlations: ms per frame when playing the matrix over time
+PLAY_INTERVAL = 100
+# price charts: zoom factor per mouse wheel step
+ZOOM_STEP = 1.25
+# price charts: ms without resize events before the layout of a new canvas size is computed
+LAYOUT_DELAY = 200
+# candlestick charts: min. pixels per candle (finer candles are merged, see lod_pyramid), candle colors
+CANDLE_PIXELS = 4
+CANDLE_UP = "#26a69a"
+CANDLE_DOWN = "#ef5350"
+# indexed view: line under the mouse (px distance) is highlighted, the others are dimmed
+INDEXED_TITLE = "Indexed Crypto Prices"
+HOVER_PIXELS = 8
+HOVER_WIDTH = 2.5
+DIM_ALPHA = 0.25
+
 
 # HELPER FUNCTIONS
 
@@ -38,12 +62,23 @@ def make_grid(current_coin_list):
         col = math.ceil(list_len / row)
     return row, col
 
+# upper triangle of a correlation matrix set to NaN (not drawn)
+def lower_triangle(matrix):
+    return np.where(np.tri(len(matrix), dtype=bool), matrix, np.nan)
+
 ########################
 ##### PLOT CLASS #######
 ########################
 
+# Price charts are drawn from a LOD pyramid of each coins prices (about one bucket per pixel column)
+# Mouse wheel zooms and dragging pans a chart (grid mode), a double click goes back to the selected window
+# Zoomed charts keep their time range on refresh, history_needed asks for older candles (see set_history)
+# A right click expands a chart to the whole canvas (and back), in candle mode every chart draws OHLC candles
+# as two collections (wicks and bodies) instead of one artist per candle
 class MplPriceChartsCanvas(FigureCanvasQTAgg):
 
+    history_needed = pyqtSignal(str, float)     # coin, unix time the chart should reach back to
+
     def __init__(self, current_coin_list, dark_mode=True, width=5, height=4, dpi=100):
         self.fig = Figure(figsize=(width, height), dpi=dpi)
         super(MplPriceChartsCanvas, self).__init__(self.fig)
@@ -56,29 +91,311 @@ class MplPriceChartsCanvas(FigureCanvasQTAgg):
 
         self.coin_list = current_coin_list
         self.growth_rates = []
-        self.all_price_data = []
-
-
-    def draw_plots(self, coin_list, currency, timeScale, time, lim, all_price_data, vertical_mode=False):
 
+        # axes and artists are kept between redraws and only rebuilt if the structure of the charts changes
         self.sub_plots = []
+        self.structure = None       # (mode, coins, synthetic coins, rows, cols, vertical mode) of the current axes
+        self.lines = {}             # coin -> Line2D of the prices
+        self.candles = {}           # coin -> (LineCollection of the wicks, PolyCollection of the bodies)
+        self.candle_mode = False
+        self.expanded = None        # coin shown alone on the whole canvas
+        self.draw_args = None       # arguments of the last draw_plots call (to redraw on expanding)
+        self.volumes = {}           # coin -> PolyCollection of the volumes on a twinx axis ('all' in indexed mode)
+        self.indexed_lines = None   # LineCollection of all coins in indexed mode (one segment per coin)
+        self.indexed_coins = []     # coins of the segments
+        self.indexed_colors = None  # RGBA per segment
+        self.indexed_segments = []  # (date, indexed price) points per coin, empty if the coin is not drawn
+        self.indexed_data = None    # (dates, first, indexed prices): dates of the longest coin, its first valid column
+                                    # and the indexed prices of the drawn coins (coins x time)
+        self.hover_line = None      # Line2D of the highlighted coin in indexed mode
+        self.hovered = None         # index of the highlighted coin
+        self.placeholders = {}      # coin -> Text shown instead of the chart while the coin has no data
+        self.loading = set()        # coins whose data is still being fetched
+        self.time_scale = None      # time scale the date locators are set up for
+        # tight_layout is expensive, its result is cached per structure and figure size (pixels)
+        self.layouts = {}
+        self.layout_key = None
+        # showing / hiding the other views resizes the canvas
+        self.layout_timer = QTimer(self)
+        self.layout_timer.setSingleShot(True)
+        self.layout_timer.timeout.connect(self.on_resized)
+
+        # zoom and pan
+        self.price_frame = None
+        self.selection = None       # (currency, time, lim) the charts show, zooming is reset if it changes
+        self.pyramids = {}          # coin -> LodPyramid of the drawn prices (selected window or loaded history)
+        self.zoomed = set()         # coins whose time range was changed by the user
+        self.exhausted = set()      # coins without older history
+        self.axes_coins = {}        # axes (incl. volume twins) -> coin
+        self.pan = None             # (coin, x pixel, x limits) while dragging
+        self.mpl_connect('scroll_event', self.on_scroll)
+        self.mpl_connect('button_press_event', self.on_press)
+        self.mpl_connect('motion_notify_event', self.on_motion)
+        self.mpl_connect('motion_notify_event', self.on_hover)
+        self.mpl_connect('axes_leave_event', self.on_hover)
+        self.mpl_connect('button_release_event', self.on_release)
+
+
+    def draw_plots(self, coin_list, currency, timeScale, time, lim, price_frame, vertical_mode=False, candles=False):
 
         # reset array where growth rates are calculated
         self.growth_rates = []
+        self.draw_args = (coin_list, currency, timeScale, time, lim, vertical_mode, candles)
+        self.candle_mode = candles
 
-        agregated_volumes = [0 for _ in range(lim+1)]
+        if self.expanded in coin_list:
+            coin_list = {self.expanded: coin_list[self.expanded]}
+            vertical_mode = False
+        else:
+            self.expanded = None
 
         if vertical_mode:
             col = 1
             row = len(coin_list)
         else:
             row, col = make_grid(coin_list)
+
+        synthetic = tuple(coin for coin in coin_list if coin in price_frame.synthetic)
+        structure = ('grid', tuple(coin_list.items()), synthetic, row, col, vertical_mode)
+        if structure != self.structure:
+            self.build_plots(coin_list, synthetic, row, col, vertical_mode)
+            self.structure = structure
+        self.price_frame = price_frame
+        if (currency, time, lim) != self.selection:
+            self.selection = (currency, time, lim)
+            self.reset_zoom()
+
+        for coin in self.lines:
+            self.update_coin_plot(coin, price_frame)
+
+        self.update_xaxis(timeScale)
+        self.update_layout()
+        self.fig.canvas.draw()
+
+    # updates the chart of one coin as soon as its data arrived, the canvas is redrawn when the GUI is idle
+    def update_coin(self, coin, price_frame):
+        self.loading.discard(coin)
+        self.price_frame = price_frame
+        if self.structure is None:
+            return
+        if self.structure[0] == 'indexed' and coin in self.indexed_coins:
+            self.update_indexed_plot(price_frame)
+        elif coin in self.lines:
+            self.update_coin_plot(coin, price_frame)
+        else:
+            return
+        self.draw_idle()
+
+    def update_coin_plot(self, coin, price_frame):
+        # slices of the current coin from the price frame (coin == base currency comes as flat 1.0 prices)
+        prices = price_frame.series(coin, 'close')
+        series = {field: price_frame.series(coin, field) for field in PRICE_FIELDS}
+        if coin in self.zoomed and coin in self.pyramids:
+            # zoomed charts keep their time range and loaded history, the new window replaces their newest candles
+            self.pyramids[coin] = self.pyramids[coin].merged(series, x=price_frame.series(coin, 'dates'))
+        else:
+            self.pyramids[coin] = LodPyramid(series, x=price_frame.series(coin, 'dates'))
+        self.render_coin(coin)
+        sub_plt = self.lines[coin].axes
+
+        # placeholder while the coin is loading or if there is no data
+        placeholder = self.placeholders[coin]
+        placeholder.set_visible(len(prices) == 0)
+        placeholder.set_text('Loading...' if coin in self.loading else 'No data')
+
+        # special case: coin == base currency, no price infos and volumes
+        if coin not in self.volumes:
+            return
+
+        if len(prices):
+            price_info = 'Low: {} - High: {} - Last: {}'.format(prices.min(), prices.max(), prices[-1])
+        else:
+            price_info = 'n/a'
+        sub_plt.set_xlabel(price_info)
+
+    # draws the prices and volumes of the visible time range at the level of detail of the axis width
+    def render_coin(self, coin):
+        pyramid = self.pyramids[coin]
+        line = self.lines[coin]
+        sub_plt = line.axes
+        first, last = pyramid.bounds()
+        wicks, bodies = self.candles[coin]
+        line.set_visible(not self.candle_mode)
+        wicks.set_visible(self.candle_mode)
+        bodies.set_visible(self.candle_mode)
+        if coin in self.zoomed:
+            x0, x1 = sub_plt.get_xlim()
+        elif first is not None:
+            x0, x1 = first, last
+        else:
+            line.set_data([], [])
+            self.set_candles(coin, None)
+            if coin in self.volumes:
+                self.set_volumes(self.volumes[coin], [], [])
+            return
+        pixels = int(sub_plt.bbox.width)
+
+        if self.candle_mode:
+            buckets = pyramid.view(x0, x1, pixels // CANDLE_PIXELS)
+            self.set_candles(coin, buckets)
+            line.set_data([], [])
+            low, high = buckets['low'], buckets['high']
+            if coin not in self.zoomed and len(buckets['x']):
+                half = self.candle_width(buckets['x'])
+                sub_plt.set_xlim(buckets['x'][0] - half, buckets['x'][-1] + half)
+        else:
+            buckets = pyramid.view(x0, x1, pixels)
+            x, y = pyramid.line(x0, x1, pixels)
+            line.set_data(x, y)
+            self.set_candles(coin, None)
+            low = high = y
+            if coin not in self.zoomed:
+                sub_plt.relim()
+                sub_plt.set_autoscale_on(True)
+                sub_plt.autoscale_view()
+        if (coin in self.zoomed or self.candle_mode) and len(low):
+            # y axis follows the visible prices
+            low, high = np.nanmin(low), np.nanmax(high)
+            margin = (high - low) * 0.05 or abs(high) * 0.05 or 1.0
+            sub_plt.set_ylim(low - margin, high + margin)
+        if coin in self.volumes:
+            self.set_volumes(self.volumes[coin], buckets['x'], buckets['volume'])
+
+    # width of a candle (70% of the spacing of the buckets)
+    @staticmethod
+    def candle_width(x):
+        if len(x) < 2:
+            return 0.5 / 24
+        return np.median(np.diff(x)) * 0.7
+
+    # PRE: buckets of a LOD pyramid level (see LodPyramid.view) or None to remove the candles
+    def set_candles(self, coin, buckets):
+        wicks, bodies = self.candles[coin]
+        if buckets is None or len(buckets['x']) == 0:
+            wicks.set_segments([])
+            bodies.set_verts([])
+            return
+        x = buckets['x']
+        half = self.candle_width(x) / 2
+        colors = np.where(buckets['close'] >= buckets['open'], CANDLE_UP, CANDLE_DOWN)
+        wicks.set_segments(np.stack([np.column_stack([x, buckets['low']]), np.column_stack([x, buckets['high']])], axis=1))
+        wicks.set_color(colors)
+        left, right = x - half, x + half
+        bottom, top = buckets['open'], buckets['close']
+        bodies.set_verts(np.stack([np.column_stack([left, bottom]), np.column_stack([left, top]),
+                                   np.column_stack([right, top]), np.column_stack([right, bottom])], axis=1))
+        bodies.set_facecolor(colors)
+        bodies.set_edgecolor(colors)
+
+    # PRE: all stored candles of a coin (oldest first)
+    # POST: the zoomed chart of the coin is drawn from them and the current window (newer candles than the stored
+    # ones), if they reach no further back than the drawn data there is no older history and it is not asked for again
+    def set_history(self, coin, series):
+        if coin not in self.zoomed or coin not in self.pyramids:
+            return
+        old_first = self.pyramids[coin].bounds()[0]
+        pyramid = LodPyramid(series, x=to_mpl_dates(series['time']))
+        if self.price_frame is not None and coin in self.price_frame.rows:
+            window = {field: self.price_frame.series(coin, field) for field in PRICE_FIELDS}
+            pyramid = pyramid.merged(window, x=self.price_frame.series(coin, 'dates'))
+        first = pyramid.bounds()[0]
+        if first is None or (old_first is not None and first >= old_first):
+            self.exhausted.add(coin)
+        if first is None:
+            return
+        self.pyramids[coin] = pyramid
+        self.render_coin(coin)
+        self.draw_idle()
+        self.request_history(coin)
+
+    # asks for older candles while the visible time range of a zoomed chart starts before its data
+    def request_history(self, coin):
+        x0 = self.lines[coin].axes.get_xlim()[0]
+        first = self.pyramids[coin].bounds()[0]
+        if first is not None and x0 < first and coin not in self.exhausted:
+            self.history_needed.emit(coin, float(from_mpl_dates(x0)))
+
+    # PRE: x0, x1 in matplotlib dates
+    def set_view(self, coin, x0, x1):
+        sub_plt = self.lines[coin].axes
+        if coin not in self.zoomed:
+            self.zoomed.add(coin)
+            # the fixed locators of the selected window would put thousands of ticks on a zoomed out axis
+            locator = mdates.AutoDateLocator()
+            sub_plt.xaxis.set_major_locator(locator)
+            sub_plt.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        sub_plt.set_xlim(x0, x1)
+        self.render_coin(coin)
+        self.draw_idle()
+        self.request_history(coin)
+
+    # back to the selected time window
+    def reset_view(self, coin):
+        self.zoomed.discard(coin)
+        self.format_xaxis(self.lines[coin].axes, self.time_scale)
+        self.update_coin_plot(coin, self.price_frame)
+        self.draw_idle()
+
+    def reset_zoom(self):
+        self.zoomed = set()
+        self.exhausted = set()
+        self.pan = None
+        self.time_scale = None      # zoomed axes have other locators
+
+    # returns the coin of a zoomable chart under the mouse (None for other axes and in indexed mode)
+    def zoomable_coin(self, event):
+        coin = self.axes_coins.get(event.inaxes)
+        if coin is None or coin not in self.volumes or coin not in self.pyramids:
+            return None
+        return coin
+
+    def on_scroll(self, event):
+        coin = self.zoomable_coin(event)
+        if coin is None:
+            return
+        sub_plt = self.lines[coin].axes
+        x0, x1 = sub_plt.get_xlim()
+        # mouse position on the price axes (the event comes from the volume twin on top of it)
+        x = sub_plt.transData.inverted().transform((event.x, event.y))[0]
+        scale = ZOOM_STEP ** -event.step
+        self.set_view(coin, x - (x - x0) * scale, x + (x1 - x) * scale)
+
+    def on_press(self, event):
+        if event.button == 3 and event.inaxes in self.axes_coins:
+            self.toggle_expanded(self.axes_coins[event.inaxes])
+            return
+        coin = self.zoomable_coin(event)
+        if coin is None or event.button != 1:
+            return
+        if event.dblclick:
+            self.pan = None
+            self.reset_view(coin)
+            return
+        self.pan = (coin, event.x, self.lines[coin].axes.get_xlim())
+
+    def on_motion(self, event):
+        if self.pan is None or event.x is None:
+            return
+        coin, start, (x0, x1) = self.pan
+        shift = (event.x - start) * (x1 - x0) / self.lines[coin].axes.bbox.width
+        self.set_view(coin, x0 - shift, x1 - shift)
+
+    def on_release(self, event):
+        self.pan = None
+
+    # shows one coin on the whole canvas or goes back to all coins
+    def toggle_expanded(self, coin):
+        self.expanded = None if self.expanded else coin
+        if self.draw_args is not None:
+            coin_list, currency, timeScale, time, lim, vertical_mode, candles = self.draw_args
+            self.draw_plots(coin_list, currency, timeScale, time, lim, self.price_frame, vertical_mode, candles)
+
+    # creates the subplots, one price line and volume collection per coin
+    def build_plots(self, coin_list, synthetic, row, col, vertical_mode):
+        self.clear_plots()
         pl = 1  # sublots counter
 
         for coin in coin_list:
-            # flag cases with wrong or missing data
-            draw_current_coin = True
-
             # draw current sublot
             sub_plt = self.fig.add_subplot(row, col, pl)
             self.sub_plots.append(sub_plt)
@@ -86,182 +403,234 @@ class MplPriceChartsCanvas(FigureCanvasQTAgg):
                 sub_plt.set_title(coin, color='#000000', size='small')
             sub_plt.tick_params(axis='both', which='major', labelsize=6, labelcolor='#000000')
             pl += 1
-            # extract prices for current coin from all_price_data
-            price_data = all_price_data[coin]
-            prices = []
-            times = []
-            volumes = []
-
-            # mambojambo to catch special case: coin == base currency (no data provided by api)
-            # write prices and dates to array avoiding exceptions and ugly graphs further down
-            if currency == coin:
-                for i in range(lim + 1):
-                    prices.append(1.0)
-                    volumes.append(1.0)
-                    if time == 'minute':
-                        d = dt.datetime.now() - dt.timedelta(minutes=lim)
-                        d = d + dt.timedelta(minutes=i)
-                    elif time == 'hour':
-                        d = dt.datetime.now() - dt.timedelta(hours=lim)
-                        d = d + dt.timedelta(hours=i)
-                    elif time == 'day':
-                        d = dt.datetime.now() - dt.timedelta(days=lim)
-                        d = d + dt.timedelta(days=i)
-                    times.append(d)
-
-                sub_plt.set_facecolor(self.face_color)
-                sub_plt.xaxis.grid(color=GRID_COL, linestyle='dashed')
-                sub_plt.yaxis.grid(color=GRID_COL, linestyle='dashed')
-
-                # drawing the plot
-                sub_plt.plot(times, prices, color=coin_list[coin])
-                sub_plt.set_facecolor(self.face_color)
-
-            # Normal case: Coin != base currency
+
+            self.lines[coin], = sub_plt.plot([], [], color=coin_list[coin])
+            self.candles[coin] = (LineCollection([], linewidths=0.8), PolyCollection([], linewidths=0.5))
+            for collection in self.candles[coin]:
+                sub_plt.add_collection(collection, autolim=False)
+            self.axes_coins[sub_plt] = coin
+            sub_plt.set_facecolor(self.face_color)
+            sub_plt.xaxis.grid(color=GRID_COL, linestyle='dashed')
+            sub_plt.yaxis.grid(color=GRID_COL, linestyle='dashed')
+            self.placeholders[coin] = sub_plt.text(0.5, 0.5, '', transform=sub_plt.transAxes, ha='center',
+                                                   va='center', color=GRID_COL, size='small', visible=False)
+
+            if coin in synthetic:
+                continue
+
+            if vertical_mode:
+                sub_plt.xaxis.label.set_fontsize('xx-small')
             else:
-                for i, data in enumerate(price_data):
-                    prices.append(data["close"])
-                    times.append(dt.datetime.fromtimestamp(data["time"]))
-                    coin_volume = data["volumefrom"] + data["volumeto"]
-                    volumes.append(coin_volume)
-                    try:
-                        agregated_volumes[i] += coin_volume
-                    # first coin (agregated volumes still empty)
-                    except Exception as e:
-                        agregated_volumes.append(coin_volume)
-
-                # draw plot for current coin
-                if draw_current_coin:
-                    sub_plt.plot(times, prices, color=coin_list[coin])
-
-                sub_plt.set_facecolor(self.face_color)
-                sub_plt.xaxis.grid(color=GRID_COL, linestyle='dashed')
-                sub_plt.yaxis.grid(color=GRID_COL, linestyle='dashed')
-                # sub_plt.tick_params(axis='y', labelcolor=color)
-
-                if vertical_mode:
-                    sub_plt.xaxis.label.set_fontsize('xx-small')
-                else:
-                    sub_plt.xaxis.label.set_fontsize('small')
-
-                try:
-                    price_info = 'Low: {} - High: {} - Last: {}'.format(min(prices), max(prices), prices[lim-1])
-                except ValueError:
-                    price_info = 'n/a'
-                sub_plt.set(xlabel=price_info, facecolor='#3a3a3a', xticklabels=[])
-
-                # draw volumes on secondary axis
-                ax2 = sub_plt.twinx()
-                ax2.fill_between(times, 0, volumes, facecolor='#000000', alpha=0.3)
-                ax2.axis('off')
-            # END OF COIN LOOP
+                sub_plt.xaxis.label.set_fontsize('small')
 
-        # format time axis
-        for sp in self.sub_plots:
-            self.format_xaxis(sp, timeScale)
+            # volumes on secondary axis
+            self.volumes[coin] = self.add_volumes(sub_plt)
+            self.axes_coins[self.volumes[coin].axes] = coin
+            # END OF COIN LOOP
 
-        # update figure
-        self.fig.tight_layout(h_pad=1)
-        self.fig.canvas.draw()
 
+    def draw_indexed_plots(self, coin_list, currency, timeScale, time, lim, price_frame):
 
+        # reset array where growth rates are calculated
+        self.growth_rates = []
 
-    def draw_indexed_plots(self, coin_list, currency, timeScale, time, lim, all_price_data):
+        structure = ('indexed', tuple(coin_list.items()))
+        if structure != self.structure:
+            self.build_indexed_plots(coin_list)
+            self.structure = structure
 
-        self.sub_plots = []
+        self.update_indexed_plot(price_frame)
 
-        # reset array where growth rates are calculated
-        self.growth_rates = []
+        self.update_xaxis(timeScale)
+        self.update_layout()
+        self.fig.canvas.draw()
 
-        agregated_volumes = [0 for _ in range(lim+1)]
+    # all coins indexed to 100 at their first candle at once (coins x time matrix), one segment per coin
+    def update_indexed_plot(self, price_frame):
+        rows = np.array([price_frame.rows.get(coin, -1) for coin in self.indexed_coins], dtype=np.int64)
+        known = rows >= 0
+        dates = np.full((len(rows), price_frame.width()), np.nan)
+        prices = np.full((len(rows), price_frame.width()), np.nan)
+        lengths = np.zeros(len(rows), dtype=np.int64)
+        dates[known] = price_frame.dates[rows[known]]
+        prices[known] = price_frame.close[rows[known]]
+        lengths[known] = price_frame.length[rows[known]]
+
+        # series are right aligned, the first valid candle of a coin is its base
+        starts = prices.shape[1] - lengths
+        base = np.full(len(rows), np.nan)
+        has_data = lengths > 0
+        base[has_data] = prices[has_data, starts[has_data]]
+        # indexed mode -> coins without a valid base price are not drawn
+        base[base == 0] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            indexed = prices / base[:, None] * 100
+
+        points = np.stack([dates, indexed], axis=-1)
+        self.indexed_segments = [points[i, start:] if np.isfinite(base[i]) else points[i, :0]
+                                 for i, start in enumerate(starts)]
+        self.indexed_lines.set_segments(self.indexed_segments)
+        # all coins share the candle times (right aligned), the longest series has every valid column
+        longest = int(np.argmax(lengths)) if len(rows) else None
+        self.indexed_data = (dates[longest] if longest is not None else np.zeros(0),
+                             int(starts[longest]) if longest is not None else 0, indexed)
+        if self.hovered is not None:
+            self.hover_line.set_data(*self.indexed_segments[self.hovered].T)
+
+        sub_plt = self.sub_plots[0]
+        drawn = np.isfinite(indexed)
+        if drawn.any():
+            x0, x1 = dates[drawn].min(), dates[drawn].max()
+            y0, y1 = indexed[drawn].min(), indexed[drawn].max()
+            # same margins as autoscale_view
+            sub_plt.set_xlim(*self.with_margins(x0, x1, sub_plt.margins()[0]))
+            sub_plt.set_ylim(*self.with_margins(y0, y1, sub_plt.margins()[1]))
+
+        times, agregated_volumes = price_frame.total_volume()
+        self.set_volumes(self.volumes['all'], times, agregated_volumes)
+
+    @staticmethod
+    def with_margins(low, high, margin):
+        span = high - low if high > low else abs(high) or 1.0
+        return low - span * margin, high + span * margin
+
+    def build_indexed_plots(self, coin_list):
+        self.clear_plots()
 
         sub_plt = self.fig.add_subplot(111)
         self.sub_plots.append(sub_plt)
-        sub_plt.set_title("Indexed Crypto Prices", color='#000000', size='medium')
+        sub_plt.set_title(INDEXED_TITLE, color='#000000', size='medium')
         sub_plt.xaxis.label.set_fontsize('x-small')
         sub_plt.tick_params(axis='both', which='major', labelsize=6, labelcolor='#000000')
 
-        for coin in coin_list:
-            # flag cases with wrong or missing data
-            draw_current_coin = True
-
-            # extract prices for current coin from all_price_data
-            price_data = all_price_data[coin]
-            prices = []
-            times = []
-            volumes = []
-
-            # mambojambo to catch special case: coin == base currency (no data provided by api)
-            # write prices/volumes (with 1.0) and date/times created manually avoiding exceptions and ugly graphs further down
-            if currency == coin:
-                for i in range(lim + 1):
-                    prices.append(1.0)
-                    volumes.append(1.0)
-                    if time == 'minute':
-                        d = dt.datetime.now() - dt.timedelta(minutes=lim)
-                        d = d + dt.timedelta(minutes=i)
-                    elif time == 'hour':
-                        d = dt.datetime.now() - dt.timedelta(hours=lim)
-                        d = d + dt.timedelta(hours=i)
-                    elif time == 'day':
-                        d = dt.datetime.now() - dt.timedelta(days=lim)
-                        d = d + dt.timedelta(days=i)
-                    times.append(d)
-
-                # indexed mode -> we need to index all prices
-                base = prices[0]
-                for i in range(len(prices)):
-                    prices[i] = prices[i] / base * 100
-
-                # drawing the plot
-                sub_plt.plot(times, prices, color=coin_list[coin])
-                #sub_plt.set_facecolor(self.face_color)
-
-            # Normal case: Coin != base currency
-            else:
-                for i, data in enumerate(price_data):
-                    prices.append(data["close"])
-                    times.append(dt.datetime.fromtimestamp(data["time"]))
-                    coin_volume = data["volumefrom"] + data["volumeto"]
-                    volumes.append(coin_volume)
-                    try:
-                        agregated_volumes[i] += coin_volume
-                    # first coin (agregated volumes still empty)
-                    except Exception as e:
-                        agregated_volumes.append(coin_volume)
-
-                # indexed mode -> we need to index all prices
-                try:
-                    try:
-                        base = prices[0]
-                    except IndexError:
-                        base = 0
-                    for i in range(len(prices)):
-                        prices[i] = prices[i] / base * 100
-                except ZeroDivisionError:
-                    draw_current_coin = False
-
-                # draw plot for current coin
-                if draw_current_coin:
-                    sub_plt.plot(times, prices, color=coin_list[coin])
-
-                # sub_plt.tick_params(axis='y', labelcolor=color)
-
-        # END OF COIN LOOP
+        # one collection for all coins, colors of the coin list
+        self.indexed_coins = list(coin_list)
+        self.indexed_colors = to_rgba_array(list(coin_list.values()))
+        self.indexed_lines = LineCollection([], colors=self.indexed_colors, linewidths=1.5)
+        sub_plt.add_collection(self.indexed_lines, autolim=False)
+        self.hover_line, = sub_plt.plot([], [], linewidth=HOVER_WIDTH, visible=False)
+
         sub_plt.set_facecolor(self.face_color)
         sub_plt.xaxis.grid(color=GRID_COL, linestyle='dashed')
         sub_plt.yaxis.grid(color=GRID_COL, linestyle='dashed')
 
-        if draw_current_coin:
-            ax2 = sub_plt.twinx()
-            ax2.fill_between(times, 0, agregated_volumes, facecolor='#000000', alpha=0.3)
-            ax2.axis('off')
-
-        self.format_xaxis(sub_plt, timeScale)
-
-        # update figure
+        self.volumes['all'] = self.add_volumes(sub_plt)
+
+    # indexed mode: highlights the line closest to the mouse (at the candle under it) and shows its value in the title
+    def on_hover(self, event):
+        if self.indexed_data is None or self.pan is not None:
+            return
+        sub_plt = self.sub_plots[0]
+        hovered = None
+        if event.name != 'axes_leave_event' and event.x is not None and sub_plt.contains_point((event.x, event.y)):
+            dates, first, indexed = self.indexed_data
+            x = sub_plt.transData.inverted().transform((event.x, event.y))[0]
+            # leading columns are NaN (right aligned), search only the valid dates
+            column = first + min(np.searchsorted(dates[first:], x), len(dates) - first - 1)
+            if first <= column and np.isfinite(indexed[:, column]).any():
+                values = indexed[:, column]
+                ys = sub_plt.transData.transform(np.column_stack([np.full(len(values), x), values]))[:, 1]
+                distances = np.where(np.isfinite(ys), np.abs(ys - event.y), np.inf)
+                nearest = int(np.argmin(distances))
+                if distances[nearest] <= HOVER_PIXELS:
+                    hovered = (nearest, values[nearest])
+        self.set_hovered(*(hovered or (None, None)))
+
+    # the hovered coin is drawn again on top of the dimmed collection
+    def set_hovered(self, index, value=None):
+        sub_plt = self.sub_plots[0]
+        if index is None:
+            if self.hovered is None:
+                return
+            sub_plt.set_title(INDEXED_TITLE, color='#000000', size='medium')
+            self.indexed_lines.set_colors(self.indexed_colors)
+            self.hover_line.set_visible(False)
+        else:
+            sub_plt.set_title('{} - {}: {:.1f}'.format(INDEXED_TITLE, self.indexed_coins[index], value),
+                              color='#000000', size='medium')
+            if self.hovered is None:
+                colors = self.indexed_colors.copy()
+                colors[:, 3] = DIM_ALPHA
+                self.indexed_lines.set_colors(colors)
+            self.hover_line.set_data(*self.indexed_segments[index].T)
+            self.hover_line.set_color(self.indexed_colors[index])
+            self.hover_line.set_visible(True)
+        self.hovered = index
+        self.draw_idle()
+
+    def clear_plots(self):
+        self.fig.clf()
+        self.sub_plots = []
+        self.lines = {}
+        self.candles = {}
+        self.volumes = {}
+        self.indexed_lines = None
+        self.indexed_coins = []
+        self.indexed_colors = None
+        self.indexed_segments = []
+        self.indexed_data = None
+        self.hover_line = None
+        self.hovered = None
+        self.placeholders = {}
+        self.time_scale = None
+        self.layout_key = None
+        self.pyramids = {}
+        self.axes_coins = {}
+        self.reset_zoom()
+
+    # empty volume collection on a twinx axis of sub_plt (filled by set_volumes)
+    def add_volumes(self, sub_plt):
+        ax2 = sub_plt.twinx()
+        ax2.axis('off')
+        volumes = PolyCollection([], facecolor='#000000', alpha=0.3)
+        # the shared x axis is scaled by the price lines only
+        ax2.add_collection(volumes, autolim=False)
+        return volumes
+
+    # replaces the volumes by one polygon down to 0 (the shape fill_between would draw)
+    def set_volumes(self, collection, times, volumes):
+        if len(times) == 0:
+            collection.set_verts([])
+            return
+        collection.set_verts([np.column_stack([np.r_[times[0], times, times[-1]], np.r_[0, volumes, 0]])])
+        top = np.nanmax(volumes)
+        if top > 0:
+            collection.axes.set_ylim(0, top * 1.05)
+
+    # date locators only need to be set up again if the time scale changed
+    def update_xaxis(self, timeScale):
+        if timeScale == self.time_scale:
+            return
+        for sp in self.sub_plots:
+            self.format_xaxis(sp, timeScale)
+        self.time_scale = timeScale
+
+    def resizeEvent(self, event):
+        super(MplPriceChartsCanvas, self).resizeEvent(event)
+        self.layout_timer.start(LAYOUT_DELAY)
+
+    def on_resized(self):
+        if self.structure is not None:
+            self.update_layout()
+            self.draw_idle()
+
+    # layouts of charts without data (tick labels of an empty axis) are not cached
+    def update_layout(self):
+        key = (self.structure, int(self.fig.bbox.width), int(self.fig.bbox.height))
+        if key == self.layout_key:
+            return
+        params = self.layouts.get(key)
+        if params is not None:
+            self.fig.subplots_adjust(**params)
+            self.layout_key = key
+            return
         self.fig.tight_layout(h_pad=1)
-        self.fig.canvas.draw()
+        if any(len(line.get_xdata()) for line in self.lines.values()) or \
+                any(len(segment) for segment in self.indexed_segments):
+            pars = self.fig.subplotpars
+            self.layouts[key] = dict(left=pars.left, right=pars.right, bottom=pars.bottom, top=pars.top,
+                                     wspace=pars.wspace, hspace=pars.hspace)
+            self.layout_key = key
 
     # custom formatter for date labels in x-axis
     def format_xaxis(self, plt, timeScale):
@@ -362,50 +731,64 @@ class MplCorrelationCanvas(FigureCanvasQTAgg):
         self.fig.set_facecolor(self.bg_color)
         self.coin_list = current_coin_list
 
-    # draws a correlation matrix
-    def draw_graph(self, coinList, price_data, dark_mode=True):
-        priceDict = {}
-        for coin in coinList:
-            prices = []
-            for data in price_data[coin]:
-                prices.append(data["close"])
-            priceDict[coin] = prices
-        l = len(coinList)
-        corrMatrix = [[0 for x in range(l)] for y in range(l)]
-        for i, coin1 in enumerate(priceDict):
-            for p, coin2 in enumerate(priceDict):
-                if p > i:
-                    rvalue = 0.0
-                elif coin1 == coin2:
-                    rvalue = 1.0
-                else:
-                    a = priceDict[coin1]
-                    b = priceDict[coin2]
-                    try:
-                        lr = linregress(a, b)
-                        rvalue = lr.rvalue
-                    except ValueError:
-                        rvalue = 0
-                corrMatrix[i][p] = rvalue
+        self.ax = None
+        self.labels = []
+        self.correlations = np.zeros((0, 0))
+        self.title = ''
+        # rolling correlations playback
+        self.image = None
+        self.frames = []
+        self.frame_index = 0
+        self.play_timer = None
+        self.mpl_connect('motion_notify_event', self.on_hover)
+        self.mpl_connect('button_press_event', self.on_click)
+        self.mpl_connect('axes_leave_event', self.on_leave)
+
+    # draws a correlation matrix (lower triangle)
+    # method: 'pearson' or 'spearman', use_returns: correlate log returns instead of price levels,
+    # cluster: reorder coins by hierarchical clustering
+    def draw_graph(self, coinList, price_frame, dark_mode=True, method='pearson', use_returns=False, cluster=False):
+        labels = list(coinList.keys())
+        # coins x time close prices in the order of the coin list
+        closes = np.full((len(labels), price_frame.width()), np.nan)
+        for i, coin in enumerate(labels):
+            if coin in price_frame.rows:
+                closes[i] = price_frame.close[price_frame.rows[coin]]
+        if use_returns:
+            closes = log_returns(closes)
+        numpy_correlations = correlation_matrix(closes, method)
+
+        if cluster:
+            order = cluster_order(numpy_correlations)
+            numpy_correlations = numpy_correlations[np.ix_(order, order)]
+            labels = [labels[i] for i in order]
+        self.image = None
+        self.labels = labels
+        self.correlations = lower_triangle(numpy_correlations)
 
         # plot correlation heatmap
         self.ax = self.fig.add_subplot(111)
-        self.ax.set_title('Crypto Correlations Matrix', size='medium')
-
-        # convert tu numpy array
-        numpy_correlations = np.array(corrMatrix)
-
-        # coin labels
-        labels = coinList.keys()
-        # We want to show all ticks...
-        self.ax.set_xticks(np.arange(len(labels)))
-        self.ax.set_yticks(np.arange(len(labels)))
-        # ... and label them with the respective list entries
-        self.ax.set_xticklabels(labels)
-        self.ax.set_yticklabels(labels)
-
-        # Rotate the tick labels and set their alignment.
-        marts.setp(self.ax.get_xticklabels(), rotation=40, ha="right", rotation_mode="anchor")
+        title = 'Crypto Correlations Matrix'
+        if use_returns:
+            title += ' (log returns)'
+        if method != 'pearson':
+            title += ' - ' + method.capitalize()
+        self.ax.set_title(title, size='medium')
+        self.title = title
+
+        # We want to show all ticks... (as long as they are readable)
+        if len(labels) <= TICKS_MAX:
+            self.ax.set_xticks(np.arange(len(labels)))
+            self.ax.set_yticks(np.arange(len(labels)))
+            # ... and label them with the respective list entries
+            self.ax.set_xticklabels(labels)
+            self.ax.set_yticklabels(labels)
+
+            # Rotate the tick labels and set their alignment.
+            marts.setp(self.ax.get_xticklabels(), rotation=40, ha="right", rotation_mode="anchor")
+        else:
+            self.ax.set_xticks([])
+            self.ax.set_yticks([])
 
         # custom colormap
         colors = [(1, 0.1, 0.1), (0.2, 0.2, 0.2), (1, 0.1, 0.1)]
@@ -413,20 +796,85 @@ class MplCorrelationCanvas(FigureCanvasQTAgg):
         #colors = [(255/255,133/255,133/255), (186/255,0,0), (255/255,71/255,71/255)]
         colormap = LinearSegmentedColormap.from_list('cmap_name', colors, 256, 1)
 
-        # Loop over data dimensions and create text annotations.
-        for i in range(len(labels)):
-            for j in range(len(labels)):
-                # set cell text color to give it readable contrast
-                if abs(numpy_correlations[i, j]) > 0.5:
-                    text_col = FACE_COL_D
-                else:
-                    text_col = BG_COL_L
-                if i >= j:
+        # create text annotations for small matrices, larger ones show the hovered cell in the title
+        if len(labels) <= ANNOTATIONS_MAX:
+            for i in range(len(labels)):
+                for j in range(i + 1):
+                    # set cell text color to give it readable contrast
+                    if abs(numpy_correlations[i, j]) > 0.5:
+                        text_col = FACE_COL_D
+                    else:
+                        text_col = BG_COL_L
                     self.ax.text(j, i, '%.2f' % numpy_correlations[i, j], ha="center", va="center", color=text_col, size='small')
-        self.ax.imshow(numpy_correlations, alpha=1, cmap=colormap)
+        self.ax.imshow(self.correlations, alpha=1, cmap=colormap, vmin=-1, vmax=1)
         #self.fig.canvas.draw()
         #self.fig.subplots_adjust(left=0.1, bottom=0.3)
 
+    # draws the rolling correlation matrix and plays its history (click on the matrix to replay)
+    def draw_rolling(self, coinList, rolling, dark_mode=True):
+        self.labels = list(coinList.keys())
+        self.frames = list(rolling.history)
+        if not self.frames:
+            self.frames = [(None, rolling.matrix())]
+        self.correlations = lower_triangle(self.frames[-1][1])
+
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_facecolor(self.face_color)
+        self.title = 'Rolling Correlations ({} candles)'.format(rolling.window)
+        self.ax.set_title(self.title, size='medium')
+        if len(self.labels) <= TICKS_MAX:
+            self.ax.set_xticks(np.arange(len(self.labels)))
+            self.ax.set_yticks(np.arange(len(self.labels)))
+            self.ax.set_xticklabels(self.labels)
+            self.ax.set_yticklabels(self.labels)
+            marts.setp(self.ax.get_xticklabels(), rotation=40, ha="right", rotation_mode="anchor")
+        else:
+            self.ax.set_xticks([])
+            self.ax.set_yticks([])
+
+        colors = [(0, (0.5, 0.5, 0.5)), (1, (1, 0.1, 0.1))]
+        colormap = LinearSegmentedColormap.from_list('cmap_name', colors, 256, 1)
+        self.image = self.ax.imshow(self.correlations, alpha=1, cmap=colormap, vmin=-1, vmax=1)
+        self.play_rolling()
+
+    # steps through the stored matrices, the image data is updated in place
+    def play_rolling(self):
+        self.frame_index = 0
+        if self.play_timer is None:
+            self.play_timer = self.new_timer(interval=PLAY_INTERVAL)
+            self.play_timer.add_callback(self.next_rolling_frame)
+        self.play_timer.start()
+
+    def next_rolling_frame(self):
+        if self.image is None or self.frame_index >= len(self.frames):
+            self.play_timer.stop()
+            return
+        time, matrix = self.frames[self.frame_index]
+        self.correlations = lower_triangle(matrix)
+        self.image.set_data(self.correlations)
+        if time is not None:
+            self.ax.set_title('{} - {}'.format(self.title, dt.datetime.fromtimestamp(time).strftime('%d/%m/%y %H:%M')), size='medium')
+        self.frame_index += 1
+        self.fig.canvas.draw_idle()
+
+    def on_click(self, event):
+        if self.image is not None and event.inaxes is self.ax:
+            self.play_rolling()
+
+    # hover readout: shows the coin pair and correlation of the cell under the mouse in the title
+    def on_hover(self, event):
+        if self.ax is None or event.inaxes is not self.ax or event.xdata is None:
+            return
+        i, j = int(round(event.ydata)), int(round(event.xdata))
+        if not (0 <= j <= i < len(self.labels)):
+            return
+        self.ax.set_title('{} / {}: {:.2f}'.format(self.labels[i], self.labels[j], self.correlations[i, j]), size='medium')
+        self.fig.canvas.draw_idle()
+
+    def on_leave(self, event):
+        if self.ax is not None and event.inaxes is self.ax:
+            self.ax.set_title(self.title, size='medium')
+            self.fig.canvas.draw_idle()
 
     def set_color_mode(self, dark_mode):
         if dark_mode:
@@ -1,5 +1,6 @@
 from PyQt5.QtWidgets import QComboBox, QLabel, QHBoxLayout, QWidget
-import json
+
+from config_service import get_config
 
 #################################
 ##### PARAM SELECTOR CLASS ######
@@ -10,30 +11,6 @@ timeWords = ['1-hour', '1-day', '1-week', '1-month', '3-months', '6-months', '1-
 timeLim = [60, 1440, 168, 720, 90, 180, 365]
 timeLimScale = ['minute', 'minute', 'hour', 'hour', 'day', 'day', 'day']
 
-# load all coin list from config files
-def load_coin_lists():
-    # load all coins lists
-    with open('all_coins_colors.txt') as json_file:
-        allCoins = json.load(json_file)
-
-    # load coinList names and data
-    all_coin_lists_names = []
-    all_coin_lists = []
-    all_coin_lists_dict = {}
-
-    try:
-        with open('coin_lists.txt') as json_file:
-            clist_data = json.load(json_file)
-            all_coin_lists_dict = clist_data  # needed for customization in settings mode
-        for listname in clist_data:
-            all_coin_lists_names.append(listname)
-            all_coin_lists.append(clist_data[listname])
-
-    except Exception:
-        print("could not load config files!")
-
-    return allCoins, all_coin_lists_names, all_coin_lists, all_coin_lists_dict
-
 
 class ParameterSelector(QWidget):
 
@@ -45,10 +22,10 @@ class ParameterSelector(QWidget):
 
         self.dark_mode = dark_mode
 
-        # read all coin lists from file
+        # coin lists are loaded once by the config service (shared with the main window and the editor)
+        self.config = get_config()
         self.coinListIndex = coinListIndex
-        self.allCoins, self.all_coin_lists_names, self.all_coin_lists, self.all_coin_lists_dict = load_coin_lists()
-        self.coinList = self.all_coin_lists[self.coinListIndex]
+        self.coinList = self.config.coin_lists()[self.coinListIndex]
 
         self.currency = 'EUR'
         self.timeScale = 1
@@ -57,10 +34,6 @@ class ParameterSelector(QWidget):
 
     def initUI(self):
 
-        # load all coins lists from file
-        self.allCoins, self.all_coin_lists_names, self.all_coin_lists, self.all_coin_lists_dict = load_coin_lists()
-        self.coinList = self.all_coin_lists[self.coinListIndex]
-
         input_layout = QHBoxLayout()
         input_widget = QWidget()
         input_widget.setMaximumHeight(40)
@@ -70,7 +43,7 @@ class ParameterSelector(QWidget):
         self.comboBox1 = QComboBox(self)
         self.comboBox1.setStyleSheet(
             "QComboBox{color: lightgrey; padding: 0px 18px 0px 3px;} QComboBox:!editable:off, QComboBox::drop-down:editable {background:#333333}")
-        for list in self.all_coin_lists_names:
+        for list in self.config.list_names():
             self.comboBox1.addItem(list)
         self.comboBox1.activated[int].connect(self.listChoice)
         self.comboBox1.setCurrentIndex(self.coinListIndex)
@@ -103,9 +76,10 @@ class ParameterSelector(QWidget):
 
     def listChoice(self, item):
         self.coinListIndex = item
-        self.coinList = self.all_coin_lists[item]
+        self.coinList = self.config.coin_lists()[item]
         self.parent.coinListIndex = item
-        self.parent.coinList = self.all_coin_lists[item]
+        self.parent.coinListName = self.config.list_names()[item]
+        self.parent.coinList = self.coinList
         self.parent.refresh_data_and_graphs()
 
     def timeChoice(self, text):  # convert: "hour... year" to int value as defined in the index of timeWords array
@@ -126,6 +100,25 @@ class ParameterSelector(QWidget):
         self.parent.currency = text.strip()
         self.parent.refresh_data_and_graphs()
 
+    # selects the given parameters in the drop down menus (without triggering a refresh)
+    def set_parameters(self, coinListIndex, timeScale, currency):
+        self.coinListIndex = coinListIndex
+        self.coinList = self.config.coin_lists()[coinListIndex]
+        self.timeScale = timeScale
+        self.currency = currency
+        self.comboBox1.setCurrentIndex(coinListIndex)
+        self.comboBox2.setCurrentIndex(timeScale)
+        self.comboBox3.setCurrentText(currency)
+
+    # replaces the coin list names in the drop down menu (lists added, removed or renamed)
+    def set_lists(self, names, coinListIndex):
+        self.coinListIndex = coinListIndex
+        self.coinList = self.config.coin_lists()[coinListIndex]
+        if names != [self.comboBox1.itemText(i) for i in range(self.comboBox1.count())]:
+            self.comboBox1.clear()
+            self.comboBox1.addItems(names)
+        self.comboBox1.setCurrentIndex(coinListIndex)
+
     def set_color_mode(self, dark_mode):
         # switch to DARK MODE
         if dark_mode:
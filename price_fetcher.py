@@ -0,0 +1,59 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from http_client import get_http_client
+
+
+##############################
+##### PRICE FETCHER CLASS ####
+##############################
+
+# Runs fetch coroutines on the http client loop (background thread) and delivers the results through Qt signals,
+# so the GUI thread never blocks on the network
+# Every fetch gets a generation number, starting a new fetch cancels the one still in flight and results of
+# superseded fetches are never delivered
+# Fetches can report partial results (e.g. the series of one coin) before the complete result is ready
+class PriceFetcher(QObject):
+
+    data_ready = pyqtSignal(int, object)            # generation, result
+    partial_ready = pyqtSignal(int, object, object) # generation, key, partial result
+    fetch_failed = pyqtSignal(int, str)             # generation, error message
+
+    def __init__(self, parent=None):
+        super(PriceFetcher, self).__init__(parent)
+        self.generation = 0
+        self.future = None
+
+    # PRE: coro is a coroutine object (e.g. main(currency, time, lim, coinList)) or a function that takes a
+    # progress(key, value) callback and returns one, progress may be called from the client thread
+    # POST: returns the generation of the new fetch
+    def fetch(self, coro):
+        self.cancel()
+        self.generation += 1
+        generation = self.generation
+        if callable(coro):
+            coro = coro(lambda key, value: self._progress(generation, key, value))
+        self.future = get_http_client().submit(coro)
+        self.future.add_done_callback(lambda future: self._done(generation, future))
+        return generation
+
+    def cancel(self):
+        if self.future is not None and not self.future.done():
+            self.future.cancel()
+        self.future = None
+
+    def is_busy(self):
+        return self.future is not None and not self.future.done()
+
+    # called from the client thread, emitted signals are queued to the receivers thread
+    def _progress(self, generation, key, value):
+        if generation == self.generation:
+            self.partial_ready.emit(generation, key, value)
+
+    def _done(self, generation, future):
+        if future.cancelled() or generation != self.generation:
+            return
+        error = future.exception()
+        if error is not None:
+            self.fetch_failed.emit(generation, str(error))
+        else:
+            self.data_ready.emit(generation, future.result())
@@ -0,0 +1,251 @@
+import time as systime
+import datetime as dt
+
+import numpy as np
+import matplotlib.dates as mdates
+
+from candle_store import INTERVALS, FIELDS
+
+########################
+##  Global variables  ##
+########################
+
+# fields stored as float matrices (time is kept as int64)
+PRICE_FIELDS = ['open', 'high', 'low', 'close', 'volumefrom', 'volumeto']
+
+DAY = 86400
+
+# matplotlib date number of the unix epoch
+EPOCH_DATENUM = mdates.date2num(dt.datetime(1970, 1, 1))
+
+
+########################
+##  Helper functions  ##
+########################
+
+# A series is the columnar form of one coins candles: a dict field -> 1-D numpy array (oldest first)
+
+def empty_series():
+    return {f: np.zeros(0, dtype=np.int64 if f == 'time' else np.float64) for f in FIELDS}
+
+
+def series_length(series):
+    return len(series['time'])
+
+
+def series_nbytes(series):
+    return sum(a.nbytes for a in series.values())
+
+
+# returns the part of a series starting at time start
+def slice_series(series, start):
+    index = np.searchsorted(series['time'], start)
+    return {f: a[index:] for f, a in series.items()}
+
+
+# POST: local UTC offset in seconds at a unix time
+def utc_offset(timestamp):
+    return dt.datetime.fromtimestamp(timestamp, dt.timezone.utc).astimezone().utcoffset().total_seconds()
+
+
+# POST: (changes, offsets): the local UTC offset between start and end is offsets[0] before changes[0] and
+# offsets[i] from changes[i - 1] on, offsets are sampled daily and the changes found by bisection (DST)
+def utc_offset_changes(start, end):
+    changes, offsets = [], [utc_offset(start)]
+    previous = start
+    for sample in list(range(start + DAY, end, DAY)) + [end]:
+        offset = utc_offset(sample)
+        if offset != offsets[-1]:
+            low, high = previous, sample
+            while high - low > 1:
+                middle = (low + high) // 2
+                if utc_offset(middle) == offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            changes.append(high)
+            offsets.append(offset)
+        previous = sample
+    return np.array(changes, dtype=np.int64), np.array(offsets)
+
+
+# POST: local UTC offset in seconds of every timestamp (the offset of its own date, not today's)
+def utc_offsets(timestamps):
+    timestamps = np.asarray(timestamps)
+    if timestamps.size == 0:
+        return np.zeros(timestamps.shape)
+    changes, offsets = utc_offset_changes(int(np.floor(timestamps.min())), int(np.ceil(timestamps.max())))
+    return offsets[np.searchsorted(changes, timestamps, side='right')]
+
+
+# unix timestamps -> matplotlib date numbers in local time (like dt.datetime.fromtimestamp)
+def to_mpl_dates(timestamps):
+    return (timestamps + utc_offsets(timestamps)) / DAY + EPOCH_DATENUM
+
+
+# time matrix of a frame -> date numbers, NaN for missing candles (time 0)
+def to_frame_dates(time):
+    valid = time != 0
+    dates = np.full(time.shape, np.nan)
+    dates[valid] = to_mpl_dates(time[valid])
+    return dates
+
+
+# inverse of to_mpl_dates (a local time that occurs twice at the end of DST maps to the first)
+def from_mpl_dates(dates):
+    local = (np.asarray(dates) - EPOCH_DATENUM) * DAY
+    # the offset at local read as UTC is off by at most one change, the second pass corrects it
+    timestamps = local - utc_offsets(local)
+    return local - utc_offsets(timestamps)
+
+
+##########################
+##### PRICE FRAME CLASS ##
+##########################
+
+# Columnar price data of a coin list: one coins x time matrix per field
+# Series are right aligned (newest candle in the last column), missing candles at the start are NaN
+# The row of a coin is rows[coin], length[row] is the number of valid candles
+class PriceFrame:
+
+    def __init__(self, coins, width=0, time='minute'):
+        self.coins = list(coins)
+        self.rows = {coin: i for i, coin in enumerate(self.coins)}
+        self.granularity = time
+        self.synthetic = set()      # coins without API data (e.g. coin == base currency)
+        self.quotes = {}            # coin -> current price and 24h stats of the last batched refresh
+
+        shape = (len(self.coins), width)
+        self.time = np.zeros(shape, dtype=np.int64)
+        for field in PRICE_FIELDS:
+            setattr(self, field, np.full(shape, np.nan))
+        self.volume = np.full(shape, np.nan)
+        self.dates = np.full(shape, np.nan)
+        self.length = np.zeros(len(self.coins), dtype=np.int64)
+
+    # PRE: series_list holds one series per coin of coin_list (same order)
+    # POST: frame of the last lim+1 candles, coin == currency gets a flat price of 1.0
+    @classmethod
+    def from_series(cls, coin_list, series_list, currency, time, lim):
+        frame = cls(coin_list, lim + 1, time)
+        for coin, series in zip(frame.coins, series_list):
+            if coin == currency:
+                frame.synthetic.add(coin)
+                series = frame.flat_series(time, lim + 1)
+            frame._copy_row(frame.rows[coin], series)
+        frame.volume = frame.volumefrom + frame.volumeto
+        # one vectorized conversion for all timestamps
+        frame.dates = to_frame_dates(frame.time)
+        return frame
+
+    @staticmethod
+    def flat_series(time, width):
+        interval = INTERVALS[time]
+        now = int(systime.time()) // interval * interval
+        series = {f: np.ones(width) for f in PRICE_FIELDS}
+        series['time'] = now - np.arange(width - 1, -1, -1, dtype=np.int64) * interval
+        return series
+
+    def width(self):
+        return self.time.shape[1]
+
+    # POST: unix time of the newest candle, 0 without data
+    def last_time(self):
+        return int(self.time[:, -1].max()) if self.width() and len(self.coins) else 0
+
+    # copies the last candles of a series into a row (right aligned)
+    def _copy_row(self, row, series):
+        n = min(series_length(series), self.width())
+        self.length[row] = n
+        if n == 0:
+            return
+        self.time[row, -n:] = series['time'][-n:]
+        for field in PRICE_FIELDS:
+            getattr(self, field)[row, -n:] = series[field][-n:]
+
+    # replaces the data of one coin
+    def set_series(self, coin, series):
+        row = self.rows[coin]
+        self.time[row] = 0
+        for field in PRICE_FIELDS + ['volume', 'dates']:
+            getattr(self, field)[row] = np.nan
+        self._copy_row(row, series)
+        n = self.length[row]
+        if n:
+            self.volume[row, -n:] = self.volumefrom[row, -n:] + self.volumeto[row, -n:]
+            self.dates[row, -n:] = to_mpl_dates(self.time[row, -n:])
+
+    # PRE: prices maps coins to their current price, now is a unix time (default: current time)
+    # POST: (frame, missing): copy of the frame moved to the candle of now, the last candle of every coin in prices
+    # is patched (now in the last candle) or appended (now in the next candle, the window slides by one)
+    # coins without price or data keep their last close (flat candle) and are listed in missing
+    # an appended candle opens at the last close and has no volume yet, refresh_latest replaces it by histo data
+    # frame is None if the frame is more than one candle behind (the candles in between are unknown)
+    def advanced(self, prices, now=None):
+        interval = INTERVALS[self.granularity]
+        candle = int(systime.time() if now is None else now) // interval * interval
+        steps = (candle - self.last_time()) // interval
+        if self.width() == 0 or steps < 0 or steps > 1:
+            return None, list(self.coins)
+
+        frame = PriceFrame(self.coins, self.width(), self.granularity)
+        frame.synthetic = set(self.synthetic)
+        for field in ['time', 'volume', 'dates'] + PRICE_FIELDS:
+            values = getattr(self, field)
+            getattr(frame, field)[:, :self.width() - steps] = values[:, steps:]
+        frame.length = np.minimum(self.length + steps * (self.length > 0), self.width())
+
+        rows = np.flatnonzero(self.length > 0)
+        quoted = np.array([self.coins[row] in prices for row in rows], dtype=bool)
+        price = np.array([prices.get(self.coins[row], np.nan) for row in rows], dtype=np.float64)
+        price = np.where(quoted & np.isfinite(price), price, self.close[rows, -1])
+        if steps:
+            # new candle: opens at the last close, no volume yet
+            frame.time[rows, -1] = candle
+            frame.open[rows, -1] = self.close[rows, -1]
+            frame.high[rows, -1] = np.maximum(self.close[rows, -1], price)
+            frame.low[rows, -1] = np.minimum(self.close[rows, -1], price)
+            for field in ['volumefrom', 'volumeto', 'volume']:
+                getattr(frame, field)[rows, -1] = 0.0
+            frame.dates[rows, -1] = to_mpl_dates(frame.time[rows, -1])
+        else:
+            frame.high[rows, -1] = np.maximum(frame.high[rows, -1], price)
+            frame.low[rows, -1] = np.minimum(frame.low[rows, -1], price)
+        frame.close[rows, -1] = price
+
+        missing = [coin for coin in self.coins if coin not in self.synthetic
+                   and (coin not in prices or not self.length[self.rows[coin]])]
+        return frame, missing
+
+    # POST: valid part of a field for one coin (1-D view), empty if the coin has no data
+    def series(self, coin, field):
+        row = self.rows.get(coin)
+        values = getattr(self, field)
+        if row is None:
+            return values[:0, :0].reshape(0)
+        return values[row, self.width() - self.length[row]:]
+
+    def has_data(self, coin):
+        row = self.rows.get(coin)
+        return row is not None and self.length[row] > 0
+
+    # POST: first and last valid value of a field for every row (NaN for rows without data)
+    def first_last(self, field):
+        values = getattr(self, field)
+        first = np.full(len(self.coins), np.nan)
+        last = np.full(len(self.coins), np.nan)
+        rows = np.flatnonzero(self.length > 0)
+        if len(rows):
+            first[rows] = values[rows, self.width() - self.length[rows]]
+            last[rows] = values[rows, -1]
+        return first, last
+
+    # POST: volumes summed over all coins with API data and the dates of the longest series
+    def total_volume(self):
+        rows = [self.rows[c] for c in self.coins if c not in self.synthetic]
+        if not rows or self.width() == 0:
+            return self.dates[:0, :0].reshape(0), self.volume[:0, :0].reshape(0)
+        longest = rows[int(np.argmax(self.length[rows]))]
+        n = self.length[longest]
+        volumes = np.nansum(self.volume[rows, self.width() - n:], axis=0)
+        return self.dates[longest, self.width() - n:], volumes
@@ -0,0 +1,72 @@
+import time as systime
+
+import numpy as np
+
+from candle_store import INTERVALS, FIELDS
+from price_frame import slice_series, series_length
+
+########################
+##  Global variables  ##
+########################
+
+# largest window of each granularity offered in the time selector (see timeLim / timeLimScale)
+# fetching it once serves every smaller window of the same granularity
+FETCH_LIM = {'minute': 1440, 'hour': 720, 'day': 365}
+
+
+########################
+##  Helper functions  ##
+########################
+
+# PRE: series sorted by time, interval in seconds (multiple of the series interval)
+# POST: OHLCV candles rolled up into buckets aligned to multiples of interval (like the histo endpoints)
+def resample(series, interval):
+    buckets = series['time'] // interval * interval
+    if len(buckets) == 0:
+        return {f: series[f][:0] for f in FIELDS}
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return {'time': buckets[starts],
+            'open': series['open'][starts],
+            'high': np.maximum.reduceat(series['high'], starts),
+            'low': np.minimum.reduceat(series['low'], starts),
+            'close': series['close'][ends],
+            'volumefrom': np.add.reduceat(series['volumefrom'], starts),
+            'volumeto': np.add.reduceat(series['volumeto'], starts)}
+
+
+# first candle time of the last lim+1 periods of a granularity
+def window_start(time, lim, now=None):
+    interval = INTERVALS[time]
+    if now is None:
+        now = systime.time()
+    return int(now) // interval * interval - lim * interval
+
+
+# PRE: series_list is a list of (granularity, series) pairs, e.g. cached responses of one ticker/currency
+# POST: returns the series of the last lim+1 periods of granularity time derived from the finest series that
+# covers the whole window, None if no series covers it
+def derive(series_list, time, lim, now=None):
+    if now is None:
+        now = systime.time()
+    interval = INTERVALS[time]
+    start = window_start(time, lim, now)
+    current = int(now) // interval * interval
+
+    best = None
+    for granularity, series in series_list:
+        source_interval = INTERVALS[granularity]
+        if not series_length(series) or source_interval > interval or interval % source_interval:
+            continue
+        if series['time'][0] > start or series['time'][-1] < current:
+            continue
+        if best is None or source_interval < INTERVALS[best[0]]:
+            best = (granularity, series)
+    if best is None:
+        return None
+
+    granularity, series = best
+    series = slice_series(series, start)
+    if granularity == time:
+        return series
+    return resample(series, interval)
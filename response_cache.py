@@ -0,0 +1,109 @@
+import asyncio
+import time as systime
+from collections import OrderedDict
+
+########################
+##  Global variables  ##
+########################
+
+# seconds until cached candles of each granularity are fetched again
+CACHE_TTL = {'minute': 30, 'hour': 300, 'day': 1800}
+
+# memory bound of the cache
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+##############################
+##### RESPONSE CACHE CLASS ###
+##############################
+
+# In-memory LRU cache with granularity dependent TTLs in front of the price requests
+# Identical requests arriving while one is in flight wait for the same task instead of calling the API again
+# Runs on the http client loop only, so no locking is needed
+class ResponseCache:
+
+    # PRE: sizeof(value) returns the memory used by a cached value, values of size 0 are not cached
+    def __init__(self, sizeof, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.sizeof = sizeof
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()    # key -> (expires, size, value), least recently used first
+        self.size = 0
+        self.inflight = {}              # key -> task
+        self.waiters = {}               # task -> number of callers waiting for it
+        self.hits = 0
+        self.misses = 0
+
+    # returns the cached value or None if missing or expired
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, size, value = entry
+        if expires < systime.monotonic():
+            self.remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    # returns all unexpired (key, value) pairs whose key matches, without touching the LRU order
+    def find(self, match):
+        now = systime.monotonic()
+        return [(key, entry[2]) for key, entry in self.entries.items() if entry[0] >= now and match(key)]
+
+    # PRE: time is the granularity of the value ('minute', 'hour', 'day')
+    def put(self, key, value, time):
+        self.remove(key)
+        size = self.sizeof(value)
+        self.entries[key] = (systime.monotonic() + self.ttl[time], size, value)
+        self.size += size
+        # evict least recently used entries
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            oldest = next(iter(self.entries))
+            self.remove(oldest)
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    # PRE: fetch is a coroutine function returning the value for key
+    # POST: returns the cached value or the result of one shared fetch, empty results are not cached
+    async def get_or_fetch(self, key, time, fetch):
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self.inflight[key] = task
+            self.waiters[task] = 0
+            task.add_done_callback(lambda t: self._fetch_done(key, time, t))
+
+        self.waiters[task] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # only cancel the shared fetch if nobody else is waiting for it
+            self.waiters[task] = self.waiters.get(task, 1) - 1
+            if self.waiters[task] == 0 and not task.done():
+                task.cancel()
+                self.inflight.pop(key, None)
+            raise
+
+    def _fetch_done(self, key, time, task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        self.waiters.pop(task, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if value is not None and self.sizeof(value):
+            self.put(key, value, time)
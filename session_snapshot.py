@@ -0,0 +1,72 @@
+import os
+import json
+import time as systime
+
+import numpy as np
+
+from price_frame import PriceFrame, PRICE_FIELDS, to_frame_dates
+
+########################
+##  Global variables  ##
+########################
+
+SNAPSHOT_FILE = 'snapshot.npz'
+SNAPSHOT_VERSION = 1
+
+
+########################
+##  Helper functions  ##
+########################
+
+# json turns tuples into lists, layout keys (see MplPriceChartsCanvas.update_layout) need them back as tuples
+def to_tuples(value):
+    if isinstance(value, list):
+        return tuple(to_tuples(v) for v in value)
+    return value
+
+
+# Snapshot of the last session: view state, the displayed price frame and the cached chart layouts
+# Written when the app quits and shown (marked as stale) on the next start until fresh data arrived
+# One compressed npz file: the price matrices plus a JSON string with everything else
+
+# PRE: state is a JSON serializable dict, layouts maps layout keys to subplot parameters,
+# data_time is the unix time the prices were fetched at (default: now)
+def save_snapshot(state, price_frame, layouts, data_time=None, path=SNAPSHOT_FILE):
+    meta = {'version': SNAPSHOT_VERSION,
+            'data_time': data_time if data_time is not None else systime.time(),
+            'state': state,
+            'coins': price_frame.coins,
+            'granularity': price_frame.granularity,
+            'synthetic': sorted(price_frame.synthetic),
+            'layouts': [[key, params] for key, params in layouts.items()]}
+    arrays = {field: getattr(price_frame, field) for field in PRICE_FIELDS}
+    arrays['time'] = price_frame.time
+    arrays['length'] = price_frame.length
+    arrays['meta'] = np.array(json.dumps(meta))
+    # written to a temporary file first, a crash while saving must not leave a broken snapshot
+    with open(path + '.tmp', 'wb') as outfile:
+        np.savez_compressed(outfile, **arrays)
+    os.replace(path + '.tmp', path)
+
+
+# POST: (meta, price frame, layouts) or None if there is no usable snapshot
+def load_snapshot(path=SNAPSHOT_FILE):
+    try:
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != SNAPSHOT_VERSION:
+                return None
+            frame = PriceFrame(meta['coins'], data['time'].shape[1], meta['granularity'])
+            frame.time = data['time']
+            for field in PRICE_FIELDS:
+                setattr(frame, field, data[field])
+            frame.length = data['length']
+    except (OSError, KeyError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Error loading snapshot ({e})")
+        return None
+    frame.synthetic = set(meta['synthetic'])
+    frame.volume = frame.volumefrom + frame.volumeto
+    frame.dates = to_frame_dates(frame.time)
+    layouts = {to_tuples(key): params for key, params in meta['layouts']}
+    return meta, frame, layouts
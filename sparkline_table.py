@@ -0,0 +1,302 @@
+import numpy as np
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QPointF
+from PyQt5.QtGui import QColor, QPen, QPainter, QPolygonF
+from PyQt5.QtWidgets import QTableView, QStyledItemDelegate, QHeaderView, QAbstractItemView, QStyle
+
+########################
+##  Global variables  ##
+########################
+
+COLUMNS = ['Coin', 'Price', 'Change', 'Volume', 'Chart']
+COL_COIN, COL_PRICE, COL_CHANGE, COL_VOLUME, COL_CHART = range(len(COLUMNS))
+SERIES_ROLE = Qt.UserRole       # close prices of a row (for the sparkline)
+COLOR_ROLE = Qt.UserRole + 1    # line color of a row (color of the coin in the coin list)
+ROW_HEIGHT = 28                 # px, all rows have the same height
+CHART_WIDTH = 240               # px, initial width of the sparkline column
+
+UP_COLOR = QColor('limegreen')
+DOWN_COLOR = QColor('tomato')
+
+
+########################
+##  Helper functions  ##
+########################
+
+# POST: '43,210.12', '0.1234', '1.23e-05'
+def format_price(price):
+    if not np.isfinite(price):
+        return '-'
+    if price >= 1:
+        return f"{price:,.2f}"
+    return f"{price:.4g}"
+
+
+# POST: '1.2B', '345.6M', '12.0K', '-'
+def format_volume(volume):
+    if not np.isfinite(volume):
+        return '-'
+    for limit, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if volume >= limit:
+            return f"{volume / limit:.1f}{suffix}"
+    return f"{volume:.0f}"
+
+
+# POST: 24h stats of a pricemultifull quote (see crypto_gui.fetch_latest_prices) as tooltip text, None without quote
+def format_quote(quote):
+    if quote is None:
+        return None
+    def value(field):
+        return quote.get(field) if quote.get(field) is not None else np.nan
+    change = value('CHANGEPCT24HOUR')
+    return "24h high: {}\n24h low: {}\n24h change: {}\n24h volume: {}".format(
+        format_price(value('HIGH24HOUR')), format_price(value('LOW24HOUR')),
+        f"{change:+.2f} %" if np.isfinite(change) else '-', format_volume(value('VOLUME24HOURTO')))
+
+
+# PRE: closes is a 1-D array, rect the area to draw into
+# POST: polyline points, at most two per pixel column (min and max of each column keep the spikes)
+def sparkline_points(closes, rect):
+    closes = closes[np.isfinite(closes)]
+    n = len(closes)
+    width = max(int(rect.width()), 2)
+    if n < 2:
+        return []
+    if n > 2 * width:
+        buckets = n // width
+        blocks = closes[n - buckets * width:].reshape(width, buckets)
+        lows, highs = blocks.min(axis=1), blocks.max(axis=1)
+        # min before max in rising buckets, max before min in falling ones
+        rising = blocks[:, -1] >= blocks[:, 0]
+        closes = np.where(rising[:, None], np.stack([lows, highs], axis=1),
+                          np.stack([highs, lows], axis=1)).reshape(-1)
+        n = len(closes)
+    low, high = closes.min(), closes.max()
+    span = high - low if high > low else 1.0
+    xs = rect.left() + np.arange(n) * (rect.width() / (n - 1))
+    ys = rect.bottom() - (closes - low) / span * rect.height()
+    return [QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+
+
+##############################
+##### SPARKLINE MODEL ########
+##############################
+
+# One row per coin of the coin list: last price, change over the window, volume and the close prices
+# The values of all rows are computed at once from the PriceFrame (numpy), the sparklines are painted by the delegate
+# A refresh of the same coin list only announces changed data, the view repaints the visible rows only
+class SparklineModel(QAbstractTableModel):
+
+    def __init__(self, parent=None):
+        super(SparklineModel, self).__init__(parent)
+        self.coins = []
+        self.colors = []
+        self.currency = ''
+        self.frame = None
+        self.last = np.zeros(0)
+        self.change = np.zeros(0)
+        self.volume = np.zeros(0)
+        self.order = np.zeros(0, dtype=np.int64)   # view row -> coin row
+        self.sort_column = None
+        self.sort_order = Qt.AscendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.coins)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal or role != Qt.DisplayRole:
+            return None
+        if section == COL_PRICE and self.currency:
+            return f"Price ({self.currency})"
+        return COLUMNS[section]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.order[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == COL_COIN:
+                return self.coins[row]
+            if column == COL_PRICE:
+                return format_price(self.last[row])
+            if column == COL_CHANGE:
+                return f"{self.change[row]:+.2f} %" if np.isfinite(self.change[row]) else '-'
+            if column == COL_VOLUME:
+                return format_volume(self.volume[row])
+        elif role == Qt.TextAlignmentRole and column in (COL_PRICE, COL_CHANGE, COL_VOLUME):
+            return Qt.AlignRight | Qt.AlignVCenter
+        elif role == Qt.ForegroundRole and column == COL_CHANGE and np.isfinite(self.change[row]):
+            return UP_COLOR if self.change[row] >= 0 else DOWN_COLOR
+        elif role == Qt.ToolTipRole:
+            return format_quote(self.frame.quotes.get(self.coins[row]))
+        elif role == SERIES_ROLE:
+            return self.frame.series(self.coins[row], 'close')
+        elif role == COLOR_ROLE:
+            return self.colors[row]
+        return None
+
+    # PRE: coin_list maps coins to colors, price_frame holds their data
+    # only the changed row is announced if coin is given (progressive loading)
+    def set_data(self, coin_list, price_frame, currency, coin=None):
+        coins = list(coin_list)
+        if coins != self.coins:
+            self.beginResetModel()
+            self.coins = coins
+            self.colors = [QColor(color) for color in coin_list.values()]
+            self.order = np.arange(len(coins))
+            self.update_values(price_frame, currency)
+            self.endResetModel()
+            self.apply_sort()
+            return
+        self.colors = [QColor(color) for color in coin_list.values()]
+        if currency != self.currency:
+            self.headerDataChanged.emit(Qt.Horizontal, COL_PRICE, COL_PRICE)
+        if coin is not None:
+            # only the row of the new coin is computed, one coin arrives at a time while loading
+            coin_row = self.coins.index(coin)
+            self.update_values(price_frame, currency, np.array([coin_row]))
+            if self.sort_column is None:
+                row = int(np.flatnonzero(self.order == coin_row)[0])
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+                return
+        else:
+            self.update_values(price_frame, currency)
+        self.apply_sort()
+        if self.coins:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.coins) - 1, len(COLUMNS) - 1))
+
+    # PRE: targets are coin rows (all coins if None)
+    def update_values(self, price_frame, currency, targets=None):
+        self.frame = price_frame
+        self.currency = currency
+        if targets is None or len(self.last) != len(self.coins):
+            targets = np.arange(len(self.coins))
+            self.last = np.full(len(self.coins), np.nan)
+            self.change = np.full(len(self.coins), np.nan)
+            self.volume = np.full(len(self.coins), np.nan)
+        rows = np.array([price_frame.rows.get(self.coins[i], -1) for i in targets], dtype=np.int64)
+        valid = rows >= 0
+        targets, rows = targets[valid], rows[valid]
+        self.last[targets] = np.nan
+        self.change[targets] = np.nan
+        self.volume[targets] = np.nan
+        if not len(rows) or not price_frame.width():
+            return
+        closes = price_frame.close[rows]
+        has_data = price_frame.length[rows] > 0
+        # right aligned: the first valid candle of a row is at width - length
+        first = closes[np.arange(len(rows)), np.minimum(price_frame.width() - price_frame.length[rows], price_frame.width() - 1)]
+        last = closes[:, -1]
+        self.last[targets] = np.where(has_data, last, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.change[targets] = np.where(has_data, (last / first - 1) * 100, np.nan)
+        self.volume[targets] = np.where(has_data, np.nansum(price_frame.volumeto[rows], axis=1), np.nan)
+
+    # called by the view (click on a column header)
+    # a negative column restores the order of the coin list
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = column if column >= 0 else None
+        self.sort_order = order
+        if self.sort_column is None:
+            self.reorder(np.arange(len(self.coins)))
+        else:
+            self.apply_sort()
+
+    def apply_sort(self):
+        if self.sort_column is None or self.sort_column == COL_CHART or not self.coins:
+            return
+        if self.sort_column == COL_COIN:
+            keys = np.array(self.coins)
+            order = np.argsort(keys, kind='stable')
+            if self.sort_order == Qt.DescendingOrder:
+                order = order[::-1]
+        else:
+            values = {COL_PRICE: self.last, COL_CHANGE: self.change, COL_VOLUME: self.volume}[self.sort_column]
+            keys = values if self.sort_order == Qt.AscendingOrder else -values
+            # rows without data (NaN) last in both directions
+            order = np.argsort(np.where(np.isfinite(keys), keys, np.inf), kind='stable')
+        self.reorder(order)
+
+    # moves the rows to a new order, selection and current row stay with their coins
+    def reorder(self, order):
+        if np.array_equal(order, self.order):
+            return
+        self.layoutAboutToBeChanged.emit()
+        new_rows = {coin_row: view_row for view_row, coin_row in enumerate(order)}
+        for index in self.persistentIndexList():
+            coin_row = self.order[index.row()]
+            self.changePersistentIndex(index, self.index(new_rows[coin_row], index.column()))
+        self.order = order
+        self.layoutChanged.emit()
+
+
+##############################
+##### SPARKLINE DELEGATE #####
+##############################
+
+# Paints the close prices of a row as a line in the coin color, directly with QPainter
+class SparklineDelegate(QStyledItemDelegate):
+
+    def paint(self, painter, option, index):
+        if index.column() != COL_CHART:
+            super(SparklineDelegate, self).paint(painter, option, index)
+            return
+        # background (selection) like the other cells
+        style = option.widget.style() if option.widget is not None else None
+        if style is not None:
+            self.initStyleOption(option, index)
+            style.drawPrimitive(QStyle.PE_PanelItemViewItem, option, painter, option.widget)
+        closes = index.data(SERIES_ROLE)
+        if closes is None:
+            return
+        points = sparkline_points(closes, option.rect.adjusted(4, 4, -4, -4))
+        if not points:
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(index.data(COLOR_ROLE), 1.2))
+        painter.drawPolyline(QPolygonF(points))
+        painter.restore()
+
+
+###############################
+##### SPARKLINE TABLE VIEW ####
+###############################
+
+# Table of the current coin list (hundreds of coins): ticker, last price, change, volume and a sparkline
+# Sortable by every column (click a header), only the visible rows are painted
+class SparklineTable(QTableView):
+
+    def __init__(self, dark_mode=True, parent=None):
+        super(SparklineTable, self).__init__(parent)
+        self.sparkline_model = SparklineModel(self)
+        self.setModel(self.sparkline_model)
+        self.setItemDelegate(SparklineDelegate(self))
+        # unsorted (coin list order) until a header is clicked
+        self.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.setSortingEnabled(True)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setShowGrid(False)
+        self.verticalHeader().hide()
+        # fixed row heights, the view never measures rows
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.horizontalHeader().setStretchLastSection(True)
+        self.setColumnWidth(COL_CHART, CHART_WIDTH)
+        self.set_color_mode(dark_mode)
+
+    def update_data(self, coin_list, price_frame, currency, coin=None):
+        self.sparkline_model.set_data(coin_list, price_frame, currency, coin)
+
+    def set_color_mode(self, dark_mode):
+        if dark_mode:
+            self.setStyleSheet("QTableView{background: #333333; color: lightgrey; selection-background-color: #444444; border: none}"
+                               "QHeaderView::section{background: #595959; color: lightgrey; border: none; padding: 3px}")
+        else:
+            self.setStyleSheet("QTableView{background: lightgrey; color: #333333; selection-background-color: darkgrey; border: none}"
+                               "QHeaderView::section{background: gainsboro; color: #333333; border: none; padding: 3px}")